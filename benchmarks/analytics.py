@@ -0,0 +1,63 @@
+"""
+Benchmark of the occupancy and pricing analytics (cinema_app.analytics) on a seeded SQLite database,
+NumPy backend against the pure-Python fallback.
+
+The database is seeded like benchmarks/purchase_history.py with a year of purchases; the sessions get start times
+spread over the day. Both sources are timed: the session-day rollups and summing the purchases.
+
+Usage: python benchmarks/analytics.py [--purchases 3000000] [--users 10000] [--skip-python]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from purchase_history import DB_PATH, create_schema, seed  # noqa: E402
+from django.db import connection  # noqa: E402
+from cinema_app import analytics  # noqa: E402
+from cinema_app.models import SessionDayRollup, HallDayRollup, MovieDayRollup  # noqa: E402
+from cinema_app.rollups import rebuild_rollups  # noqa: E402
+
+
+def schedule_sessions():
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE cinema_app_moviesession SET "
+                       "session_start_time = printf('%02d:00:00', 9 + id % 14), "
+                       "session_end_time = printf('%02d:30:00', (11 + id % 14) % 24)")
+
+
+def measure(backend, source):
+    started = time.perf_counter()
+    report = analytics.occupancy_report(backend=backend, source=source)
+    print(f'{backend:6} from {source:9}: {time.perf_counter() - started:.2f}s, {report["totals"]["tickets"]} tickets, '
+          f'load factor {report["totals"]["load_factor"]:.3f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--purchases', type=int, default=3_000_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--skip-python', action='store_true', help='Do not time the pure-Python backend')
+    args = parser.parse_args()
+
+    create_schema()
+    with connection.schema_editor() as editor:
+        for model in (SessionDayRollup, HallDayRollup, MovieDayRollup):
+            editor.create_model(model)
+    seed(args.purchases, args.users, days=365)
+    schedule_sessions()
+    started = time.perf_counter()
+    rebuild_rollups(chunk_size=100_000)
+    print(f'seeded {args.purchases} purchases, rollups rebuilt in {time.perf_counter() - started:.1f}s ({DB_PATH})')
+    for source in analytics.SOURCES:
+        if analytics.np is not None:
+            measure('numpy', source)
+        if not args.skip_python:
+            measure('python', source)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark of the API responses before and after the fast JSON renderer and the gzip compression:
+    before: the standard library JSON (API_JSON_BACKEND = 'stdlib'), a client without Accept-Encoding;
+    after:  orjson (when installed), a client sending Accept-Encoding: gzip.
+
+For the session list, the hall list and the purchase history (a page each) reports the body bytes on the wire
+and the CPU time per request, of the whole request and of the JSON rendering and the compression alone.
+
+Usage: python benchmarks/api_responses.py [--requests 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asgi_wsgi import create_database  # noqa: E402
+from purchase_history import HEAVY_USER_ID  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from cinema_app.api import compression, renderers  # noqa: E402
+from cinema_app.models import CustomUser  # noqa: E402
+
+ENDPOINTS = ('/api/movie_session/', '/api/cinema_hall/', '/api/profile/')
+
+CONFIGURATIONS = (
+    ('before', 'stdlib', {}),
+    ('after', renderers.json_backend(), {'HTTP_ACCEPT_ENCODING': 'gzip, deflate, br'}),
+)
+
+
+class CPUTimer:
+    """
+    Adds up the CPU time spent in the wrapped functions.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            started = time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds += time.process_time() - started
+        return timed
+
+
+def measure(client, path, headers, requests):
+    render_timer, compress_timer = CPUTimer(), CPUTimer()
+    render, compress = renderers.FastJSONRenderer.render, compression.compress_response
+    renderers.FastJSONRenderer.render = render_timer.wrap(render)
+    compression.compress_response = compress_timer.wrap(compress)
+    try:
+        started = time.process_time()
+        for _ in range(requests):
+            response = client.get(path, **headers)
+        total = time.process_time() - started
+    finally:
+        renderers.FastJSONRenderer.render, compression.compress_response = render, compress
+    assert response.status_code == 200, response.status_code
+    return (len(response.content), total / requests * 1e6, render_timer.seconds / requests * 1e6,
+            compress_timer.seconds / requests * 1e6)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    create_database()
+    client = APIClient()
+    client.force_authenticate(CustomUser.objects.get(pk=HEAVY_USER_ID))
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['testserver']
+    for path in ENDPOINTS:
+        for name, backend, headers in CONFIGURATIONS:
+            with override_settings(API_JSON_BACKEND=backend):
+                client.get(path, **headers)
+                size, request_cpu, render_cpu, compress_cpu = measure(client, path, headers, args.requests)
+            print(f'{path:20} {name:6} ({backend}, {"gzip" if headers else "identity"}): {size:5} bytes, '
+                  f'CPU per request {request_cpu:5.0f} us, rendering {render_cpu:4.0f} us, '
+                  f'compression {compress_cpu:4.0f} us')
+
+
+if __name__ == '__main__':
+    main()
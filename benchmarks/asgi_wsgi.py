@@ -0,0 +1,164 @@
+"""
+Benchmark of one worker process serving many slow clients, on the movie session list and retrieve endpoints:
+    wsgi-sync:    the sync API under WSGI, gunicorn sync worker (one request at a time);
+    wsgi-gthread: the sync API under WSGI, gunicorn gthread worker (--threads);
+    asgi:         the async API under ASGI, uvicorn.
+
+The database is seeded in a temporary file. Every client keeps one request in flight over a new connection and
+is slow: it sends the request line, waits --client-delay seconds and then sends the headers. Requests not answered
+within --timeout seconds count as errors. Requires gunicorn and uvicorn (not dependencies of the project).
+
+Usage: python benchmarks/asgi_wsgi.py [--connections 500] [--seconds 20] [--client-delay 0.1] [--threads 32]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from purchase_history import DB_PATH, seed  # noqa: E402
+from django.apps import apps  # noqa: E402
+from django.db import connection  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'wsgi-sync': ('/api/movie_session/', lambda port, threads: [
+        '-m', 'gunicorn', 'cinema_house.wsgi:application', '--workers', '1', '--worker-class', 'sync',
+        '--bind', f'127.0.0.1:{port}', '--backlog', '2048', '--log-level', 'warning']),
+    'wsgi-gthread': ('/api/movie_session/', lambda port, threads: [
+        '-m', 'gunicorn', 'cinema_house.wsgi:application', '--workers', '1', '--worker-class', 'gthread',
+        '--threads', str(threads), '--bind', f'127.0.0.1:{port}', '--backlog', '2048', '--log-level', 'warning']),
+    'asgi': ('/api/async/movie_session/', lambda port, threads: [
+        '-m', 'uvicorn', 'cinema_house.asgi:application', '--workers', '1', '--port', str(port),
+        '--backlog', '2048', '--log-level', 'warning', '--no-access-log']),
+}
+
+
+def create_database(sessions=1000):
+    with connection.schema_editor() as editor:
+        for model in apps.get_models():
+            if model._meta.managed and not model._meta.proxy:
+                editor.create_model(model)
+    seed(100_000, 1_000)
+    today = date.today()
+    with connection.cursor() as cursor:
+        cursor.execute('UPDATE cinema_app_moviesession SET session_show_start_date = %s, session_show_end_date = %s, '
+                       "session_start_time = '23:00:00', session_end_time = '23:59:00' WHERE id <= %s",
+                       [today.isoformat(), (today + timedelta(days=30)).isoformat(), sessions])
+    connection.close()
+
+
+def write_settings(directory):
+    with open(os.path.join(directory, 'benchmark_settings.py'), 'w') as file:
+        file.write('from cinema_house.settings import *  # noqa\n'
+                   f"DATABASES = {{'default': {{**DATABASES['default'], 'NAME': {DB_PATH!r}}}}}\n"
+                   'DATABASE_REPLICAS = []\n'
+                   'DEBUG = False\n'
+                   "ALLOWED_HOSTS = ['*']\n")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def request(port, path, client_delay):
+    """
+    Returns: (HTTP status, seconds from the connection to the end of the response).
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\n'.encode())
+        await writer.drain()
+        if client_delay:
+            await asyncio.sleep(client_delay)
+        writer.write(b'Host: localhost\r\nConnection: close\r\n\r\n')
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status = int(response.split(b' ', 2)[1]) if response.startswith(b'HTTP/') else 0
+    return status, time.perf_counter() - started
+
+
+async def load(port, path, connections, seconds, client_delay, timeout):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(number):
+        nonlocal errors
+        rng = random.Random(number)
+        while time.perf_counter() < deadline:
+            target = path if rng.random() < 0.5 else f'{path}{rng.randint(1, 1000)}/'
+            try:
+                status, latency = await asyncio.wait_for(request(port, target, client_delay), timeout)
+            except (OSError, asyncio.TimeoutError):
+                status, latency = 0, None
+            if status == 200:
+                latencies.append(latency)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(client(number) for number in range(connections)))
+    return latencies, errors
+
+
+def wait_for(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'The server did not start on port {port}')
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connections', type=int, default=500)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--client-delay', type=float, default=0.1)
+    parser.add_argument('--threads', type=int, default=32, help='Threads of the gthread worker')
+    parser.add_argument('--timeout', type=float, default=10, help='Client timeout of a request in seconds')
+    args = parser.parse_args()
+
+    create_database()
+    directory = tempfile.mkdtemp()
+    write_settings(directory)
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'benchmark_settings',
+           'PYTHONPATH': os.pathsep.join([directory, ROOT, os.environ.get('PYTHONPATH', '')])}
+    print(f'{args.connections} connections, {args.seconds}s, client delay {args.client_delay}s, one worker process')
+    for name, (path, command) in SERVERS.items():
+        port = free_port()
+        server = subprocess.Popen([sys.executable, *command(port, args.threads)], cwd=ROOT, env=env)
+        try:
+            wait_for(port)
+            asyncio.run(load(port, path, 10, 2, 0, args.timeout))
+            latencies, errors = asyncio.run(load(port, path, args.connections, args.seconds, args.client_delay,
+                                                 args.timeout))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f'{name:12} ({path}): {len(latencies) / args.seconds:8.1f} requests/s, '
+              f'p50 {percentile(latencies, 0.5) * 1000:7.1f} ms, p99 {percentile(latencies, 0.99) * 1000:7.1f} ms, '
+              f'{errors} errors')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark of concurrent reads and purchases on SQLite, before and after the connection tuning:
+    before: the 'default' PRAGMA profile (rollback journal) and a new connection per request (CONN_MAX_AGE = 0);
+    after:  the 'tuned' PRAGMA profile (WAL, synchronous=NORMAL, cache, mmap, busy_timeout)
+            and persistent connections (CONN_MAX_AGE = 600).
+
+Each configuration runs in its own process on its own seeded database file: reader threads load the session list
+and a purchase history page, purchaser threads make purchases like PurchaseCreateAPIView (insert the purchase,
+update the free seats, the user total sum and the rollups in one transaction). Every operation is wrapped
+like a request (close_old_connections before and after).
+
+Usage: python benchmarks/db_concurrency.py [--readers 8] [--purchasers 2] [--seconds 10]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+CONFIGURATIONS = (
+    ('before', 'default', 0),
+    ('after', 'tuned', 600),
+)
+
+
+def run(profile, conn_max_age, readers, purchasers, seconds):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from purchase_history import create_schema, seed
+    from django.conf import settings
+    from django.db import OperationalError, close_old_connections, connection, connections, transaction
+    from django.db.models import F
+    from cinema_app.models import CustomUser, HallDayRollup, MovieDayRollup, MovieSession, Purchase, \
+        SessionDayRollup
+    from cinema_app.rollups import record_purchase
+
+    settings.SQLITE_PRAGMA_PROFILE = profile
+    connections['default'].settings_dict['CONN_MAX_AGE'] = conn_max_age
+    create_schema()
+    with connection.schema_editor() as editor:
+        for model in (SessionDayRollup, HallDayRollup, MovieDayRollup):
+            editor.create_model(model)
+    seed(100_000, 1_000)
+    connection.close()
+
+    counts = {'reads': 0, 'purchases': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def read(rng):
+        list(MovieSession.objects.select_related('hall').order_by('pk')[:20])
+        list(Purchase.objects.filter(user_id=rng.randint(2, 1000)).select_related('movie')
+             .order_by('-purchase_date', 'id')[:7])
+        return 'reads'
+
+    def purchase(rng):
+        movie = MovieSession.objects.get(pk=rng.randint(1, 1000))
+        user_id = rng.randint(2, 1000)
+        with transaction.atomic():
+            obj = Purchase.objects.create(user_id=user_id, movie=movie, quantity=1, purchase_sum=movie.ticket_price)
+            MovieSession.objects.filter(pk=movie.pk).update(free_seats=F('free_seats') - 1)
+            CustomUser.objects.filter(pk=user_id).update(total_sum=F('total_sum') + movie.ticket_price)
+            record_purchase(obj)
+        return 'purchases'
+
+    def worker(operation, seed_value):
+        rng = random.Random(seed_value)
+        done = {'reads': 0, 'purchases': 0, 'errors': 0}
+        while time.perf_counter() < deadline:
+            close_old_connections()
+            try:
+                done[operation(rng)] += 1
+            except OperationalError:
+                done['errors'] += 1
+            close_old_connections()
+        connection.close()
+        with lock:
+            for key, value in done.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=worker, args=(read, i)) for i in range(readers)]
+    threads += [threading.Thread(target=worker, args=(purchase, 1000 + i)) for i in range(purchasers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {key: round(value / seconds, 1) for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--purchasers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--configuration', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.configuration:
+        _, profile, conn_max_age = next(item for item in CONFIGURATIONS if item[0] == args.configuration)
+        print(json.dumps(run(profile, conn_max_age, args.readers, args.purchasers, args.seconds)))
+        return
+
+    for name, profile, conn_max_age in CONFIGURATIONS:
+        output = subprocess.run(
+            [sys.executable, __file__, '--configuration', name, '--readers', str(args.readers),
+             '--purchasers', str(args.purchasers), '--seconds', str(args.seconds)],
+            check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:6} (profile {profile!r}, CONN_MAX_AGE={conn_max_age}): {result['reads']} reads/s, "
+              f"{result['purchases']} purchases/s, {result['errors']} lock errors/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark of the streaming purchase export (cinema_app.export) on a seeded SQLite database:
+rows per second and peak Python memory for CSV and JSONL.
+
+The database is seeded like benchmarks/purchase_history.py.
+
+Usage: python benchmarks/export_throughput.py [--purchases 1000000] [--users 10000] [--chunk-size 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from purchase_history import DB_PATH, create_schema, seed  # noqa: E402
+from cinema_app.export import export_chunks  # noqa: E402
+
+
+def measure(file_format, rows, chunk_size):
+    started = time.perf_counter()
+    size = 0
+    for chunk in export_chunks('purchases', file_format, chunk_size=chunk_size):
+        size += len(chunk)
+    seconds = time.perf_counter() - started
+    # the peak memory is measured in a second pass: tracemalloc slows the export down several times
+    tracemalloc.start()
+    for _ in export_chunks('purchases', file_format, chunk_size=chunk_size):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'{file_format:5}: {rows / seconds:,.0f} rows/s, {size / 2 ** 20:.1f} MiB in {seconds:.2f}s, '
+          f'peak memory {peak / 2 ** 20:.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--purchases', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    create_schema()
+    seed(args.purchases, args.users)
+    print(f'seeded {args.purchases} purchases ({DB_PATH})')
+    for file_format in ('csv', 'jsonl'):
+        measure(file_format, args.purchases, args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
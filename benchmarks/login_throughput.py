@@ -0,0 +1,92 @@
+"""
+Benchmark of the login endpoints on a temporary SQLite database, end to end: URL routing, the middleware,
+the authentication backends (with the project hasher settings), the user lookup and the token issue.
+
+Compares the sync API login (/api/login/, one request at a time, what one sync worker does) with the async
+API login (/api/async/login/, --concurrency requests in flight, the passwords checked in the hashing pool)
+and reports logins per second in total and per core of the pool.
+
+Usage: python benchmarks/login_throughput.py [--logins 64] [--concurrency 16]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cinema_house.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DIRECTORY = tempfile.mkdtemp()
+settings.DATABASES['default']['NAME'] = os.path.join(DIRECTORY, 'login_throughput.sqlite3')
+settings.CACHES['tokens']['LOCATION'] = os.path.join(DIRECTORY, 'tokens')
+django.setup()
+
+from django.apps import apps  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import AsyncClient, Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from cinema_app.hashing import hashing_pool  # noqa: E402
+from cinema_app.models import CustomUser  # noqa: E402
+
+CREDENTIALS = {'username': 'user', 'password': 'SuperPass3'}
+
+
+def create_database():
+    with connection.schema_editor() as editor:
+        for model in apps.get_models():
+            if model._meta.managed and not model._meta.proxy:
+                editor.create_model(model)
+    CustomUser.objects.create_user(email='user@email.com', **CREDENTIALS)
+
+
+def bench_sync(logins):
+    client = Client()
+    client.post('/api/login/', CREDENTIALS, content_type='application/json')
+    started = time.perf_counter()
+    for _ in range(logins):
+        response = client.post('/api/login/', CREDENTIALS, content_type='application/json')
+        assert response.status_code == 200, response.content
+    return logins / (time.perf_counter() - started)
+
+
+async def bench_async(logins, concurrency):
+    client = AsyncClient()
+    await client.post('/api/async/login/', CREDENTIALS, content_type='application/json')
+    pending = iter(range(logins))
+
+    async def worker():
+        for _ in pending:
+            response = await client.post('/api/async/login/', CREDENTIALS, content_type='application/json')
+            assert response.status_code == 200, response.content
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return logins / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16, help='Async logins in flight')
+    args = parser.parse_args()
+
+    setup_test_environment(debug=False)
+    create_database()
+    encoded = CustomUser.objects.get().password
+    sequential = bench_sync(args.logins)
+    concurrent = asyncio.run(bench_async(args.logins, args.concurrency))
+    workers = hashing_pool.workers
+    print(f'hasher: {encoded.split("$")[0]}, iterations: {encoded.split("$")[1]}, logins: {args.logins}')
+    print(f'sync /api/login/ (1 worker):            {sequential:8.1f} logins/s')
+    print(f'async /api/async/login/ ({workers} pool workers): {concurrent:8.1f} logins/s, '
+          f'{concurrent / workers:8.1f} logins/s per core')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark of the per-user purchase history page (UserProfileView / ProfileApiView access path)
+on a seeded SQLite database, with and without the (user, -purchase_date, id) index.
+
+The database is created in a temporary file; by default 10M purchases are seeded over 100k users,
+one "heavy" user owning 1% of them.
+
+Usage: python benchmarks/purchase_history.py [--purchases 10000000] [--users 100000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cinema_house.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'purchase_history.sqlite3')
+settings.DATABASES['default']['NAME'] = DB_PATH
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from cinema_app.models import CinemaHall, CustomUser, MovieSession, Purchase  # noqa: E402
+from cinema_app.views import UserProfileView  # noqa: E402
+
+HEAVY_USER_ID = 1
+
+
+def create_schema():
+    with connection.schema_editor() as editor:
+        for model in (CustomUser, CinemaHall, MovieSession, Purchase):
+            editor.create_model(model)
+
+
+def seed(purchases, users, days=3650, batch=200_000):
+    rng = random.Random(42)
+    today = date.today()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO cinema_app_customuser (id, password, is_superuser, username, first_name, last_name, email, '
+            'is_staff, is_active, date_joined, total_sum, token_version) '
+            "VALUES (?, '', 0, ?, '', '', ?, 0, 1, ?, 0, 0)",
+            [(i, f'user{i}', f'user{i}@email.com', today.isoformat()) for i in range(1, users + 1)])
+        cursor.execute("INSERT INTO cinema_app_cinemahall (id, hall_name, hall_size) VALUES (1, 'Hall', 500)")
+        cursor.executemany(
+            'INSERT INTO cinema_app_moviesession (id, hall_id, movie_title, movie_description, free_seats, '
+            "ticket_price) VALUES (?, 1, ?, 'Benchmark movie session', 500, 100)",
+            [(i, f'Movie {i}') for i in range(1, 1001)])
+        heavy_share = purchases // 100
+        for start in range(0, purchases, batch):
+            rows = []
+            for i in range(start, min(start + batch, purchases)):
+                user_id = HEAVY_USER_ID if i % 100 == 0 and i // 100 < heavy_share else rng.randint(2, users)
+                rows.append((user_id, rng.randint(1, 1000),
+                             (today - timedelta(days=rng.randint(0, days - 1))).isoformat(), 100, 1))
+            cursor.executemany('INSERT INTO cinema_app_purchase (user_id, movie_id, purchase_date, purchase_sum, '
+                               'quantity) VALUES (?, ?, ?, ?, ?)', rows)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def history_page():
+    view = UserProfileView()
+    view.request = RequestFactory().get('/profile/')
+    view.request.user = CustomUser(id=HEAVY_USER_ID)
+    view.kwargs = {}
+    queryset = view.get_queryset().order_by(*view.ordering)
+    count = queryset.count()
+    page = list(queryset[:view.paginate_by])
+    return count, page, str(queryset[:view.paginate_by].query)
+
+
+def measure(repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        history_page()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return '; '.join(row[-1] for row in cursor.fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--purchases', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    create_schema()
+    index = Purchase._meta.indexes[0]
+    with connection.schema_editor() as editor:
+        editor.remove_index(Purchase, index)
+    started = time.perf_counter()
+    seed(args.purchases, args.users)
+    print(f'seeded {args.purchases} purchases in {time.perf_counter() - started:.1f}s ({DB_PATH})')
+
+    count, page, sql = history_page()
+    print(f'heavy user purchases: {count}')
+    print(f'without index: plan: {query_plan(sql)}')
+    median, worst = measure(args.repeat)
+    print(f'without index: median {median:.2f} ms, max {worst:.2f} ms per page (count + 7 rows)')
+
+    started = time.perf_counter()
+    with connection.schema_editor() as editor:
+        editor.add_index(Purchase, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    print(f'index built in {time.perf_counter() - started:.1f}s')
+    print(f'with index:    plan: {query_plan(sql)}')
+    median, worst = measure(args.repeat)
+    print(f'with index:    median {median:.2f} ms, max {worst:.2f} ms per page (count + 7 rows)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark of the counter reconciliation (cinema_app.reconcile) on a seeded SQLite database.
+
+The database is seeded like benchmarks/purchase_history.py (10M purchases by default); the seeded counters are
+not maintained, so every session and every user with purchases drifts and is repaired.
+
+Usage: python benchmarks/reconcile.py [--purchases 10000000] [--users 100000] [--chunk-size 10000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from purchase_history import DB_PATH, create_schema, seed  # noqa: E402
+from django.db import connection  # noqa: E402
+from cinema_app.models import ArchivedMovieSession, ArchivedPurchase  # noqa: E402
+from cinema_app.reconcile import reconcile_counters  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--purchases', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    create_schema()
+    with connection.schema_editor() as editor:
+        for model in (ArchivedMovieSession, ArchivedPurchase):
+            editor.create_model(model)
+    started = time.perf_counter()
+    seed(args.purchases, args.users)
+    print(f'seeded {args.purchases} purchases in {time.perf_counter() - started:.1f}s ({DB_PATH})')
+
+    for repair in (False, True, False):
+        report = reconcile_counters(repair=repair, chunk_size=args.chunk_size)
+        print(f"repair={repair}: {report['seconds']}s, "
+              f"free_seats drifted {report['free_seats']['drifted']} repaired {report['free_seats']['repaired']}, "
+              f"total_sum drifted {report['total_sum']['drifted']} repaired {report['total_sum']['repaired']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark of the overhead of the request metrics (RequestMetricsMiddleware and the record_query execute wrapper):
+    middleware: the middleware around a view that returns at once (the cost of the measuring alone);
+    query:      one SELECT with and without the execute wrapper, inside a measured request;
+    request:    GET /api/movie_session/ through the whole stack, with and without the middleware
+                (the best of 3 rounds).
+
+Usage: python benchmarks/request_metrics.py [--requests 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asgi_wsgi import create_database  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test import Client, RequestFactory, override_settings  # noqa: E402
+from django.urls import resolve  # noqa: E402
+from cinema_app.metrics import RequestMeasurements, current_request, record_query  # noqa: E402
+from cinema_app.middleware import RequestMetricsMiddleware  # noqa: E402
+
+
+def per_call(func, repeat):
+    """
+    Returns: the mean wall time of func() in microseconds.
+    """
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    request = RequestFactory().get('/api/movie_session/')
+    request.resolver_match = resolve('/api/movie_session/')
+    response = HttpResponse(b'x' * 2000)
+    response['Content-Length'] = '2000'
+
+    def view(request):
+        return response
+
+    bare = per_call(lambda: view(request), args.requests * 50)
+    measured = per_call(lambda: RequestMetricsMiddleware(view)(request), args.requests * 50)
+    middleware = RequestMetricsMiddleware(view)
+    measured_only = per_call(lambda: middleware(request), args.requests * 50)
+    print(f'middleware: {measured_only - bare:5.1f} us per request '
+          f'({measured - bare:5.1f} us including the construction of the middleware)')
+
+    create_database()
+    with connection.cursor() as cursor:
+        def query():
+            cursor.execute('SELECT 1')
+        token = current_request.set(RequestMeasurements())
+        wrappers = connection.execute_wrappers[:]
+        try:
+            connection.execute_wrappers[:] = [wrapper for wrapper in wrappers if wrapper is not record_query]
+            without = per_call(query, args.requests * 10)
+            connection.execute_wrappers.append(record_query)
+            with_wrapper = per_call(query, args.requests * 10)
+        finally:
+            connection.execute_wrappers[:] = wrappers
+            current_request.reset(token)
+    print(f'query:      {without:5.1f} us without, {with_wrapper:5.1f} us with the wrapper '
+          f'({with_wrapper - without:4.1f} us per query)')
+
+    settings.DEBUG = False
+    client = Client()
+    without_middleware = [name for name in settings.MIDDLEWARE
+                          if name != 'cinema_app.middleware.RequestMetricsMiddleware']
+    results = {'without': [], 'with': []}
+    for _ in range(3):
+        for name, middleware in (('without', without_middleware), ('with', settings.MIDDLEWARE)):
+            with override_settings(MIDDLEWARE=middleware, ALLOWED_HOSTS=['testserver']):
+                results[name].append(per_call(lambda: client.get('/api/movie_session/'), args.requests))
+    results = {name: min(values) for name, values in results.items()}
+    print(f'request:    {results["without"]:7.1f} us without, {results["with"]:7.1f} us with the metrics '
+          f'({results["with"] - results["without"]:5.1f} us per request)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark of the render time of a 50-row schedule page (cinema.html), for each role of the user:
+    before: the three per-role loops that render every row on every request;
+    cold:   {% row_fragments %} with an empty fragment cache (every row rendered and stored);
+    warm:   {% row_fragments %} with the fragments of the rows cached (the page only assembles them).
+
+The rows are unsaved MovieSession instances, no database is used. The fragment cache is the 'default' cache
+of the settings (the local memory cache unless CACHES is configured).
+
+Usage: python benchmarks/template_render.py [--rows 50] [--repeat 500]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import purchase_history  # noqa: E402,F401 - configures Django
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.core.paginator import Paginator  # noqa: E402
+from django.template import engines  # noqa: E402
+from django.template.loader import get_template  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from cinema_app.models import CustomUser, MovieSession  # noqa: E402
+
+PAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'cinema.html')
+ROWS_TAG = "{% row_fragments 'fragments/movie_session_row.html' moviesession_list purchase_form=purchase_form %}"
+
+BEFORE_ROWS = """
+    {% if user.is_anonymous %}
+         {% for movie in moviesession_list %}
+         <h3>Movie: {{ movie.movie_title }} <br> Descriptions: {{ movie.movie_description }} <br>
+         Show date from: {{ movie.session_show_start_date |date:"d/M/Y"}} <br>
+         Movie start time: {{ movie.session_start_time |time:"H:i"}} <br> Ticket price: {{ movie.ticket_price }} UAH <br>
+         Free seats left: {{ movie.free_seats }}
+         </h3>
+         {% endfor %}
+    {% endif %}
+    {% if user.is_authenticated and user.is_superuser == False %}
+         {% for movie in moviesession_list %}
+         <h3> <a href="{% url 'movie_details' movie.id %}"> {{ movie.movie_title  }}</a><br>
+         Descriptions: {{ movie.movie_description }} <br>
+         Show date from: {{ movie.session_show_start_date |date:"d/M/Y"}} <br>
+         Movie start time: {{ movie.session_start_time |time:"H:i"}} <br> Ticket price: {{ movie.ticket_price }} UAH <br>
+         Free seats left: {{ movie.free_seats }}</h3>
+         {% endfor %}
+    {% endif %}
+    {% if user.is_superuser %}
+        {% for movie in moviesession_list %}
+         <h3>Movie: {{ movie.movie_title }}, Descriptions: {{ movie.movie_description }},
+         Show date from {{ movie.session_show_start_date }} to {{ movie.session_show_end_date }}
+         <form method='post' action="{% url 'change_movie_session' movie.id %}">
+         {% csrf_token %}
+             {{ purchase_form.as_p }}
+         <input type="button" value="Change it" onclick="window.location.href='{% url 'change_movie_session' movie.id %}'">
+         </form></h3>
+         {% endfor %}
+    {% endif %}
+"""
+
+USERS = {
+    'anonymous': AnonymousUser(),
+    'user': CustomUser(pk=1, username='user'),
+    'superuser': CustomUser(pk=2, username='admin', is_superuser=True, is_staff=True),
+}
+
+
+def rows(count):
+    return [MovieSession(pk=pk, movie_title=f'Movie {pk}', movie_description='A movie session description ' * 4,
+                         hall_id=1, session_show_start_date=date(2023, 8, 1), session_show_end_date=date(2099, 12, 31),
+                         session_start_time=dtime(15, 0), session_end_time=dtime(17, 0), ticket_price=10 + pk % 5,
+                         free_seats=50)
+            for pk in range(1, count + 1)]
+
+
+def measure(template, context, request, repeat, clear=None):
+    """
+    Returns: the mean render time in milliseconds.
+    """
+    template.render(context, request)
+    elapsed = 0.0
+    for _ in range(repeat):
+        if clear:
+            clear()
+        started = time.perf_counter()
+        template.render(context, request)
+        elapsed += time.perf_counter() - started
+    return elapsed / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    settings.DEBUG = False
+    with open(PAGE) as file:
+        page = file.read()
+    assert ROWS_TAG in page, 'cinema.html does not render the rows with {% row_fragments %}'
+    before = engines['django'].from_string(page.replace(ROWS_TAG, BEFORE_ROWS))
+    after = get_template('cinema.html')
+    cache = caches[settings.FRAGMENT_CACHE_ALIAS]
+    object_list = rows(args.rows)
+    page_obj = Paginator(object_list, args.rows).page(1)
+    context = {'moviesession_list': object_list, 'object_list': object_list, 'page_obj': page_obj}
+    print(f'cinema.html, {args.rows} rows, mean of {args.repeat} renders')
+    for role, user in USERS.items():
+        request = RequestFactory().get('/')
+        request.user = user
+        results = (
+            ('before', measure(before, context, request, args.repeat)),
+            ('cold', measure(after, context, request, args.repeat, clear=cache.clear)),
+            ('warm', measure(after, context, request, args.repeat)),
+        )
+        print(f'{role:10} ' + ', '.join(f'{name} {ms:6.2f} ms' for name, ms in results))
+
+
+if __name__ == '__main__':
+    main()
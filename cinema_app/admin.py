@@ -1,5 +1,6 @@
 from django.contrib import admin
-from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
+from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase, RefreshToken, SessionDayRollup, \
+    HallDayRollup, MovieDayRollup, ArchivedMovieSession, ArchivedPurchase, ArchivedSessionDayRollup
 
 # Register your models here.
 
@@ -8,3 +9,45 @@ admin.site.register(CustomUser)
 admin.site.register(CinemaHall)
 admin.site.register(MovieSession)
 admin.site.register(Purchase)
+admin.site.register(RefreshToken)
+admin.site.register(ArchivedMovieSession)
+admin.site.register(ArchivedPurchase)
+
+
+class RollupAdmin(admin.ModelAdmin):
+    """
+    Read-only reports: the rollups are maintained by the purchases and the rebuild_rollups command.
+    """
+    list_filter = ['day']
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SessionDayRollup)
+class SessionDayRollupAdmin(RollupAdmin):
+    list_display = ['day', 'session', 'purchases', 'tickets', 'revenue']
+    list_select_related = ['session']
+
+
+@admin.register(ArchivedSessionDayRollup)
+class ArchivedSessionDayRollupAdmin(SessionDayRollupAdmin):
+    pass
+
+
+@admin.register(HallDayRollup)
+class HallDayRollupAdmin(RollupAdmin):
+    list_display = ['day', 'hall', 'purchases', 'tickets', 'revenue']
+    list_select_related = ['hall']
+
+
+@admin.register(MovieDayRollup)
+class MovieDayRollupAdmin(RollupAdmin):
+    list_display = ['day', 'movie_title', 'purchases', 'tickets', 'revenue']
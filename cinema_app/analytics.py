@@ -0,0 +1,242 @@
+"""
+Occupancy and pricing analytics of the movie sessions.
+
+The sales per session and day are loaded into columns (session, day, tickets, revenue), from the session-day
+rollups or by summing the purchases (the hot and the archived ones, see cinema_app.archive), and aggregated
+per session:
+    load factor: sold tickets / hall size;
+    revenue per seat-hour: revenue / (hall size * session duration in hours);
+    sell-out velocity: sold tickets per day of sales (from the first to the last purchase day);
+    demand by hour: sold tickets by the start hour of the session.
+
+With NumPy installed (optional dependency) the columns are arrays and every metric is computed with array
+operations; without NumPy, or with backend='python', the same metrics are computed with plain Python.
+"""
+
+from datetime import date, datetime
+from django.db import connection
+from django.db.models import CharField, F, Sum
+from django.db.models.functions import Cast
+from cinema_app.models import ArchivedMovieSession, ArchivedPurchase, ArchivedSessionDayRollup, MovieSession, \
+    Purchase, SessionDayRollup
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+BACKENDS = ('numpy', 'python')
+
+SOURCES = ('rollups', 'purchases')
+
+SESSION_METRICS = ('tickets', 'revenue', 'load_factor', 'revenue_per_seat_hour', 'sales_days', 'velocity')
+
+
+def default_backend():
+    return 'numpy' if np is not None else 'python'
+
+
+def _duration_hours(start, end):
+    if start is None or end is None:
+        return None
+    seconds = (datetime.combine(date.min, end) - datetime.combine(date.min, start)).total_seconds()
+    return (seconds if seconds > 0 else seconds + 24 * 3600) / 3600
+
+
+def load_sessions():
+    """
+    Returns a list of dicts with id, movie_title, hall, hall_size, start_hour and duration_hours of all sessions
+    (the hot and the archived ones, which keep their ids), ordered by id.
+    """
+    rows = []
+    for model in (MovieSession, ArchivedMovieSession):
+        rows += model.objects.order_by().values_list(
+            'id', 'movie_title', 'hall_id', 'hall__hall_size', 'session_start_time', 'session_end_time')
+    return [
+        {'id': pk, 'movie_title': title, 'hall': hall, 'hall_size': hall_size,
+         'start_hour': start.hour if start is not None else None, 'duration_hours': _duration_hours(start, end)}
+        for pk, title, hall, hall_size, start, end in sorted(rows)
+    ]
+
+
+def _filter_days(queryset, field, date_from, date_to):
+    if date_from:
+        queryset = queryset.filter(**{f'{field}__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{field}__lte': date_to})
+    return queryset
+
+
+def sales_queryset(date_from=None, date_to=None, source='rollups'):
+    """
+    Returns a values_list queryset of (session id, day as an ISO string, tickets, revenue) rows, one per session
+    and day, of the hot and the archived sessions (a UNION ALL of the two tables). The 'rollups' source reads
+    SessionDayRollup and ArchivedSessionDayRollup (maintained with every purchase, see cinema_app.rollups);
+    the 'purchases' source sums Purchase and ArchivedPurchase per session and day, which scans the purchase tables.
+    """
+    # the rows are read with a plain cursor in the SQL column order: fields first, then annotations in order
+    if source == 'rollups':
+        hot, archived = (
+            _filter_days(model.objects.order_by(), 'day', date_from, date_to).annotate(
+                iso_day=Cast('day', output_field=CharField()), day_tickets=F('tickets'), day_revenue=F('revenue')
+            ).values_list('session_id', 'iso_day', 'day_tickets', 'day_revenue')
+            for model in (SessionDayRollup, ArchivedSessionDayRollup))
+        return hot.union(archived, all=True)
+    if source == 'purchases':
+        hot, archived = (
+            _filter_days(model.objects.order_by(), 'purchase_date', date_from, date_to).values(
+                'movie_id', iso_day=Cast('purchase_date', output_field=CharField())
+            ).annotate(
+                day_tickets=Sum('quantity'), day_revenue=Sum('purchase_sum')
+            ).values_list('movie_id', 'iso_day', 'day_tickets', 'day_revenue')
+            for model in (Purchase, ArchivedPurchase))
+        return hot.union(archived, all=True)
+    raise ValueError(f'Unknown analytics source: {source}')
+
+
+def iter_sales_columns(date_from=None, date_to=None, source='rollups', chunk_size=100000):
+    """
+    Yields the sales per session and day as (session ids, days, tickets, revenues) column tuples
+    of up to chunk_size rows. The rows are fetched with a plain cursor and the days as ISO strings,
+    so no per-row model instances nor date converters are created.
+    """
+    sql, params = sales_queryset(date_from, date_to, source).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield tuple(zip(*rows))
+
+
+class DayOrdinals(dict):
+    """
+    Maps ISO day strings to date ordinals, parsing each distinct day once.
+    """
+
+    def __missing__(self, day):
+        self[day] = ordinal = date.fromisoformat(day[:10]).toordinal()
+        return ordinal
+
+
+def _compute_python(sessions, chunks):
+    index = {session['id']: i for i, session in enumerate(sessions)}
+    size = len(sessions)
+    tickets, revenue = [0] * size, [0] * size
+    first, last = [None] * size, [None] * size
+    ordinals = DayOrdinals()
+    for session_ids, days, day_tickets, day_revenue in chunks:
+        for session_id, day, quantity, total in zip(session_ids, days, day_tickets, day_revenue):
+            i = index[session_id]
+            tickets[i] += quantity
+            revenue[i] += total
+            day = ordinals[day]
+            first[i] = day if first[i] is None else min(first[i], day)
+            last[i] = day if last[i] is None else max(last[i], day)
+
+    metrics = {metric: [] for metric in SESSION_METRICS}
+    demand = [0] * 24
+    for i, session in enumerate(sessions):
+        hall_size, duration = session['hall_size'], session['duration_hours']
+        sales_days = last[i] - first[i] + 1 if first[i] is not None else 0
+        metrics['tickets'].append(tickets[i])
+        metrics['revenue'].append(revenue[i])
+        metrics['load_factor'].append(tickets[i] / hall_size if hall_size else None)
+        metrics['revenue_per_seat_hour'].append(revenue[i] / (hall_size * duration) if hall_size and duration
+                                                else None)
+        metrics['sales_days'].append(sales_days)
+        metrics['velocity'].append(tickets[i] / sales_days if sales_days else 0.0)
+        if session['start_hour'] is not None:
+            demand[session['start_hour']] += tickets[i]
+    return metrics, demand
+
+
+def _compute_numpy(sessions, chunks):
+    ids = np.array([session['id'] for session in sessions], dtype=np.int64)
+    hall_size = np.array([session['hall_size'] for session in sessions], dtype=np.float64)
+    duration = np.array([session['duration_hours'] or 0 for session in sessions], dtype=np.float64)
+    start_hour = np.array([-1 if session['start_hour'] is None else session['start_hour'] for session in sessions],
+                          dtype=np.int64)
+    size = len(sessions)
+    tickets, revenue = np.zeros(size, dtype=np.int64), np.zeros(size, dtype=np.int64)
+    no_day = np.iinfo(np.int64).max
+    first, last = np.full(size, no_day, dtype=np.int64), np.full(size, -no_day, dtype=np.int64)
+    for session_ids, days, day_tickets, day_revenue in chunks:
+        position = np.searchsorted(ids, np.array(session_ids, dtype=np.int64))
+        # days since the epoch, parsed by NumPy (only the differences of the days are used)
+        days = np.array(days, dtype='U10').astype('datetime64[D]').astype(np.int64)
+        tickets += np.bincount(position, weights=np.array(day_tickets, dtype=np.int64),
+                               minlength=size).astype(np.int64)
+        revenue += np.bincount(position, weights=np.array(day_revenue, dtype=np.int64),
+                               minlength=size).astype(np.int64)
+        np.minimum.at(first, position, days)
+        np.maximum.at(last, position, days)
+
+    sold = first != no_day
+    sales_days = np.where(sold, last - first + 1, 0)
+    seat_hours = hall_size * duration
+    with np.errstate(divide='ignore', invalid='ignore'):
+        load_factor = np.where(hall_size > 0, tickets / hall_size, np.nan)
+        revenue_per_seat_hour = np.where(seat_hours > 0, revenue / seat_hours, np.nan)
+        velocity = np.where(sales_days > 0, tickets / np.maximum(sales_days, 1), 0.0)
+    scheduled = start_hour >= 0
+    demand = np.bincount(start_hour[scheduled], weights=tickets[scheduled], minlength=24).astype(np.int64)
+
+    def to_list(array):
+        return [None if value != value else value for value in array.tolist()]
+
+    metrics = {
+        'tickets': tickets.tolist(),
+        'revenue': revenue.tolist(),
+        'load_factor': to_list(load_factor),
+        'revenue_per_seat_hour': to_list(revenue_per_seat_hour),
+        'sales_days': sales_days.tolist(),
+        'velocity': velocity.tolist(),
+    }
+    return metrics, demand.tolist()
+
+
+def occupancy_report(date_from=None, date_to=None, backend=None, source='rollups'):
+    """
+    Computes the analytics of the purchases made between date_from and date_to (both optional),
+    read from source ('rollups' or 'purchases', see sales_queryset).
+
+    Returns: a dict with
+        backend: 'numpy' or 'python';
+        sessions: a list of dicts per session (id, movie_title, hall, hall_size and the SESSION_METRICS);
+        demand_by_hour: a list of the sold tickets by the start hour (0 - 23) of the sessions;
+        totals: tickets, revenue and the overall load factor and revenue per seat-hour of the sessions that sold
+            tickets between date_from and date_to (the seats of the sessions without sales in the range are not
+            counted, so a date range does not dilute the totals with the seats of the other sessions).
+    """
+    backend = backend or default_backend()
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown analytics backend: {backend}')
+    if backend == 'numpy' and np is None:
+        raise ImportError('The numpy analytics backend requires NumPy')
+    sessions = load_sessions()
+    compute = _compute_numpy if backend == 'numpy' else _compute_python
+    metrics, demand = compute(sessions, iter_sales_columns(date_from, date_to, source))
+
+    rows = []
+    for i, session in enumerate(sessions):
+        row = {key: session[key] for key in ('id', 'movie_title', 'hall', 'hall_size')}
+        row.update({metric: metrics[metric][i] for metric in SESSION_METRICS})
+        rows.append(row)
+    tickets, revenue = sum(metrics['tickets']), sum(metrics['revenue'])
+    sold = [session for session, sales_days in zip(sessions, metrics['sales_days']) if sales_days]
+    seats = sum(session['hall_size'] for session in sold)
+    seat_hours = sum(session['hall_size'] * session['duration_hours'] for session in sold
+                     if session['duration_hours'])
+    return {
+        'backend': backend,
+        'sessions': rows,
+        'demand_by_hour': demand,
+        'totals': {
+            'tickets': tickets,
+            'revenue': revenue,
+            'load_factor': tickets / seats if seats else None,
+            'revenue_per_seat_hour': revenue / seat_hours if seat_hours else None,
+        },
+    }
@@ -0,0 +1,205 @@
+"""
+Async (ASGI) versions of the API login (obtain_auth_token) and registration (CustomUserCreateAPIView),
+of the movie session list / retrieve (MovieSessionViewSet), the purchase history (ProfileApiView)
+and the purchase (PurchaseCreateAPIView).
+DRF views are synchronous, so these are plain Django async views returning the same payloads.
+The reads use the async ORM; the purchase transactions run in the bounded purchase pool (see cinema_app.pools).
+"""
+
+import json
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from cinema_app.api.authentication import issue_token_pair
+from cinema_app.api.resourses import ProfileApiView, filter_movie_sessions, save_purchase
+from cinema_app.api.serializers import CustomUserSerializer, MovieSessionSerializer, PurchaseReadSerializer, \
+    PurchaseSerializer
+from cinema_app.archive import PurchaseHistory
+from cinema_app.async_views import apaginate, authenticate_async
+from cinema_app.hashing import hashing_pool, PasswordHashingBusy
+from cinema_app.models import ArchivedPurchase, CustomUser, MovieSession, Purchase
+from cinema_app.pools import PoolBusy, purchase_pool
+
+
+def busy_json_response():
+    response = JsonResponse({'detail': 'The server is busy, please try again later.'}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+def api_error_response(error):
+    """
+    The JSON response of a REST framework exception (NotAuthenticated, AuthenticationFailed, ...).
+    """
+    response = JsonResponse({'detail': str(error.detail)}, status=error.status_code)
+    if error.status_code == 401:
+        response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+async def authenticate_api(request):
+    """
+    Authenticates the request with the DEFAULT_AUTHENTICATION_CLASSES off the event loop.
+    Returns: the authenticated user; raises NotAuthenticated or AuthenticationFailed.
+    """
+    api_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    user = await sync_to_async(lambda: api_request.user)()
+    if not user.is_authenticated:
+        raise NotAuthenticated()
+    return user
+
+
+async def paginated_response(request, object_list, serializer_class):
+    """
+    The async equivalent of the PageNumberPagination response of a list view.
+    """
+    try:
+        paginator, page = await apaginate(object_list, api_settings.PAGE_SIZE, request.GET.get('page'))
+    except Http404:
+        return JsonResponse({'detail': 'Invalid page.'}, status=404)
+    url = request.build_absolute_uri()
+    previous = None
+    if page.has_previous():
+        previous = replace_query_param(url, 'page', page.previous_page_number()) \
+            if page.previous_page_number() > 1 else remove_query_param(url, 'page')
+    return JsonResponse({
+        'count': paginator.count,
+        'next': replace_query_param(url, 'page', page.next_page_number()) if page.has_next() else None,
+        'previous': previous,
+        'results': serializer_class(page.object_list, many=True).data,
+    })
+
+
+class AsyncApiView(View):
+    """
+    A base class of the async API views: parses JSON or form data, exempts the view from CSRF checks
+    (like DRF APIView for token clients) and allows only POST.
+    """
+    http_method_names = ['post']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    @staticmethod
+    def get_data(request):
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError:
+                return {}
+        return request.POST.dict()
+
+
+class AsyncObtainAuthTokenApiView(AsyncApiView):
+    query_budget = 6
+
+    async def post(self, request, *args, **kwargs):
+        data = self.get_data(request)
+        try:
+            user = await authenticate_async(request, data.get('username'), data.get('password'))
+        except PasswordHashingBusy:
+            return busy_json_response()
+        if user is None:
+            return JsonResponse({'non_field_errors': ['Unable to log in with provided credentials.']}, status=400)
+        token, refresh = await sync_to_async(issue_token_pair)(user)
+        return JsonResponse({'token': token.key, 'refresh': refresh})
+
+
+class AsyncCustomUserCreateApiView(AsyncApiView):
+    query_budget = 5
+
+    async def post(self, request, *args, **kwargs):
+        serializer = CustomUserSerializer(data=self.get_data(request))
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=400)
+
+        data = serializer.validated_data
+        user = CustomUser(username=CustomUser.normalize_username(data['username']),
+                          email=CustomUser.objects.normalize_email(data.get('email')))
+        try:
+            user.password = await hashing_pool.make_password(data['password'])
+        except PasswordHashingBusy:
+            return busy_json_response()
+        try:
+            await sync_to_async(CustomUserSerializer.insert_user)(user.save, user.email)
+        except ValidationError as error:
+            return JsonResponse(error.detail, status=400)
+        return JsonResponse(CustomUserSerializer(user).data, status=201)
+
+
+class AsyncMovieSessionApiView(View):
+    """
+    The list and retrieve actions of MovieSessionViewSet (GET, open to everybody).
+    """
+    query_budget = 3
+    http_method_names = ['get']
+
+    async def get(self, request, pk=None, *args, **kwargs):
+        queryset = MovieSession.objects.filter(session_show_end_date__gt=timezone.now())
+        if pk is not None:
+            movie = await queryset.filter(pk=pk).afirst()
+            if movie is None:
+                return JsonResponse({'detail': 'Not found.'}, status=404)
+            return JsonResponse(MovieSessionSerializer(movie).data)
+        queryset = filter_movie_sessions(queryset, request.GET)
+        return await paginated_response(request, queryset, MovieSessionSerializer)
+
+
+class AsyncProfileApiView(View):
+    """
+    The purchase history of ProfileApiView: of the user, or of all users for the superuser.
+    """
+    query_budget = 5
+    http_method_names = ['get']
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            user = await authenticate_api(request)
+        except APIException as error:
+            return api_error_response(error)
+        hot, archived = Purchase.objects.all(), ArchivedPurchase.objects.all()
+        if not user.is_superuser:
+            hot, archived = hot.filter(user=user), archived.filter(user=user)
+        history = PurchaseHistory(hot, archived, prepare=lambda queryset: queryset.select_related(
+            'user', 'movie').only(*ProfileApiView.rendered_fields))
+        return await paginated_response(request, history, PurchaseReadSerializer)
+
+
+def create_purchase(user, data):
+    """
+    Validates and saves a purchase like PurchaseCreateAPIView. Runs in a thread of the purchase pool.
+    Returns: the response payload and status.
+    """
+    close_old_connections()
+    try:
+        serializer = PurchaseSerializer(data=data, context={'user': user})
+        if not serializer.is_valid():
+            return serializer.errors, 400
+        save_purchase(serializer, user)
+        return serializer.data, 201
+    finally:
+        close_old_connections()
+
+
+class AsyncPurchaseCreateApiView(AsyncApiView):
+    query_budget = 10
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            user = await authenticate_api(request)
+        except APIException as error:
+            return api_error_response(error)
+        try:
+            data, status = await purchase_pool.run(create_purchase, user, self.get_data(request))
+        except PoolBusy:
+            return busy_json_response()
+        return JsonResponse(data, status=status)
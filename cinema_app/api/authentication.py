@@ -1,16 +1,223 @@
-from datetime import timedelta
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.db.models.base import DEFERRED
 from django.utils import timezone
 from rest_framework import exceptions
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from cinema_app.api.token_cache import token_cache, USER_SNAPSHOT_FIELDS
+from cinema_app.models import CustomUser, RefreshToken
+from cinema_app.timing import span
 from cinema_house.settings import TOKEN_LIFETIME
 
 
+def expire_token(key):
+    """
+    Deletes the token from the database and drops it from the token cache.
+    """
+    Token.objects.filter(key=key).delete()
+    token_cache.invalidate(key)
+
+
+def user_from_snapshot(snapshot):
+    """
+    Builds a CustomUser instance from the cached snapshot.
+    Fields that are not in the snapshot (e.g. total_sum) are deferred, so they are loaded from the database
+    only when somebody reads them and are never overwritten with stale values.
+    """
+    values = [snapshot.get(field.attname, DEFERRED) for field in CustomUser._meta.concrete_fields]
+    return CustomUser.from_db('default', [field.attname for field in CustomUser._meta.concrete_fields], values)
+
+
 class TokenExpiredAuthentication(TokenAuthentication):
+    """
+    Token authentication with a limited token lifetime (TOKEN_LIFETIME seconds).
+    The token owner and the token expiry are cached in token_cache, so a cached token is authenticated
+    without any database queries.
+    """
+
+    def authenticate(self, request):
+        with span('auth'):
+            return super().authenticate(request)
 
     def authenticate_credentials(self, key):
-        user, token = super().authenticate_credentials(key=key)
-        if (token.created + timedelta(seconds=TOKEN_LIFETIME)) < timezone.now():
-            token.delete()
+        entry = token_cache.get(key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key=key)
+            expires = token.created + timedelta(seconds=TOKEN_LIFETIME)
+            if expires < timezone.now():
+                expire_token(key)
+                raise exceptions.AuthenticationFailed('Token lifetime is over!')
+            token_cache.set(key, {
+                'user': {field: getattr(user, field) for field in USER_SNAPSHOT_FIELDS},
+                'created': token.created.timestamp(),
+                'expires': expires.timestamp(),
+            })
+            return user, token
+
+        if entry['expires'] < timezone.now().timestamp():
+            expire_token(key)
             raise exceptions.AuthenticationFailed('Token lifetime is over!')
+        user = user_from_snapshot(entry['user'])
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        token = Token.from_db('default', ['key', 'user_id', 'created'],
+                              [key, user.pk, datetime.fromtimestamp(entry['created'], tz=dt_timezone.utc)])
+        token.user = user
         return user, token
 
+
+SIGNED_TOKEN_SALT = 'cinema_app.api.signed-token'
+
+
+def signed_token_lifetime():
+    return getattr(settings, 'SIGNED_TOKEN_LIFETIME', TOKEN_LIFETIME)
+
+
+def _signed_token_cache():
+    """
+    Returns: the shared level of the token cache, None if it is process-local (the state is then not cached:
+    a revocation must reach every worker).
+    """
+    return token_cache.shared
+
+
+def _signed_token_state_key(user_id):
+    return f'signed-token-user:{user_id}'
+
+
+def _signed_token_state(user):
+    return {
+        'version': user.token_version,
+        'user': {field: getattr(user, field) for field in USER_SNAPSHOT_FIELDS},
+    }
+
+
+def issue_signed_token(user):
+    """
+    Issues a stateless HMAC-signed token carrying the user id, the issue time and the revocation counter.
+    The user state is put into the shared cache, so the following requests are authenticated without the database.
+    """
+    cache = _signed_token_cache()
+    if cache is not None:
+        cache.set(_signed_token_state_key(user.pk), _signed_token_state(user),
+                  timeout=getattr(settings, 'SIGNED_TOKEN_STATE_TTL', 300))
+    return signing.dumps({'uid': user.pk, 'ver': user.token_version}, salt=SIGNED_TOKEN_SALT, compress=True)
+
+
+def revoke_signed_tokens(user):
+    """
+    Increases the revocation counter of the user, so all signed tokens issued before stop working.
+    """
+    CustomUser.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    forget_signed_token_state(user.pk)
+
+
+def forget_signed_token_state(user_id):
+    """
+    Drops the cached state of the user, so the next signed token of the user is checked against the database.
+    """
+    cache = _signed_token_cache()
+    if cache is not None:
+        cache.delete(_signed_token_state_key(user_id))
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Authentication by stateless signed tokens: "Authorization: Signed <token>".
+    The signature and the embedded issue time are verified without the database; the revocation counter
+    of the user is compared with the cached one (the cache is refilled by one query when it is empty; without
+    a shared cache it is read from the database on every request).
+    """
+    keyword = 'Signed'
+
+    def authenticate_credentials(self, key):
+        try:
+            payload = signing.loads(key, salt=SIGNED_TOKEN_SALT, max_age=signed_token_lifetime())
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token lifetime is over!')
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        cache = _signed_token_cache()
+        state = None if cache is None else cache.get(_signed_token_state_key(payload['uid']))
+        if state is None:
+            # the revocation counter must not be read stale from a replica (and then cached)
+            user = CustomUser.objects.using(DEFAULT_DB_ALIAS).filter(pk=payload['uid']).first()
+            if user is None:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            state = _signed_token_state(user)
+            if cache is not None:
+                cache.set(_signed_token_state_key(user.pk), state,
+                          timeout=getattr(settings, 'SIGNED_TOKEN_STATE_TTL', 300))
+
+        if state['version'] != payload['ver']:
+            raise exceptions.AuthenticationFailed('Token has been revoked!')
+        user = user_from_snapshot(state['user'])
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user, key
+
+
+def _refresh_token_hash(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def issue_refresh_token(user):
+    """
+    Creates a new refresh credential of the user and returns it (only its digest is stored).
+    """
+    key = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(
+        key_hash=_refresh_token_hash(key),
+        user=user,
+        expires=timezone.now() + timedelta(seconds=getattr(settings, 'REFRESH_TOKEN_LIFETIME', 60 * 60 * 24 * 14)),
+    )
+    return key
+
+
+def revoke_refresh_tokens(user):
+    RefreshToken.objects.filter(user=user, revoked=False).update(revoked=True)
+
+
+def issue_token_pair(user):
+    """
+    Returns the access token of the user (a new one if the lifetime of the current token is over)
+    and a new refresh credential.
+    """
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token.created + timedelta(seconds=TOKEN_LIFETIME) < timezone.now():
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token, issue_refresh_token(user)
+
+
+def refresh_access_token(key):
+    """
+    Exchanges the refresh credential for a new access token and a new (rotated) refresh credential.
+    The credential is found by one primary key lookup, no password hashing is involved.
+    A rotated credential presented again means it was stolen, so all refresh credentials of the user are revoked.
+    Returns: tuple (access Token, new refresh credential).
+    """
+    refresh_token = RefreshToken.objects.select_related('user').filter(key_hash=_refresh_token_hash(key)).first()
+    if refresh_token is None or refresh_token.expires < timezone.now():
+        raise exceptions.AuthenticationFailed('Refresh token is invalid or expired!')
+    user = refresh_token.user
+    if refresh_token.revoked:
+        revoke_refresh_tokens(user)
+        raise exceptions.AuthenticationFailed('Refresh token has been revoked!')
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+    with transaction.atomic():
+        rotated = RefreshToken.objects.filter(key_hash=refresh_token.key_hash, revoked=False).update(revoked=True)
+        if not rotated:
+            raise exceptions.AuthenticationFailed('Refresh token has been revoked!')
+        Token.objects.filter(user=user).delete()
+        token = Token.objects.create(user=user)
+        return token, issue_refresh_token(user)
@@ -0,0 +1,63 @@
+"""
+gzip compression of the large API responses.
+
+CompressedResponseMixin compresses the rendered body of a REST framework view when the client accepts gzip
+(Accept-Encoding) and the body has at least API_COMPRESSION_MIN_SIZE bytes. Smaller bodies are sent as they are:
+the gzip framing and the CPU time would cost more than they save.
+"""
+
+import gzip
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Returns: whether the Accept-Encoding header value allows gzip (explicitly or by *, with a q-value above 0).
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+def compress_response(request, response):
+    """
+    Compresses the content of the rendered response in place, if it is worth it and the client accepts gzip.
+    """
+    if response.streaming or response.has_header('Content-Encoding'):
+        return response
+    if len(response.content) < getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if not accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        return response
+    response.content = gzip.compress(response.content, compresslevel=getattr(settings, 'API_COMPRESSION_LEVEL', 6),
+                                     mtime=0)
+    response['Content-Length'] = str(len(response.content))
+    response['Content-Encoding'] = 'gzip'
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    return response
+
+
+class CompressedResponseMixin:
+    """
+    A mixin of the REST framework views whose responses are compressed by compress_response once rendered.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(lambda rendered: compress_response(request, rendered))
+        return response
@@ -0,0 +1,46 @@
+"""
+JSON rendering of the API.
+
+FastJSONRenderer renders with orjson when it is installed (optional dependency) and with the json module
+of the standard library (the REST framework JSONRenderer) otherwise, or with API_JSON_BACKEND = 'stdlib'.
+Both produce the same compact UTF-8 JSON: the values orjson does not serialize the same way (datetimes, Decimal,
+lazy strings, ...) are passed to the encoder of the REST framework.
+"""
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+JSON_BACKENDS = ('orjson', 'stdlib')
+
+
+def json_backend():
+    """
+    Returns: API_JSON_BACKEND of the settings, by default 'orjson' if it is installed, else 'stdlib'.
+    """
+    backend = getattr(settings, 'API_JSON_BACKEND', None) or ('orjson' if orjson is not None else 'stdlib')
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f'Unknown JSON backend: {backend}')
+    if backend == 'orjson' and orjson is None:
+        raise ImportError('The orjson JSON backend requires orjson')
+    return backend
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer with the json_backend(). Indented output (?indent / "; indent=" in Accept) uses the standard library.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if json_backend() == 'stdlib' or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(data, default=self.encoder_class().default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+        # like JSONRenderer: U+2028 and U+2029 are escaped, the JSON is valid JavaScript
+        return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -1,28 +1,132 @@
-from django.db.models import Q
+from django.db.models import F, Q
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import viewsets
 from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.generics import CreateAPIView, ListAPIView
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
+from cinema_app.api.authentication import TokenExpiredAuthentication, SignedTokenAuthentication, \
+    issue_signed_token, revoke_signed_tokens, issue_token_pair, refresh_access_token, revoke_refresh_tokens
+from cinema_app.api.compression import CompressedResponseMixin
+from cinema_app.api.token_cache import token_cache
+from cinema_app.archive import PurchaseHistory
+from cinema_app.analytics import BACKENDS, SOURCES, occupancy_report
+from cinema_app.export import CONTENT_TYPES, EXPORT_FORMATS, export_chunks
+from cinema_app.metrics import PROMETHEUS_CONTENT_TYPE, metrics_registry, render_prometheus
+from cinema_app.rollups import record_purchase
+from cinema_app.timing import TimedListModelMixin, span
 from django.utils import timezone
 from cinema_app.api.serializers import CustomUserSerializer, CinemaHallSerializer, MovieSessionSerializer, \
-    PurchaseSerializer, PurchaseReadSerializer
-from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
+    PurchaseSerializer, PurchaseReadSerializer, RefreshTokenSerializer, SessionDayRollupSerializer, \
+    HallDayRollupSerializer, MovieDayRollupSerializer
+from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase, SessionDayRollup, HallDayRollup, \
+    MovieDayRollup, ArchivedPurchase
 from django.db import transaction
 from cinema_app.api.permissions import IsObjectOwnerOrAdmin, IsAdminOrReadOnly
 from datetime import date, timedelta
 
 
 class LogoutApiView(APIView):
+    """
+    Deletes the access token of the request and revokes the refresh credentials of the user.
+    Signed tokens are not accepted here: they are revoked by SignedLogoutApiView.
+    """
+    query_budget = 4
+    authentication_classes = [TokenExpiredAuthentication]
+    permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
         token: Token = request.auth
         token.delete()
+        revoke_refresh_tokens(request.user)
+        return Response('You have successfully completed your session!')
+
+
+class ObtainAuthTokenPairApiView(ObtainAuthToken):
+    """
+    The login endpoint: checks the password once and returns an access token and a long-lived refresh credential.
+    An access token whose lifetime is over is replaced by a new one.
+    """
+    query_budget = 6
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, refresh = issue_token_pair(serializer.validated_data['user'])
+        return Response({'token': token.key, 'refresh': refresh})
+
+
+class RefreshTokenApiView(APIView):
+    """
+    Exchanges a refresh credential for a new access token without password hashing.
+    The refresh credential is rotated: the response contains a new one, the old one stops working.
+    """
+    query_budget = 8
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get_authenticate_header(self, request):
+        return TokenExpiredAuthentication.keyword
+
+    def post(self, request, *args, **kwargs):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token, refresh = refresh_access_token(serializer.validated_data['refresh'])
+        return Response({'token': token.key, 'refresh': refresh})
+
+
+class ObtainSignedTokenApiView(ObtainAuthToken):
+    """
+    The equivalent of obtain_auth_token that issues a stateless signed token (see SignedTokenAuthentication).
+    """
+    query_budget = 2
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        return Response({'token': issue_signed_token(user)})
+
+
+class SignedLogoutApiView(APIView):
+    """
+    The equivalent of LogoutApiView for signed tokens: revokes all signed tokens of the user.
+    """
+    query_budget = 2
+    authentication_classes = [SignedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        revoke_signed_tokens(request.user)
         return Response('You have successfully completed your session!')
 
 
+class TokenCacheStatsApiView(APIView):
+    query_budget = 3
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(token_cache.stats())
+
+
+class MetricsApiView(APIView):
+    """
+    The per-view request metrics (cinema_app.metrics) in the Prometheus text format, for the admins
+    (a scraper authenticates with the token of a staff user).
+    """
+    query_budget = 3
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(render_prometheus(metrics_registry.collect(), metrics_registry.buckets),
+                            content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 class CustomUserCreateAPIView(CreateAPIView):
+    query_budget = 5
     permission_classes = [IsObjectOwnerOrAdmin]
     queryset = CustomUser.objects.all()
     http_method_names = ['post', ]
@@ -34,7 +138,8 @@ class CustomUserCreateAPIView(CreateAPIView):
         return super().get_permissions()
 
 
-class CinemaHallViewSet(viewsets.ModelViewSet):
+class CinemaHallViewSet(CompressedResponseMixin, viewsets.ModelViewSet):
+    query_budget = {'list': 4, 'retrieve': 3, 'create': 4, 'update': 5, 'partial_update': 5}
     permission_classes = [IsAdminUser]
     queryset = CinemaHall.objects.all()
     serializer_class = CinemaHallSerializer
@@ -46,7 +151,32 @@ class CinemaHallViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class MovieSessionViewSet(viewsets.ModelViewSet):
+def filter_movie_sessions(queryset, params):
+    """
+    Filters the movie sessions by the query parameters day ('today' or 'tomorrow')
+    or hall_id with the optional session_start_time and session_end_time (not filtered without them).
+    """
+    session_start_time = params.get('session_start_time') or '00:00:00'
+    session_end_time = params.get('session_end_time') or '23:59:59'
+    hall = params.get('hall_id')
+    session_show_day = params.get('day')
+    time_range = Q(session_start_time__range=(session_start_time, session_end_time))
+
+    if session_show_day == 'today':
+        return queryset.filter(session_show_start_date__lte=date.today(), session_show_end_date__gt=date.today())
+
+    elif session_show_day == 'tomorrow':
+        return queryset.filter(session_show_start_date__lte=date.today() + timedelta(days=1),
+                               session_show_end_date__gt=date.today())
+
+    if hall:
+        return queryset.filter(time_range, session_show_start_date__lte=date.today(),
+                               session_show_end_date__gte=date.today(), hall_id=hall)
+    return queryset
+
+
+class MovieSessionViewSet(CompressedResponseMixin, TimedListModelMixin, viewsets.ModelViewSet):
+    query_budget = {'list': 4, 'retrieve': 2, 'create': 4, 'update': 6, 'partial_update': 6}
     permission_classes = [IsAdminUser]
     queryset = MovieSession.objects.filter(session_show_end_date__gt=timezone.now())
     serializer_class = MovieSessionSerializer
@@ -61,28 +191,25 @@ class MovieSessionViewSet(viewsets.ModelViewSet):
         if len(self.request.GET.keys()) == 0:
             queryset = self.queryset
             return queryset
+        return filter_movie_sessions(super().get_queryset(), self.request.query_params)
 
-        session_start_time = self.request.query_params.get('session_start_time') or '00:00:00'
-        session_end_time = self.request.query_params.get('session_end_time') or '23:59:59'
-        hall = self.request.query_params.get('hall_id')
-        session_show_day = self.request.query_params.get('day')
-        time_range = Q(session_start_time__range=(session_start_time, session_end_time))
 
-        if session_show_day == 'today':
-            return super().get_queryset().filter(session_show_start_date__lte=date.today(),
-                                                 session_show_end_date__gt=date.today())
-
-        elif session_show_day == 'tomorrow':
-            return super().get_queryset().filter(session_show_start_date__lte=date.today() + timedelta(days=1),
-                                                 session_show_end_date__gt=date.today())
-
-        if hall:
-            return super().get_queryset().filter(time_range, session_show_start_date__lte=date.today(),
-                                                 session_show_end_date__gte=date.today(),
-                                                 hall_id=hall)
+def save_purchase(serializer, user):
+    """
+    Saves the purchase of a validated PurchaseSerializer with the free seats of the session,
+    the total sum of the user and the rollups in one transaction. The total sum is increased in the database:
+    the user of a cached token is a snapshot, saving it would write its cached fields back.
+    """
+    serializer.validated_data['movie'].free_seats -= serializer.validated_data['quantity']
+    purchase_sum = serializer.validated_data['movie'].ticket_price * serializer.validated_data['quantity']
+    with span('purchase'), transaction.atomic():
+        CustomUser.objects.filter(pk=user.pk).update(total_sum=F('total_sum') + purchase_sum)
+        serializer.validated_data['movie'].save()
+        record_purchase(serializer.save())
 
 
 class PurchaseCreateAPIView(CreateAPIView):
+    query_budget = 10
     permission_classes = [IsAuthenticated]
     queryset = Purchase.objects.all()
     http_method_names = ['post', ]
@@ -94,23 +221,109 @@ class PurchaseCreateAPIView(CreateAPIView):
         return context
 
     def perform_create(self, serializer):
-        serializer.validated_data['movie'].free_seats -= serializer.validated_data['quantity']
-        self.request.user.total_sum += serializer.validated_data['movie'].ticket_price * \
-                                       serializer.validated_data['quantity']
-        with transaction.atomic():
-            self.request.user.save()
-            serializer.validated_data['movie'].save()
-            serializer.save()
+        save_purchase(serializer, self.request.user)
 
 
-class ProfileApiView(ListAPIView):
+class ProfileApiView(CompressedResponseMixin, TimedListModelMixin, ListAPIView):
+    """
+    The purchase history (hot and archived purchases, see cinema_app.archive.PurchaseHistory)
+    of the user, or of all users for the superuser.
+    """
+    query_budget = 7
     permission_classes = [IsObjectOwnerOrAdmin]
     queryset = Purchase.objects.all()
     serializer_class = PurchaseReadSerializer
+    rendered_fields = ('purchase_date', 'purchase_sum', 'quantity', 'user__username', 'user__total_sum',
+                       *(f'movie__{field}' for field in MovieSessionSerializer.Meta.fields))
+
+    def get_queryset(self):
+        hot, archived = Purchase.objects.all(), ArchivedPurchase.objects.all()
+        if not self.request.user.is_superuser:
+            hot, archived = hot.filter(user=self.request.user), archived.filter(user=self.request.user)
+        return PurchaseHistory(hot, archived, prepare=lambda queryset: queryset.select_related('user', 'movie').only(
+            *self.rendered_fields))
+
+
+def get_date_range(request):
+    """
+    Returns the dates of the optional query parameters date_from and date_to (YYYY-MM-DD) or None for each.
+    """
+    try:
+        return tuple(date.fromisoformat(value) if value else None
+                     for value in (request.query_params.get('date_from'), request.query_params.get('date_to')))
+    except ValueError:
+        raise ValidationError({'detail': 'Dates must be in the format YYYY-MM-DD'})
+
+
+class RollupReportApiView(ListAPIView):
+    """
+    A base class of the revenue reports. Reads only the rollup tables;
+    the optional query parameters date_from and date_to (YYYY-MM-DD) limit the days.
+    """
+    query_budget = 3
+    permission_classes = [IsAdminUser]
 
     def get_queryset(self):
-        return self.queryset.all() if self.request.user.is_superuser else self.queryset.filter(user=self.request.user)
+        queryset = super().get_queryset()
+        date_from, date_to = get_date_range(self.request)
+        if date_from:
+            queryset = queryset.filter(day__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(day__lte=date_to)
+        return queryset
+
+
+class SessionDayReportApiView(RollupReportApiView):
+    queryset = SessionDayRollup.objects.select_related('session__hall').order_by('-day', 'session_id')
+    serializer_class = SessionDayRollupSerializer
+
+
+class HallDayReportApiView(RollupReportApiView):
+    queryset = HallDayRollup.objects.select_related('hall').order_by('-day', 'hall_id')
+    serializer_class = HallDayRollupSerializer
 
 
+class MovieDayReportApiView(RollupReportApiView):
+    queryset = MovieDayRollup.objects.order_by('-day', 'movie_title')
+    serializer_class = MovieDayRollupSerializer
 
 
+class ExportApiView(APIView):
+    """
+    Streams all purchases or movie sessions as CSV (default) or JSONL (?file_format=jsonl),
+    optionally limited by date_from / date_to.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name, *args, **kwargs):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            raise ValidationError({'file_format': [f'Must be one of: {", ".join(EXPORT_FORMATS)}']})
+        date_from, date_to = get_date_range(request)
+        response = StreamingHttpResponse(export_chunks(name, file_format, date_from, date_to),
+                                         content_type=CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{name}.{file_format}"'
+        return response
+
+
+class AnalyticsApiView(APIView):
+    """
+    Occupancy and pricing analytics of the sessions (see cinema_app.analytics) for the purchases
+    between date_from and date_to. The optional parameters backend ('numpy' or 'python') and source
+    ('rollups' or 'purchases') select how the report is computed.
+    """
+    query_budget = 3
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        date_from, date_to = get_date_range(request)
+        backend = request.query_params.get('backend')
+        if backend is not None and backend not in BACKENDS:
+            raise ValidationError({'backend': [f'Must be one of: {", ".join(BACKENDS)}']})
+        source = request.query_params.get('source', 'rollups')
+        if source not in SOURCES:
+            raise ValidationError({'source': [f'Must be one of: {", ".join(SOURCES)}']})
+        try:
+            return Response(occupancy_report(date_from, date_to, backend=backend, source=source))
+        except ImportError as error:
+            raise ValidationError({'backend': [str(error)]})
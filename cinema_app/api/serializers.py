@@ -1,9 +1,13 @@
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
-from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
+from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase, SessionDayRollup, HallDayRollup, \
+    MovieDayRollup
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 from datetime import date, datetime
+from cinema_app.query_budget import QueryBudgetMixin
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -25,16 +29,26 @@ class CustomUserSerializer(serializers.ModelSerializer):
             raise ValidationError({'password': "Password must not contain whitespaces"})
         if len(data['password']) < 8:
             raise ValidationError({'password': "Password must be 8 or more symbols"})
-        users = CustomUser.objects.filter(username__iexact=data['username'])
-        if users.exists():
-            raise ValidationError("User with this name already exists")
         if not data['email']:
             raise ValidationError({'email': "Fild email is required"})
         return data
 
     def create(self, validated_data):
-        user = CustomUser.objects.create_user(**validated_data)
-        return user
+        return self.insert_user(lambda: CustomUser.objects.create_user(**validated_data), validated_data['email'])
+
+    @staticmethod
+    def insert_user(create, email):
+        """
+        Creates the user with one insert. A case-insensitive duplicate of the username or the email
+        (rejected by the unique indexes) is raised as ValidationError.
+        """
+        try:
+            with transaction.atomic():
+                return create()
+        except IntegrityError:
+            if email and CustomUser.objects.filter(email__iexact=email).exists():
+                raise ValidationError({'email': ['Email is already registered!']})
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ['User with this name already exists']})
 
 
 class CustomUserReadSerializer(serializers.ModelSerializer):
@@ -44,7 +58,8 @@ class CustomUserReadSerializer(serializers.ModelSerializer):
         fields = ('username', 'total_sum')
 
 
-class CinemaHallSerializer(serializers.ModelSerializer):
+class CinemaHallSerializer(QueryBudgetMixin, serializers.ModelSerializer):
+    query_budget = {'validate': 1, 'save': 1, 'represent': 0}
     hall_size = serializers.IntegerField(required=True)
 
     class Meta:
@@ -63,11 +78,8 @@ class CinemaHallSerializer(serializers.ModelSerializer):
                 raise ValidationError({'hall_name': 'The name of hall can`t be less then 2 symbols'})
             if data['hall_size'] <= 0:
                 raise ValidationError({'hall_size': 'The hall size must be more then 0'})
-            if self.instance:
-                cinema_hall = CinemaHall.objects.get(id=self.instance.id)
-                busy_hall = Purchase.objects.filter(movie__hall=cinema_hall)
-                if busy_hall:
-                    raise serializers.ValidationError('Tickets to this hall have already been purchased,\
+            if self.instance and Purchase.objects.filter(movie__hall=self.instance).exists():
+                raise serializers.ValidationError('Tickets to this hall have already been purchased,\
                                                        no changes can be made!')
         except KeyError:
             raise ValidationError("Required fild is absence!")
@@ -75,7 +87,8 @@ class CinemaHallSerializer(serializers.ModelSerializer):
         return data
 
 
-class MovieSessionSerializer(serializers.ModelSerializer):
+class MovieSessionSerializer(QueryBudgetMixin, serializers.ModelSerializer):
+    query_budget = {'validate': 3, 'save': 1, 'represent': 0}
     hall = serializers.PrimaryKeyRelatedField(queryset=CinemaHall.objects.all(), required=True)
     session_start_time = serializers.TimeField(required=True)
     session_end_time = serializers.TimeField(required=True)
@@ -90,16 +103,13 @@ class MovieSessionSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'free_seats', )
 
     def create(self, validated_data):
-        validated_data['free_seats'] = CinemaHall.objects.get(id=validated_data['hall'].id).hall_size
+        validated_data['free_seats'] = validated_data['hall'].hall_size
         obj = MovieSession.objects.create(**validated_data)
         return obj
 
     def validate(self, data):
         try:
-            hall = CinemaHall.objects.get(id=data.get('hall').id)
-            if not hall:
-                raise ValidationError("The hall with this id doesn't exist!")
-
+            hall = data['hall']
             if len(data['movie_title']) <= 3:
                 raise ValidationError({'movie_title': 'The movie title cannot be less then 3 symbol!'})
             if len(data['movie_description']) <= 9:
@@ -127,13 +137,11 @@ class MovieSessionSerializer(serializers.ModelSerializer):
 
             movie_session_obj = MovieSession.objects.filter(hall=hall.pk).filter(
                 enter_session_show_start_date | enter_session_show_end_date).filter(
-                enter_session_start_time | enter_session_end_time).all()
-            if movie_session_obj:
+                enter_session_start_time | enter_session_end_time)
+            if movie_session_obj.exists():
                 raise ValidationError('Sessions in the same hall cannot overlap!')
 
-            movie_session = self.instance
-            purchases = Purchase.objects.filter(movie=movie_session)
-            if purchases:
+            if self.instance and Purchase.objects.filter(movie=self.instance).exists():
                 raise ValidationError('Tickets for this movie session have already been purchased, \
                                       no changes can be made!')
         except KeyError:
@@ -142,7 +150,8 @@ class MovieSessionSerializer(serializers.ModelSerializer):
         return data
 
 
-class PurchaseSerializer(serializers.ModelSerializer):
+class PurchaseSerializer(QueryBudgetMixin, serializers.ModelSerializer):
+    query_budget = {'validate': 2, 'save': 1, 'represent': 0}
     user = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), required=False)
     movie = serializers.PrimaryKeyRelatedField(queryset=MovieSession.objects.all(), required=True)
     purchase_date = serializers.DateField(required=False)
@@ -154,9 +163,7 @@ class PurchaseSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', )
 
     def validate(self, data):
-        movie = MovieSession.objects.get(id=data.get('movie').id)
-        if not movie:
-            raise ValidationError("The movie with this id doesn't exist!")
+        movie = data['movie']
         if data['quantity'] < 1:
             raise serializers.ValidationError({'quantity': 'You must order at least 1 ticket!'})
         if data['quantity'] > movie.free_seats:
@@ -177,7 +184,8 @@ class PurchaseSerializer(serializers.ModelSerializer):
         return self.context['request']
 
 
-class PurchaseReadSerializer(serializers.ModelSerializer):
+class PurchaseReadSerializer(QueryBudgetMixin, serializers.ModelSerializer):
+    query_budget = {'represent': 0}
     user = CustomUserReadSerializer()
     movie = MovieSessionSerializer()
 
@@ -185,3 +193,41 @@ class PurchaseReadSerializer(serializers.ModelSerializer):
         model = Purchase
         fields = ['user', 'movie', 'purchase_date', 'purchase_sum', 'quantity']
 
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField(max_length=64, required=True)
+
+
+class SessionDayRollupSerializer(QueryBudgetMixin, serializers.ModelSerializer):
+    query_budget = {'represent': 0}
+    movie_title = serializers.CharField(source='session.movie_title')
+    hall = serializers.IntegerField(source='session.hall_id')
+    occupancy = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SessionDayRollup
+        fields = ['session', 'movie_title', 'hall', 'day', 'purchases', 'tickets', 'revenue', 'occupancy']
+
+    def get_occupancy(self, obj):
+        """
+        The share of the seats of the hall sold for the session on this day.
+        """
+        hall_size = obj.session.hall.hall_size
+        return round(obj.tickets / hall_size, 4) if hall_size else None
+
+
+class HallDayRollupSerializer(QueryBudgetMixin, serializers.ModelSerializer):
+    query_budget = {'represent': 0}
+    hall_name = serializers.CharField(source='hall.hall_name')
+
+    class Meta:
+        model = HallDayRollup
+        fields = ['hall', 'hall_name', 'day', 'purchases', 'tickets', 'revenue']
+
+
+class MovieDayRollupSerializer(QueryBudgetMixin, serializers.ModelSerializer):
+    query_budget = {'represent': 0}
+
+    class Meta:
+        model = MovieDayRollup
+        fields = ['movie_title', 'day', 'purchases', 'tickets', 'revenue']
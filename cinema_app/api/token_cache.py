@@ -0,0 +1,156 @@
+"""
+Two-level cache used by the REST API token authentication.
+
+The first level is a small in-process LRU with a short TTL, the second one is the shared Django cache backend.
+Both levels map a token key to a snapshot of the token owner and the moment the token expires,
+so an authenticated API request normally makes no database queries for authentication at all.
+
+The second level must be shared by all the worker processes (CACHES['tokens'] in the settings), so a logout
+or a change of the user reaches every worker at once (the other workers keep an invalidated entry in their LRU
+for at most LOCAL_TTL seconds). A process-local backend (LocMemCache) is not used as the second level.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+TOKEN_CACHE_DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'api-token',
+    'LOCAL_SIZE': 1024,
+    'LOCAL_TTL': 5,
+    'SHARED_TTL': 60,
+}
+
+USER_SNAPSHOT_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def shared_cache(alias):
+    """
+    Returns: the cache backend of the alias, None if it is local to the process (an invalidation would not
+    reach the other workers through it).
+    """
+    cache = caches[alias]
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+class TokenCache:
+    """
+    Maps a token key to a dict entry {'user': {...snapshot fields...}, 'created': float, 'expires': float}.
+
+    Attributes:
+        local_size (int): The maximum number of entries kept in the in-process LRU.
+        local_ttl (float): How many seconds an entry lives in the in-process LRU.
+        shared_ttl (int): The upper bound of seconds an entry lives in the shared cache.
+    """
+
+    def __init__(self, cache_alias, key_prefix, local_size, local_ttl, shared_ttl):
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self.shared_ttl = shared_ttl
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @property
+    def shared(self):
+        return shared_cache(self.cache_alias)
+
+    def _shared_key(self, key):
+        return f'{self.key_prefix}:{key}'
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key):
+        """
+        Returns the cached entry for the token key or None.
+        The in-process LRU is checked first, then the shared cache (a shared hit refills the LRU).
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._local.get(key)
+            if item is not None:
+                stored_at, entry = item
+                if now - stored_at < self.local_ttl:
+                    self._local.move_to_end(key)
+                    self._counters['local_hits'] += 1
+                    return entry
+                del self._local[key]
+
+        shared = self.shared
+        entry = None if shared is None else shared.get(self._shared_key(key))
+        if entry is None:
+            self._count('misses')
+            return None
+        self._count('shared_hits')
+        self._remember(key, entry, now)
+        return entry
+
+    def set(self, key, entry):
+        """
+        Stores the entry on both levels. The shared cache never keeps the entry longer than the token lives.
+        """
+        remaining = int(entry['expires'] - time.time())
+        shared = self.shared
+        if remaining > 0 and shared is not None:
+            shared.set(self._shared_key(key), entry, timeout=min(remaining, self.shared_ttl))
+        self._remember(key, entry, time.monotonic())
+
+    def _remember(self, key, entry, now):
+        with self._lock:
+            self._local[key] = (now, entry)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Drops the token key from both levels (used on logout and when the token lifetime is over).
+        """
+        with self._lock:
+            self._local.pop(key, None)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self._shared_key(key))
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        """
+        Returns the hit / miss counters and the overall hit rate of the cache.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            counters['local_entries'] = len(self._local)
+        lookups = counters['local_hits'] + counters['shared_hits'] + counters['misses']
+        hits = counters['local_hits'] + counters['shared_hits']
+        counters['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return counters
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+def _build_token_cache():
+    options = {**TOKEN_CACHE_DEFAULTS, **getattr(settings, 'TOKEN_CACHE', {})}
+    return TokenCache(
+        cache_alias=options['CACHE_ALIAS'],
+        key_prefix=options['KEY_PREFIX'],
+        local_size=options['LOCAL_SIZE'],
+        local_ttl=options['LOCAL_TTL'],
+        shared_ttl=options['SHARED_TTL'],
+    )
+
+
+token_cache = _build_token_cache()
@@ -1,8 +1,11 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework import routers
-from rest_framework.authtoken.views import obtain_auth_token
 from cinema_app.api.resourses import CustomUserCreateAPIView,  MovieSessionViewSet, PurchaseCreateAPIView, \
-    ProfileApiView, LogoutApiView, CinemaHallViewSet
+    ProfileApiView, LogoutApiView, CinemaHallViewSet, TokenCacheStatsApiView, MetricsApiView, \
+    ObtainSignedTokenApiView, SignedLogoutApiView, ObtainAuthTokenPairApiView, RefreshTokenApiView, \
+    SessionDayReportApiView, HallDayReportApiView, MovieDayReportApiView, ExportApiView, AnalyticsApiView
+from cinema_app.api.async_resourses import AsyncObtainAuthTokenApiView, AsyncCustomUserCreateApiView, \
+    AsyncMovieSessionApiView, AsyncProfileApiView, AsyncPurchaseCreateApiView
 
 router = routers.SimpleRouter()
 router.register(r'movie_session', MovieSessionViewSet)
@@ -10,11 +13,27 @@ router.register(r'cinema_hall', CinemaHallViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('login/', obtain_auth_token),
+    path('login/', ObtainAuthTokenPairApiView.as_view()),
+    path('token_refresh/', RefreshTokenApiView.as_view()),
     path('logout/', LogoutApiView.as_view()),
+    path('signed_login/', ObtainSignedTokenApiView.as_view()),
+    path('signed_logout/', SignedLogoutApiView.as_view()),
     path('registration/', CustomUserCreateAPIView.as_view()),
     path('cart/', PurchaseCreateAPIView.as_view()),
     path('profile/', ProfileApiView.as_view()),
+    path('token_cache_stats/', TokenCacheStatsApiView.as_view()),
+    path('metrics/', MetricsApiView.as_view()),
+    path('async/login/', AsyncObtainAuthTokenApiView.as_view()),
+    path('async/registration/', AsyncCustomUserCreateApiView.as_view()),
+    path('async/movie_session/', AsyncMovieSessionApiView.as_view()),
+    path('async/movie_session/<int:pk>/', AsyncMovieSessionApiView.as_view()),
+    path('async/profile/', AsyncProfileApiView.as_view()),
+    path('async/cart/', AsyncPurchaseCreateApiView.as_view()),
+    path('reports/sessions/', SessionDayReportApiView.as_view()),
+    path('reports/halls/', HallDayReportApiView.as_view()),
+    path('reports/movies/', MovieDayReportApiView.as_view()),
+    path('analytics/', AnalyticsApiView.as_view()),
+    re_path(r'^export/(?P<name>purchases|sessions)/$', ExportApiView.as_view()),
     ]
 
 
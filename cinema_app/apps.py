@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CinemaAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cinema_app'
+
+    def ready(self):
+        from cinema_app import signals, staticfiles  # noqa: F401
+        from cinema_app.purge import start_purge_scheduler
+        start_purge_scheduler()
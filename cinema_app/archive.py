@@ -0,0 +1,134 @@
+"""
+Archival of the movie sessions ended long ago together with their purchases.
+
+Sessions whose show ended more than ARCHIVE_SESSIONS_AFTER_DAYS days ago are moved batch by batch
+(one transaction per batch) into ArchivedMovieSession / ArchivedPurchase / ArchivedSessionDayRollup with
+INSERT ... SELECT, keeping the ids of the sessions and the purchases, and deleted from the hot tables,
+so MovieSession and Purchase (and their indexes) stay small.
+
+PurchaseHistory reads the hot and the archived purchases as one sequence, ordered like the purchase history.
+The hall and movie rollups are not per session and stay where they are.
+"""
+
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Value, IntegerField
+from django.utils import timezone
+from cinema_app.models import ArchivedMovieSession, ArchivedPurchase, ArchivedSessionDayRollup, MovieSession, \
+    Purchase, SessionDayRollup
+
+ARCHIVE_SESSIONS_AFTER_DAYS = getattr(settings, 'ARCHIVE_SESSIONS_AFTER_DAYS', 30)
+
+
+def _copy_rows(queryset, target_model):
+    """
+    Inserts the rows of the queryset into the table of target_model, whose columns have the same names
+    (an auto-created primary key of target_model is not copied).
+    Returns: the number of copied rows.
+    """
+    quote = connection.ops.quote_name
+    columns = [field.column for field in target_model._meta.concrete_fields if not field.auto_created]
+    sql, params = queryset.order_by().values_list(*columns).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote(target_model._meta.db_table)} '
+                       f'({", ".join(quote(column) for column in columns)}) {sql}', params)
+        return cursor.rowcount
+
+
+def archive_ended_sessions(days=None, batch_size=100, sleep=0.05):
+    """
+    Moves the sessions ended more than days ago (ARCHIVE_SESSIONS_AFTER_DAYS by default), their purchases
+    and session-day rollups to the archive, batch_size sessions per transaction with a pause between the batches.
+    Returns: dict with the number of archived sessions and purchases and the spent time in seconds.
+    """
+    days = ARCHIVE_SESSIONS_AFTER_DAYS if days is None else days
+    cutoff = timezone.localdate() - timedelta(days=days)
+    ended = MovieSession.objects.filter(session_show_end_date__lt=cutoff).order_by('pk')
+    report = {'sessions': 0, 'purchases': 0}
+    started = time.perf_counter()
+    while True:
+        ids = list(ended.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            purchases = Purchase.objects.filter(movie_id__in=ids)
+            _copy_rows(MovieSession.objects.filter(pk__in=ids), ArchivedMovieSession)
+            report['purchases'] += _copy_rows(purchases, ArchivedPurchase)
+            _copy_rows(SessionDayRollup.objects.filter(session_id__in=ids), ArchivedSessionDayRollup)
+            purchases.delete()
+            MovieSession.objects.filter(pk__in=ids).delete()
+        report['sessions'] += len(ids)
+        if len(ids) < batch_size:
+            break
+        time.sleep(sleep)
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+
+class PurchaseHistory:
+    """
+    The hot and the archived purchases of the same filter as one sequence ordered by (-purchase_date, id),
+    sliceable and countable like a queryset, so it works with Paginator (ListView, DRF pagination).
+
+    A slice costs one UNION query of (table, id) keys, read from the (user, -purchase_date, id) indexes,
+    and one query per table present in the slice to load the rows.
+    """
+    HOT, ARCHIVED = 0, 1
+    model = Purchase
+
+    def __init__(self, hot, archived, prepare=None):
+        """
+        Args:
+            hot: A Purchase queryset.
+            archived: An ArchivedPurchase queryset with the same filter.
+            prepare: An optional function applied to both querysets when the rows are loaded
+                     (e.g. to add select_related / only).
+        """
+        self.hot = hot
+        self.archived = archived
+        self.prepare = prepare or (lambda queryset: queryset)
+
+    def _keys(self):
+        hot = self.hot.order_by().values_list(Value(self.HOT, output_field=IntegerField()), 'id', 'purchase_date')
+        archived = self.archived.order_by().values_list(Value(self.ARCHIVED, output_field=IntegerField()), 'id',
+                                                        'purchase_date')
+        return hot.union(archived, all=True)
+
+    def count(self):
+        return self._keys().count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def _rows(self, keys):
+        for table, queryset in ((self.HOT, self.hot), (self.ARCHIVED, self.archived)):
+            ids = [pk for source, pk, _ in keys if source == table]
+            if ids:
+                yield table, self.prepare(queryset.order_by()).filter(pk__in=ids)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        keys = list(self._keys().order_by('-purchase_date', 'id')[key])
+        rows = {}
+        for table, queryset in self._rows(keys):
+            rows.update(((table, row.pk), row) for row in queryset)
+        return [rows[(source, pk)] for source, pk, _ in keys]
+
+    async def acount(self):
+        return await self._keys().acount()
+
+    async def aslice(self, start, stop):
+        """
+        The async equivalent of self[start:stop], with the async ORM.
+        """
+        keys = [key async for key in self._keys().order_by('-purchase_date', 'id')[start:stop]]
+        rows = {}
+        for table, queryset in self._rows(keys):
+            rows.update([((table, row.pk), row) async for row in queryset])
+        return [rows[(source, pk)] for source, pk, _ in keys]
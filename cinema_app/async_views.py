@@ -0,0 +1,213 @@
+"""
+Async (ASGI) versions of the login, the registration and the schedule pages.
+
+The password is hashed / checked in the hashing pool (see cinema_app.hashing), so the event loop keeps serving
+other requests while PBKDF2 is computed. When the pool is saturated the request is rejected with 503.
+The schedule pages read with the async ORM; the templates are rendered by Django off the event loop.
+"""
+
+from asgiref.sync import sync_to_async
+import inspect
+from django import forms
+from django.conf import settings
+from django.contrib.auth import load_backend, login as auth_login
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.shortcuts import render
+from django.urls import reverse_lazy
+from django.views import View
+from cinema_app.forms import AsyncAuthenticationForm, UserCreateForm
+from cinema_app.hashing import hashing_pool, PasswordHashingBusy
+from cinema_app.middleware import start_sliding_session
+from cinema_app.models import CustomUser
+from cinema_app.views import MovieDetailsView, MovieSessionListView, UserLoginRequiredMixin
+from cinema_house.settings import SESSION_COOKIE_LIFETIME_FOR_ADMIN, SESSION_COOKIE_LIFETIME
+
+
+async def authenticate_model_backend(backend, username, password):
+    """
+    ModelBackend.authenticate with the password hashed in the hashing pool instead of on the event loop.
+    For an unknown username a password is still hashed, so the response time does not reveal existing users.
+    """
+    if not username or not password:
+        return None
+    user = await CustomUser._default_manager.filter(**{CustomUser.USERNAME_FIELD: username}).afirst()
+    if user is None:
+        await hashing_pool.make_password(password)
+        return None
+    if not await hashing_pool.check_password(password, user.password):
+        return None
+    return user if backend.user_can_authenticate(user) else None
+
+
+async def authenticate_async(request, username, password):
+    """
+    The async equivalent of django.contrib.auth.authenticate: tries AUTHENTICATION_BACKENDS in order and sends
+    user_login_failed if none of them accepts the credentials. The backends that keep the authenticate of
+    ModelBackend check the password in the hashing pool, the others run in a thread (sync_to_async).
+    Returns: the authenticated user (with user.backend set) or None.
+    """
+    credentials = {'username': username, 'password': password}
+    for backend_path in settings.AUTHENTICATION_BACKENDS:
+        backend = load_backend(backend_path)
+        if type(backend).authenticate is ModelBackend.authenticate:
+            user = await authenticate_model_backend(backend, username, password)
+        else:
+            try:
+                inspect.signature(backend.authenticate).bind(request, **credentials)
+            except TypeError:
+                # this backend doesn't accept these credentials as arguments
+                continue
+            try:
+                user = await sync_to_async(backend.authenticate)(request, **credentials)
+            except PermissionDenied:
+                # this backend says to stop in our tracks: the user should not be allowed in at all
+                break
+        if user is not None:
+            user.backend = backend_path
+            return user
+    await sync_to_async(user_login_failed.send)(
+        sender=__name__, credentials={'username': username, 'password': '*' * 20}, request=request)
+    return None
+
+
+def hashing_busy_response():
+    response = HttpResponse('The server is busy, please try again later.', status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+class AsyncLoginUser(View):
+    """
+    Async view for user login. Works as LoginUser: sets the per-role session lifetime after the login.
+    """
+    query_budget = 9
+    template_name = 'login.html'
+    next_page = '/'
+
+    async def get(self, request, *args, **kwargs):
+        return await sync_to_async(render)(request, self.template_name, {'form': AsyncAuthenticationForm(request)})
+
+    async def post(self, request, *args, **kwargs):
+        form = AsyncAuthenticationForm(request, data=request.POST)
+        try:
+            form.user_cache = await authenticate_async(request, request.POST.get('username'),
+                                                       request.POST.get('password'))
+        except PasswordHashingBusy:
+            return hashing_busy_response()
+        if not form.is_valid():
+            return await sync_to_async(render)(request, self.template_name, {'form': form})
+
+        user = form.get_user()
+        await sync_to_async(auth_login)(request, user)
+        lifetime = SESSION_COOKIE_LIFETIME_FOR_ADMIN if user.is_superuser else SESSION_COOKIE_LIFETIME
+        await sync_to_async(start_sliding_session)(request.session, lifetime)
+        return HttpResponseRedirect(self.next_page)
+
+
+class AsyncRegistrationNewUser(View):
+    """
+    Async view for registration of new user page.
+    """
+    query_budget = 5
+    template_name = 'registration.html'
+    success_url = reverse_lazy('login')
+
+    async def get(self, request, *args, **kwargs):
+        return await sync_to_async(render)(request, self.template_name, {'form': UserCreateForm()})
+
+    async def post(self, request, *args, **kwargs):
+        form = UserCreateForm(request.POST)
+        if not await sync_to_async(form.is_valid)():
+            return await sync_to_async(render)(request, self.template_name, {'form': form})
+
+        # ModelForm.save is called directly: UserCreationForm.save would hash the password on the event loop
+        user = forms.ModelForm.save(form, commit=False)
+        try:
+            user.password = await hashing_pool.make_password(form.cleaned_data['password1'])
+        except PasswordHashingBusy:
+            return hashing_busy_response()
+        if await sync_to_async(form.insert_user)(user) is None:
+            return await sync_to_async(render)(request, self.template_name, {'form': form})
+        return HttpResponseRedirect(self.success_url)
+
+
+async def aload_user(request):
+    """
+    Loads the lazy request.user (the session and the user queries) off the event loop.
+    Returns: the user, later accesses to request.user do not query the database.
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+async def apaginate(object_list, per_page, page_number):
+    """
+    The async equivalent of MultipleObjectMixin.paginate_queryset for a queryset or a PurchaseHistory.
+    Returns: the paginator and the page with the loaded rows; raises Http404 for an invalid page number.
+    """
+    paginator = Paginator(object_list, per_page)
+    paginator.count = await object_list.acount()
+    if page_number == 'last':
+        page_number = paginator.num_pages
+    try:
+        number = paginator.validate_number(page_number or 1)
+    except InvalidPage as error:
+        raise Http404(f'Invalid page ({page_number}): {error}')
+    bottom = (number - 1) * per_page
+    top = bottom + per_page
+    if hasattr(object_list, 'aslice'):
+        rows = await object_list.aslice(bottom, top)
+    else:
+        rows = [row async for row in object_list[bottom:top]]
+    return paginator, Page(rows, number, paginator)
+
+
+class AsyncUserLoginRequiredMixin(UserLoginRequiredMixin):
+    """
+    UserLoginRequiredMixin for async views: the user is loaded off the event loop.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not (await aload_user(request)).is_authenticated:
+            return self.handle_no_permission()
+        return await View.dispatch(self, request, *args, **kwargs)
+
+
+class AsyncListMixin:
+    """
+    The async get of a ListView: the page is loaded with the async ORM before the context is built.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        await aload_user(request)
+        self.object_list = self.get_queryset()
+        page_number = self.kwargs.get(self.page_kwarg) or request.GET.get(self.page_kwarg)
+        self.pagination = await apaginate(self.object_list, self.get_paginate_by(self.object_list), page_number)
+        return self.render_to_response(self.get_context_data())
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page = self.pagination
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class AsyncMovieSessionListView(AsyncListMixin, MovieSessionListView):
+    """
+    Async version of MovieSessionListView.
+    """
+
+
+class AsyncMovieDetailsView(AsyncUserLoginRequiredMixin, MovieDetailsView):
+    """
+    Async version of MovieDetailsView.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        pk = self.kwargs.get('pk') or request.GET.get('pk')
+        self.object = await self.get_queryset().select_related('hall').filter(pk=pk).afirst()
+        if self.object is None:
+            raise Http404('No movie session found matching the query')
+        return self.render_to_response(self.get_context_data(object=self.object))
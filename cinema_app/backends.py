@@ -0,0 +1,23 @@
+"""
+Authentication backends of the project (AUTHENTICATION_BACKENDS in the settings).
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db import DEFAULT_DB_ALIAS
+
+
+class PrimaryModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the user of a session from the primary database, also in the requests that read from
+    a replica (see cinema_app.routers): a deactivated user or a changed password (the session auth hash) ends
+    the session at once, not when the replica has caught up.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.db_manager(DEFAULT_DB_ALIAS).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
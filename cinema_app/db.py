@@ -0,0 +1,56 @@
+"""
+Database connection setup.
+
+Every new SQLite connection executes the PRAGMAs of the SQLITE_PRAGMA_PROFILE settings profile
+(see SQLITE_PRAGMA_PROFILES in the settings), e.g. WAL journal, synchronous=NORMAL, page cache, mmap, busy timeout.
+Together with persistent connections (CONN_MAX_AGE) they are executed once per connection, not per request.
+
+sync_sqlite_replicas copies the SQLite primary database into the SQLite read replicas (for local testing of
+the replica routing, see cinema_app.routers).
+"""
+
+import sqlite3
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SQLITE_PRAGMA_PROFILES = {
+    'default': {},
+}
+
+
+def sqlite_pragmas(profile=None):
+    """
+    Returns: the dict of the PRAGMA names and values of the profile (SQLITE_PRAGMA_PROFILE by default).
+    """
+    profiles = {**SQLITE_PRAGMA_PROFILES, **getattr(settings, 'SQLITE_PRAGMA_PROFILES', {})}
+    profile = profile or getattr(settings, 'SQLITE_PRAGMA_PROFILE', 'default')
+    if profile not in profiles:
+        raise ValueError(f'Unknown SQLite PRAGMA profile: {profile}')
+    return profiles[profile]
+
+
+def apply_sqlite_pragmas(connection, pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def sync_sqlite_replicas(aliases):
+    """
+    Copies the primary SQLite database into the SQLite databases of the given aliases
+    with the online backup API (the primary stays readable and writable meanwhile).
+    """
+    primary = connections[DEFAULT_DB_ALIAS]
+    if primary.vendor != 'sqlite':
+        raise ValueError('Only SQLite replicas can be synchronized')
+    primary.ensure_connection()
+    for alias in aliases:
+        replica = connections[alias]
+        if replica.vendor != 'sqlite':
+            raise ValueError(f'The replica {alias} is not an SQLite database')
+        replica.close()
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
@@ -0,0 +1,137 @@
+"""
+Streaming CSV / JSONL export of purchases and movie sessions.
+
+Rows are read as tuples with QuerySet.iterator (chunked fetching from the database cursor) and encoded
+in blocks of chunk_size rows, so the memory used does not depend on the number of exported rows.
+The hot rows are followed by the archived ones (see cinema_app.archive).
+"""
+
+import csv
+import io
+import json
+from itertools import chain
+from cinema_app.models import ArchivedMovieSession, ArchivedPurchase, MovieSession, Purchase
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# (column name, queryset field)
+PURCHASE_COLUMNS = (
+    ('id', 'id'),
+    ('purchase_date', 'purchase_date'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('email', 'user__email'),
+    ('session_id', 'movie_id'),
+    ('movie_title', 'movie__movie_title'),
+    ('hall_id', 'movie__hall_id'),
+    ('hall_name', 'movie__hall__hall_name'),
+    ('quantity', 'quantity'),
+    ('purchase_sum', 'purchase_sum'),
+)
+
+SESSION_COLUMNS = (
+    ('id', 'id'),
+    ('movie_title', 'movie_title'),
+    ('hall_id', 'hall_id'),
+    ('hall_name', 'hall__hall_name'),
+    ('session_start_time', 'session_start_time'),
+    ('session_end_time', 'session_end_time'),
+    ('session_show_start_date', 'session_show_start_date'),
+    ('session_show_end_date', 'session_show_end_date'),
+    ('free_seats', 'free_seats'),
+    ('ticket_price', 'ticket_price'),
+)
+
+
+def purchases_querysets(date_from=None, date_to=None):
+    """
+    Returns the hot and the archived purchases (see cinema_app.archive) made in the date range.
+    """
+    querysets = []
+    for model in (Purchase, ArchivedPurchase):
+        queryset = model.objects.order_by('pk')
+        if date_from:
+            queryset = queryset.filter(purchase_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(purchase_date__lte=date_to)
+        querysets.append(queryset)
+    return querysets
+
+
+def sessions_querysets(date_from=None, date_to=None):
+    """
+    Returns the hot and the archived sessions shown at least one day of the date range.
+    """
+    querysets = []
+    for model in (MovieSession, ArchivedMovieSession):
+        queryset = model.objects.order_by('pk')
+        if date_from:
+            queryset = queryset.filter(session_show_end_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(session_show_start_date__lte=date_to)
+        querysets.append(queryset)
+    return querysets
+
+
+EXPORTS = {
+    'purchases': (purchases_querysets, PURCHASE_COLUMNS),
+    'sessions': (sessions_querysets, SESSION_COLUMNS),
+}
+
+
+def _json_default(value):
+    return value.isoformat()
+
+
+_json_encoder = json.JSONEncoder(default=_json_default)
+
+
+def _encode_csv(rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _encode_jsonl(rows, header):
+    encode = _json_encoder.encode
+    return ''.join([encode(dict(zip(header, row))) + '\n' for row in rows])
+
+
+def _encode_block(file_format, rows, header, first):
+    if file_format == 'jsonl':
+        return _encode_jsonl(rows, header)
+    return _encode_csv(rows, header if first else None)
+
+
+def export_chunks(name, file_format, date_from=None, date_to=None, chunk_size=2000):
+    """
+    Yields the export as text blocks of up to chunk_size rows (the CSV header is in the first block).
+
+    Args:
+        name: 'purchases' or 'sessions'.
+        file_format: 'csv' or 'jsonl'.
+        date_from, date_to: Optional dates limiting the exported rows.
+        chunk_size: The number of rows fetched from the database and encoded at once.
+    """
+    build_querysets, columns = EXPORTS[name]
+    header = [column for column, _ in columns]
+    fields = [field for _, field in columns]
+    rows = chain.from_iterable(queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+                               for queryset in build_querysets(date_from, date_to))
+    block = []
+    first = True
+    for row in rows:
+        block.append(row)
+        if len(block) == chunk_size:
+            yield _encode_block(file_format, block, header, first)
+            block, first = [], False
+    if block or first:
+        yield _encode_block(file_format, block, header, first)
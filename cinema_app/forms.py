@@ -1,14 +1,15 @@
 """
 This module contains Django forms used for creating, editing, and validating
 users, purchases and cinema-related objects such as movie sessions, halls. It defines the `UserCreateForm`,
-`CinemaHallCreateForm`, `MovieSessionForm`, `PurchaseCreateForm`, and UserChoiceFilterForm classes, each of
-which is a subclass of Django's `ModelForm` or `Form` class.
+`CinemaHallCreateForm`, `MovieSessionForm`, `PurchaseCreateForm`, `UserChoiceFilterForm` and
+`AsyncAuthenticationForm` classes, each of which is a subclass of Django's `ModelForm` or `Form` class.
 """
 
 from django import forms
 from django.contrib import messages
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from datetime import date, datetime
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
 from cinema_app.exceptions import ValidationError
@@ -42,11 +43,43 @@ class UserCreateForm(UserCreationForm):
             'email': None,
          }
 
-    def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if CustomUser.objects.filter(email__iexact=email).exists():
-            self.add_error('email', 'Email is already registered!')
-        return email
+    def clean_username(self):
+        """
+        Skips the case-insensitive lookup of UserCreationForm: the unique index checks the username on insert
+        (see insert_user).
+        """
+        return self.cleaned_data.get('username')
+
+    def _get_validation_exclusions(self):
+        """
+        The model validation (unique fields and constraints) does not look up username and email:
+        the unique indexes reject the duplicates on insert (see insert_user).
+        """
+        return super()._get_validation_exclusions() | {'username', 'email'}
+
+    def insert_user(self, user):
+        """
+        Inserts the user with one query. A case-insensitive duplicate of the username or the email
+        (rejected by the unique indexes) is reported as a form error.
+        Returns: the saved user or None.
+        """
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            if user.email and CustomUser.objects.filter(email__iexact=user.email).exists():
+                self.add_error('email', 'Email is already registered!')
+            else:
+                self.add_error('username', 'A user with that username already exists.')
+            return None
+        return user
+
+    def save(self, commit=True):
+        user = forms.ModelForm.save(self, commit=False)
+        user.set_password(self.cleaned_data['password1'])
+        if commit:
+            return self.insert_user(user)
+        return user
 
 
 class CinemaHallCreateForm(forms.ModelForm):
@@ -323,3 +356,17 @@ class UserChoiceFilterForm(forms.Form):
         (sort_by_ticket_price_descending, 'sort by price descending')
     ]
     filter_by = forms.ChoiceField(choices=sort_movies)
+
+
+class AsyncAuthenticationForm(AuthenticationForm):
+    """
+    The login form of the async login view.
+    The user is authenticated by the view before validation (the password is checked in the hashing pool),
+    so the form only validates the fields and the result stored in user_cache.
+    """
+
+    def clean(self):
+        if self.user_cache is None:
+            raise self.get_invalid_login_error()
+        self.confirm_login_allowed(self.user_cache)
+        return self.cleaned_data
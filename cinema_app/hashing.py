@@ -0,0 +1,33 @@
+"""
+Password hashing off the event loop.
+
+PasswordHashingPool runs make_password / check_password in a bounded thread (or process) pool
+(see cinema_app.pools), so the async views of the login and the registration keep the event loop free
+while PBKDF2 is computed. When the pool is saturated the job is rejected with PasswordHashingBusy.
+"""
+
+from django.contrib.auth.hashers import check_password, make_password
+from cinema_app.pools import BoundedPool, PoolBusy
+
+
+class PasswordHashingBusy(PoolBusy):
+    """
+    Raised when the hashing pool already has the maximum number of running and waiting jobs.
+    """
+
+
+class PasswordHashingPool(BoundedPool):
+    """
+    kind 'thread' or 'process': hashlib releases the GIL while computing PBKDF2, so threads scale over cores;
+    processes also scale for hashers implemented in pure Python.
+    """
+    busy_exception = PasswordHashingBusy
+
+    async def make_password(self, password):
+        return await self.run(make_password, password)
+
+    async def check_password(self, password, encoded):
+        return await self.run(check_password, password, encoded)
+
+
+hashing_pool = PasswordHashingPool.from_settings('PASSWORD_HASHING_POOL')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from cinema_app.archive import ARCHIVE_SESSIONS_AFTER_DAYS, archive_ended_sessions
+
+
+class Command(BaseCommand):
+    help = 'Moves the movie sessions ended long ago and their purchases to the archive tables in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_SESSIONS_AFTER_DAYS,
+                            help='Archive the sessions ended more than this number of days ago')
+        parser.add_argument('--batch-size', type=int, default=100, help='Sessions moved per transaction')
+        parser.add_argument('--sleep', type=float, default=0.05, help='Pause between batches in seconds')
+
+    def handle(self, *args, **options):
+        report = archive_ended_sessions(days=options['days'], batch_size=options['batch_size'],
+                                        sleep=options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {report['sessions']} sessions and {report['purchases']} purchases in {report['seconds']}s"
+        ))
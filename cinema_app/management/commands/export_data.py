@@ -0,0 +1,27 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from cinema_app.export import EXPORTS, EXPORT_FORMATS, export_chunks
+
+
+class Command(BaseCommand):
+    help = 'Streams all purchases or movie sessions to a CSV or JSONL file (or stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS), help='What to export')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Output format')
+        parser.add_argument('--date-from', type=date.fromisoformat, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--date-to', type=date.fromisoformat, help='Last day (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched and written at once')
+        parser.add_argument('--output', help='Output file path, stdout by default')
+
+    def handle(self, *args, **options):
+        chunks = export_chunks(options['name'], options['format'], options['date_from'], options['date_to'],
+                               chunk_size=options['chunk_size'])
+        if options['output'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported {options['name']} to {options['output']}"))
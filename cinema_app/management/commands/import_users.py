@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from cinema_app.user_import import import_users, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Imports users (username, email, password, total_sum) from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The CSV (with a header row) or JSONL file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users inserted per bulk_create')
+        parser.add_argument('--workers', type=int, help='Hashing processes, defaults to the number of cores')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or ('jsonl' if options['path'].endswith('.jsonl') else 'csv')
+        with open(options['path'], newline='', encoding='utf-8') as file:
+            report = import_users(read_rows(file, file_format), chunk_size=options['chunk_size'],
+                                  workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} users, skipped {report['skipped']} duplicates "
+            f"in {report['seconds']}s ({report['users_per_second']} users/s)"
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from cinema_app.purge import purge_expired_auth
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired API tokens, refresh credentials and sessions in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows deleted per batch')
+        parser.add_argument('--sleep', type=float, default=0.05, help='Pause between batches in seconds')
+
+    def handle(self, *args, **options):
+        report = purge_expired_auth(batch_size=options['batch_size'], sleep=options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {report['tokens']} tokens, {report['refresh_tokens']} refresh tokens, "
+            f"{report['sessions']} sessions in {report['seconds']}s"
+        ))
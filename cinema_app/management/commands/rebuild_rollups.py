@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from cinema_app.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the revenue rollups (per session, hall and movie per day) from the purchases, '
+            'one transaction per chunk (the reports show partial totals until it finishes; '
+            'do not run it together with archive_sessions)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Purchases aggregated per chunk')
+
+    def handle(self, *args, **options):
+        report = rebuild_rollups(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the rollups from {report['purchases']} purchases in {report['chunks']} chunks"
+        ))
@@ -0,0 +1,38 @@
+import json
+from django.core.management.base import BaseCommand
+from cinema_app.reconcile import COUNTER_CHECKS, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Compares the free seats of the sessions and the total sums of the users with the purchases ' \
+           'and optionally repairs them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Update the drifted counters')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Rows read per query')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows repaired per transaction')
+        parser.add_argument('--sample-size', type=int, default=20, help='Drifted rows listed per counter')
+        parser.add_argument('--json', action='store_true', help='Write the drift report as JSON')
+
+    def handle(self, *args, **options):
+        report = reconcile_counters(repair=options['repair'], chunk_size=options['chunk_size'],
+                                    batch_size=options['batch_size'], sample_size=options['sample_size'])
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        for check in COUNTER_CHECKS:
+            counter = report[check.name]
+            style = self.style.WARNING if counter['drifted'] and not counter['repaired'] else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{check.model.__name__}.{check.field}: {counter['drifted']} drifted "
+                f"(stored - expected: {counter['difference']}), {counter['repaired']} repaired"
+            ))
+            for pk, stored, expected in counter['sample']:
+                self.stdout.write(f'    id {pk}: stored {stored}, expected {expected}')
+            if counter['oversold']:
+                self.stdout.write(self.style.WARNING(
+                    f"{check.model.__name__}.{check.field}: {counter['oversold']} oversold (expected below 0)"
+                ))
+                for pk, stored, expected in counter['oversold_sample']:
+                    self.stdout.write(f'    id {pk}: stored {stored}, expected {expected}')
+        self.stdout.write(f"Checked in {report['seconds']}s")
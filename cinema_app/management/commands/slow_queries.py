@@ -0,0 +1,37 @@
+import json
+from django.core.management.base import BaseCommand
+from cinema_app.slow_queries import slow_query_log, summarize_slow_queries
+
+
+class Command(BaseCommand):
+    help = 'Lists the slowest SQL statements of the slow-query log by their total time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Statements listed')
+        parser.add_argument('--file', help='The slow-query log (SLOW_QUERY_LOG["FILE"] by default)')
+        parser.add_argument('--json', action='store_true', help='Write the summary as JSON')
+
+    def handle(self, *args, **options):
+        path = options['file'] or slow_query_log.path
+        if not path:
+            self.stdout.write(self.style.WARNING('No slow-query log: set SLOW_QUERY_LOG["FILE"] or pass --file'))
+            return
+        report = summarize_slow_queries(path, top=options['top'])
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        if not report:
+            self.stdout.write(self.style.SUCCESS(f'No slow queries in {path}'))
+            return
+        for rank, total in enumerate(report, 1):
+            self.stdout.write(self.style.WARNING(
+                f"{rank}. {total['total_ms']} ms in {total['count']} queries "
+                f"(mean {total['mean_ms']} ms, max {total['max_ms']} ms)"
+            ))
+            self.stdout.write(f"    {total['sql']}")
+            self.stdout.write(f"    views: {', '.join(str(view) for view in total['views'])}")
+            for location in total['locations']:
+                self.stdout.write(f'    at {location}')
+            if isinstance(total['plan'], list):
+                for row in total['plan']:
+                    self.stdout.write(f"    plan: {' '.join(row)}")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from cinema_app.db import sync_sqlite_replicas
+from cinema_app.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = 'Copies the primary SQLite database into the SQLite read replicas (local testing of the replica routing)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='Replica aliases, all DATABASE_REPLICAS by default')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or replica_aliases()
+        if not aliases:
+            raise CommandError('No replicas: set DATABASE_REPLICAS in the settings')
+        try:
+            sync_sqlite_replicas(aliases)
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(f"Synchronized {', '.join(aliases)}"))
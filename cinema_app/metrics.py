@@ -0,0 +1,270 @@
+"""
+Per-view request metrics.
+
+RequestMetricsMiddleware measures every request: the latency, the number and the time of the database queries
+(record_query, an execute wrapper installed on every connection), the render time of the template / REST framework
+responses and the response size. The measurements are added to the MetricsRegistry under the name of the view.
+
+The registry keeps one shard of counters per thread: a request only updates the shard of its own thread, so the
+hot path takes no lock; a shard is registered (under a lock) once per thread. The shards are added up when the
+metrics are collected.
+
+With METRICS['MODE'] = 'files' every worker process also writes its totals to a JSON file in METRICS['DIRECTORY']
+(at most every FLUSH_INTERVAL seconds and at exit), and collect() adds up the files of all the running workers,
+so any worker can answer the scrape for the whole server. The files of the exited workers are removed, so their
+counters leave the totals (Prometheus reads the drop as a counter reset). render_prometheus formats the totals
+in the Prometheus text exposition format.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from django.conf import settings
+
+METRICS_DEFAULTS = {
+    'ENABLED': True,
+    'MODE': 'memory',
+    'DIRECTORY': None,
+    'FLUSH_INTERVAL': 5,
+    'LATENCY_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+}
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# the layout of the counters of a view, followed by the latency histogram buckets (the last one is +Inf)
+COUNT, LATENCY_SUM, QUERIES, QUERY_SECONDS, RENDER_SECONDS, RESPONSE_BYTES, SERVER_ERRORS = range(7)
+FIELDS = 7
+
+COUNTERS = (
+    (QUERIES, 'cinema_db_queries_total', 'Database queries executed by the view.'),
+    (QUERY_SECONDS, 'cinema_db_query_seconds_total', 'Time spent in the database queries of the view.'),
+    (RENDER_SECONDS, 'cinema_render_seconds_total', 'Time spent rendering the template and API responses.'),
+    (RESPONSE_BYTES, 'cinema_response_bytes_total', 'Bytes of the response bodies.'),
+    (SERVER_ERRORS, 'cinema_server_errors_total', 'Responses with a 5xx status.'),
+)
+
+
+class RequestMeasurements:
+    """
+    The measurements of the request in progress, shared with the threads the request runs its code in.
+    """
+    __slots__ = ('view', 'queries', 'query_seconds', 'render_seconds')
+
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+current_request = ContextVar('current_request_measurements', default=None)
+
+
+def view_name(match):
+    """
+    Returns: the metrics name of the view of a resolver match: the URL pattern name (the dotted path of the view
+    for the unnamed patterns), '<unresolved>' if the path matched no URL pattern.
+    """
+    return (match.view_name or match.route) if match is not None else '<unresolved>'
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper: counts the queries of the request in progress and their time.
+    """
+    measurements = current_request.get()
+    if measurements is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        measurements.queries += 1
+        measurements.query_seconds += time.perf_counter() - started
+
+
+class MetricsRegistry:
+    """
+    Attributes:
+        buckets (tuple): The upper bounds of the latency histogram buckets in seconds, ascending.
+        directory (str): The directory of the per-process files ('files' mode), None in the 'memory' mode.
+        flush_interval (float): The minimum number of seconds between two writes of the file of the process.
+    """
+
+    def __init__(self, buckets, directory=None, flush_interval=5):
+        self.buckets = tuple(buckets)
+        self.directory = str(directory) if directory else None
+        self.flush_interval = flush_interval
+        self._shards = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushed = time.monotonic()
+        os.register_at_fork(after_in_child=self.reset)
+        if self.directory:
+            atexit.register(self.flush)
+
+    @classmethod
+    def from_settings(cls, name='METRICS'):
+        """
+        Builds the registry from the dict setting name over METRICS_DEFAULTS.
+        """
+        options = {**METRICS_DEFAULTS, **getattr(settings, name, {})}
+        if options['MODE'] not in ('memory', 'files'):
+            raise ValueError(f'Unknown metrics mode: {options["MODE"]}')
+        if options['MODE'] == 'files' and not options['DIRECTORY']:
+            raise ValueError("The 'files' metrics mode requires a DIRECTORY")
+        return cls(buckets=options['LATENCY_BUCKETS'], flush_interval=options['FLUSH_INTERVAL'],
+                   directory=options['DIRECTORY'] if options['MODE'] == 'files' else None)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, view, seconds, measurements, response_bytes, status):
+        """
+        Adds a finished request of the view.
+        """
+        shard = self._shard()
+        values = shard.get(view)
+        if values is None:
+            values = shard[view] = [0] * (FIELDS + len(self.buckets) + 1)
+        values[COUNT] += 1
+        values[LATENCY_SUM] += seconds
+        values[QUERIES] += measurements.queries
+        values[QUERY_SECONDS] += measurements.query_seconds
+        values[RENDER_SECONDS] += measurements.render_seconds
+        values[RESPONSE_BYTES] += response_bytes
+        if status >= 500:
+            values[SERVER_ERRORS] += 1
+        values[FIELDS + bisect_left(self.buckets, seconds)] += 1
+        if self.directory and time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush(blocking=False)
+
+    def snapshot(self):
+        """
+        Returns: {view: counters} of this process.
+        """
+        totals = {}
+        for shard in list(self._shards):
+            for view, values in list(shard.items()):
+                merge(totals, view, values)
+        return totals
+
+    def path(self, pid=None):
+        return os.path.join(self.directory, f'metrics-{pid or os.getpid()}.json')
+
+    def flush(self, blocking=True):
+        """
+        Writes the totals of this process to its file ('files' mode).
+        """
+        if not self.directory or not self._flush_lock.acquire(blocking=blocking):
+            return
+        try:
+            self._flushed = time.monotonic()
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path()
+            with open(f'{path}.tmp', 'w') as file:
+                json.dump({'buckets': self.buckets, 'views': self.snapshot()}, file)
+            os.replace(f'{path}.tmp', path)
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """
+        Returns: {view: counters} of this process ('memory' mode) or of all the worker processes ('files' mode).
+        The files of the processes that are no longer running are removed.
+        """
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        totals = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                pid = int(name[len('metrics-'):-len('.json')])
+            except ValueError:
+                continue
+            if not process_running(pid):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            if tuple(data['buckets']) == self.buckets:
+                for view, values in data['views'].items():
+                    merge(totals, view, values)
+        return totals
+
+    def reset(self):
+        """
+        Forgets the counters of this process (and of the parent process in a forked worker).
+        """
+        self._shards = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+
+def process_running(pid):
+    """
+    Returns: whether a process with the pid exists (signal 0 checks the pid without signalling the process).
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # the process exists but belongs to another user
+        return True
+    return True
+
+
+def merge(totals, view, values):
+    current = totals.get(view)
+    if current is None:
+        totals[view] = list(values)
+    else:
+        for index, value in enumerate(values):
+            current[index] += value
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(totals, buckets):
+    """
+    Returns: the totals in the Prometheus text exposition format.
+    """
+    views = [(view, f'view="{escape_label(view)}"', values) for view, values in sorted(totals.items())]
+    lines = ['# HELP cinema_request_duration_seconds Latency of the requests by view.',
+             '# TYPE cinema_request_duration_seconds histogram']
+    for view, label, values in views:
+        cumulative = 0
+        for bound, count in zip((*buckets, '+Inf'), values[FIELDS:]):
+            cumulative += count
+            lines.append(f'cinema_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'cinema_request_duration_seconds_sum{{{label}}} {values[LATENCY_SUM]!r}')
+        lines.append(f'cinema_request_duration_seconds_count{{{label}}} {values[COUNT]}')
+    for index, name, description in COUNTERS:
+        lines.extend((f'# HELP {name} {description}', f'# TYPE {name} counter'))
+        lines.extend(f'{name}{{{label}}} {values[index]!r}' for view, label, values in views)
+    return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry.from_settings()
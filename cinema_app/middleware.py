@@ -0,0 +1,318 @@
+"""
+This module contains the middleware classes used by the cinema_app application.
+
+SlidingSessionExpiryMiddleware: Keeps the web session alive while the user is active, but rewrites the session
+                                only when its remaining lifetime drops below a threshold.
+ReplicaRoutingMiddleware: Sends the reads of the safe requests to a read replica (see cinema_app.routers).
+RequestMetricsMiddleware: Records the latency, queries, render time and response size of every request by view
+                          (see cinema_app.metrics).
+ServerTimingMiddleware: Sends the Server-Timing breakdown of the request to staff users (see cinema_app.timing).
+QueryBudgetMiddleware: Fails the requests that make more queries than the budget of their view
+                       (see cinema_app.query_budget).
+
+All of them support sync (WSGI) and async (ASGI) requests, so the async views are not switched to a thread per request.
+"""
+
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject, empty
+from cinema_app.metrics import METRICS_DEFAULTS, RequestMeasurements, current_request, metrics_registry, \
+    view_name
+from cinema_app.query_budget import check_query_budget, counted_queries, query_budgets_enabled, view_query_budget
+from cinema_app.routers import choose_replica, replica_reads
+from cinema_app.timing import SERVER_TIMING_DEFAULTS, ServerTimings, current_timings
+
+SESSION_EXPIRES_AT_KEY = '_sliding_expires_at'
+
+
+def start_sliding_session(session, lifetime):
+    """
+    Sets the session lifetime (in seconds) and remembers the moment the session expires.
+    The stored moment lets the middleware enforce the lifetime for any session backend (including signed cookies)
+    and decide whether the session must be rewritten without touching the session store.
+    """
+    session.set_expiry(lifetime)
+    session[SESSION_EXPIRES_AT_KEY] = time.time() + lifetime
+
+
+class SlidingSessionExpiryMiddleware(MiddlewareMixin):
+    """
+    Sliding expiry of the sessions started with start_sliding_session (the per-role lifetimes of LoginUser).
+
+    The session is saved again only when less than SESSION_REFRESH_THRESHOLD of its lifetime is left,
+    so with SESSION_SAVE_EVERY_REQUEST = False an active user causes one session write per
+    (1 - SESSION_REFRESH_THRESHOLD) * lifetime instead of one write per page view.
+    An expired session is flushed and the request continues as anonymous.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.threshold = getattr(settings, 'SESSION_REFRESH_THRESHOLD', 0.5)
+
+    def process_request(self, request):
+        session = request.session
+        expires_at = session.get(SESSION_EXPIRES_AT_KEY)
+        if expires_at is not None:
+            now = time.time()
+            if expires_at <= now:
+                session.flush()
+                request.user = AnonymousUser()
+            else:
+                lifetime = session.get_expiry_age()
+                if expires_at - now < lifetime * self.threshold:
+                    start_sliding_session(session, lifetime)
+
+
+REPLICA_PIN_COOKIE = 'replica_pin'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Reads of GET / HEAD / OPTIONS requests go to one read replica, the other requests use the primary database.
+
+    A request that writes reads its own writes from the primary for the rest of the request (see ReplicaRouter)
+    and sets a short-lived cookie, so the following requests of the same client (e.g. the page after a purchase)
+    also read from the primary for REPLICA_PIN_SECONDS, until the replicas have caught up.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def replica_for(self, request):
+        use_replica = request.method in self.safe_methods and REPLICA_PIN_COOKIE not in request.COOKIES
+        return choose_replica() if use_replica else None
+
+    def pin(self, response, state):
+        if state.wrote:
+            response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(self.replica_for(request)) as state:
+            response = self.get_response(request)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        with replica_reads(self.replica_for(request)) as state:
+            response = await self.get_response(request)
+        return self.pin(response, state)
+
+
+class RequestMetricsMiddleware:
+    """
+    Adds every request to the metrics registry under its view name (the URL pattern name, else the route;
+    '<unresolved>' for the paths that match no URL pattern). It must be the first middleware, so the latency
+    covers the whole middleware chain and the render time is measured right around response.render().
+    Disabled with METRICS['ENABLED'] = False.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not {**METRICS_DEFAULTS, **getattr(settings, 'METRICS', {})}['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.registry = metrics_registry
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        measurements = RequestMeasurements()
+        token = current_request.set(measurements)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, time.perf_counter() - started, measurements)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        measurements = RequestMeasurements()
+        token = current_request.set(measurements)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, time.perf_counter() - started, measurements)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        measurements = current_request.get()
+        if measurements is not None:
+            measurements.view = view_name(request.resolver_match)
+
+    def process_template_response(self, request, response):
+        measurements = current_request.get()
+        if measurements is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                measurements.render_seconds += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, seconds, measurements):
+        view = view_name(request.resolver_match)
+        size = response.get('Content-Length')
+        if size is None:
+            size = 0 if response.streaming else len(response.content)
+        self.registry.observe(view, seconds, measurements, int(size), response.status_code)
+
+
+class ServerTimingMiddleware:
+    """
+    Sends the Server-Timing header (see cinema_app.timing) to the requests of staff users and to a sample of
+    the requests. The other requests are passed through untouched. The middleware does not load request.user
+    itself (the API users authenticate in the view, and a lazy user would cost the session and the user queries):
+    the requests that may come from a user (with an Authorization header or a session cookie) are collected
+    and get the header only if the user loaded by the view turns out to be staff.
+    Must come after AuthenticationMiddleware. Disabled with SERVER_TIMING['ENABLED'] = False.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        options = {**SERVER_TIMING_DEFAULTS, **getattr(settings, 'SERVER_TIMING', {})}
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.staff = options['STAFF']
+        self.sample_rate = options['SAMPLE_RATE']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def collected(self, request):
+        """
+        Returns: True if the timings of the request are sent, None if it depends on the user known after the view,
+        False otherwise.
+        """
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if not self.staff:
+            return False
+        if 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return None
+        return False
+
+    def start(self):
+        measurements = current_request.get()
+        measurements_token = None
+        if measurements is None:
+            measurements = RequestMeasurements()
+            measurements_token = current_request.set(measurements)
+        timings = ServerTimings()
+        return (time.perf_counter(), timings, current_timings.set(timings), measurements, measurements_token,
+                measurements.queries, measurements.query_seconds)
+
+    def finish(self, request, response, collected, collection):
+        started, timings, token, measurements, measurements_token, queries, query_seconds = collection
+        current_timings.reset(token)
+        if measurements_token is not None:
+            current_request.reset(measurements_token)
+        if response is not None and (collected or getattr(loaded_user(request), 'is_staff', False)):
+            timings.add('db', measurements.query_seconds - query_seconds, measurements.queries - queries)
+            timings.add('total', time.perf_counter() - started)
+            response['Server-Timing'] = timings.header()
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        collected = self.collected(request)
+        if collected is False:
+            return self.get_response(request)
+        collection, response = self.start(), None
+        try:
+            response = self.get_response(request)
+        finally:
+            response = self.finish(request, response, collected, collection)
+        return response
+
+    async def __acall__(self, request):
+        collected = self.collected(request)
+        if collected is False:
+            return await self.get_response(request)
+        collection, response = self.start(), None
+        try:
+            response = await self.get_response(request)
+        finally:
+            response = self.finish(request, response, collected, collection)
+        return response
+
+    def process_template_response(self, request, response):
+        timings = current_timings.get()
+        if timings is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timings.add('render', time.perf_counter() - started)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Raises QueryBudgetExceeded when a request makes more queries than the query_budget of its view
+    (see cinema_app.query_budget). It should come right after RequestMetricsMiddleware, so the queries of the
+    session and of the other middleware count. The failed requests (5xx) are not checked: they already fail.
+    Used only with QUERY_BUDGET['ENABLED'] (development and tests).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not query_budgets_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with counted_queries() as queries:
+            response = self.get_response(request)
+            self.check(request, response, queries())
+        return response
+
+    async def __acall__(self, request):
+        with counted_queries() as queries:
+            response = await self.get_response(request)
+            self.check(request, response, queries())
+        return response
+
+    def check(self, request, response, queries):
+        if response.status_code >= 500:
+            return
+        view, budget = view_query_budget(request.resolver_match, request.method)
+        if budget is not None:
+            check_query_budget(f'{request.method} {request.path} ({view})', queries, budget)
+
+
+def loaded_user(request):
+    """
+    Returns: request.user if it is already loaded (no queries), else None.
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema_app', '0007_remove_moviesession_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
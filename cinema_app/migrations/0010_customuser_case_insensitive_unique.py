@@ -0,0 +1,40 @@
+# Generated by Django 4.2.2 on 2026-10-19 12:00
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_case_insensitive_duplicates(apps, schema_editor):
+    """
+    The unique indexes cannot be created over existing case-insensitive duplicates: they are listed
+    so that the accounts are merged or renamed before the migration is run again.
+    """
+    users = apps.get_model('cinema_app', 'CustomUser').objects.using(schema_editor.connection.alias)
+    duplicates = []
+    for field, queryset in (('username', users), ('email', users.exclude(email=''))):
+        values = (queryset.annotate(value=Lower(field)).values('value').annotate(count=Count('id'))
+                  .filter(count__gt=1).values_list('value', flat=True))
+        duplicates += [f'{field} {value!r}' for value in values]
+    if duplicates:
+        raise RuntimeError('Users with case-insensitive duplicates: ' + ', '.join(duplicates))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema_app', '0009_refreshtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_insensitive_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('username'), name='customuser_username_ci_unique', violation_error_message='A user with that username already exists.'),
+        ),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='customuser_email_ci_unique', violation_error_message='Email is already registered!'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.2 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema_app', '0010_customuser_case_insensitive_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['user', '-purchase_date', 'id'], name='purchase_user_date_idx'),
+        ),
+    ]
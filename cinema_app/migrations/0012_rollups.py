@@ -0,0 +1,71 @@
+# Generated by Django 4.2.2 on 2026-10-19 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema_app', '0011_purchase_user_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionDayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('purchases', models.PositiveIntegerField(default=0)),
+                ('tickets', models.PositiveIntegerField(default=0)),
+                ('revenue', models.PositiveBigIntegerField(default=0)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_rollups', to='cinema_app.moviesession')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='HallDayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('purchases', models.PositiveIntegerField(default=0)),
+                ('tickets', models.PositiveIntegerField(default=0)),
+                ('revenue', models.PositiveBigIntegerField(default=0)),
+                ('hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_rollups', to='cinema_app.cinemahall')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MovieDayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('purchases', models.PositiveIntegerField(default=0)),
+                ('tickets', models.PositiveIntegerField(default=0)),
+                ('revenue', models.PositiveBigIntegerField(default=0)),
+                ('movie_title', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sessiondayrollup',
+            constraint=models.UniqueConstraint(fields=('session', 'day'), name='sessiondayrollup_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='halldayrollup',
+            constraint=models.UniqueConstraint(fields=('hall', 'day'), name='halldayrollup_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='moviedayrollup',
+            constraint=models.UniqueConstraint(fields=('movie_title', 'day'), name='moviedayrollup_unique'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.2 on 2026-10-19 16:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema_app', '0012_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMovieSession',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('movie_title', models.CharField(max_length=100)),
+                ('movie_description', models.CharField(max_length=300)),
+                ('session_start_time', models.TimeField(blank=True, null=True)),
+                ('session_end_time', models.TimeField(blank=True, null=True)),
+                ('session_show_start_date', models.DateField(blank=True, null=True)),
+                ('session_show_end_date', models.DateField(blank=True, null=True)),
+                ('free_seats', models.PositiveIntegerField(default=0)),
+                ('ticket_price', models.PositiveIntegerField(default=0)),
+                ('hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_sessions', to='cinema_app.cinemahall')),
+            ],
+            options={
+                'ordering': ['session_show_start_date', 'movie_title'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPurchase',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('purchase_date', models.DateField()),
+                ('purchase_sum', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchases', to='cinema_app.archivedmoviesession')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_purchases', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-purchase_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedpurchase',
+            index=models.Index(fields=['user', '-purchase_date', 'id'], name='archivedpurchase_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.2 on 2026-10-19 20:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cinema_app', '0013_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSessionDayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('purchases', models.PositiveIntegerField(default=0)),
+                ('tickets', models.PositiveIntegerField(default=0)),
+                ('revenue', models.PositiveBigIntegerField(default=0)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_rollups', to='cinema_app.archivedmoviesession')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='archivedsessiondayrollup',
+            constraint=models.UniqueConstraint(fields=('session', 'day'), name='archivedsessiondayrollup_unique'),
+        ),
+    ]
@@ -8,10 +8,18 @@ CinemaHall: Represents a cinema hall with a name, size (number of seats).
 MovieSession: Represents a movie session with a title, description, start / end  time, start / end date,
               ticket price and images.
 Purchase: Represents a purchase with a date, sum and quantity (purchased tickets).
+RefreshToken: Represents a long-lived API refresh credential that is exchanged for a new access token.
+SessionDayRollup, HallDayRollup, MovieDayRollup: Represent revenue and sold tickets per movie session / cinema hall /
+                                                 movie title and day, maintained together with each purchase.
+ArchivedMovieSession, ArchivedPurchase, ArchivedSessionDayRollup: Represent the movie sessions ended long ago, their
+                                        purchases and session-day rollups, moved out of the MovieSession, Purchase
+                                        and SessionDayRollup tables by cinema_app.archive.
 
 """
 
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 # Create your models here.
 
@@ -23,9 +31,20 @@ class CustomUser(AbstractUser):
 
     Attributes:
         total_sum (PositiveIntegerField): The amount of money that were spent for all the time in the cinema.
+        token_version (PositiveIntegerField): The revocation counter of signed API tokens. Increasing it
+                                              invalidates all signed tokens issued to the user before.
     """
 
     total_sum = models.PositiveIntegerField(default=0)
+    token_version = models.PositiveIntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            models.UniqueConstraint(Lower('username'), name='customuser_username_ci_unique',
+                                    violation_error_message='A user with that username already exists.'),
+            models.UniqueConstraint(Lower('email'), condition=~Q(email=''), name='customuser_email_ci_unique',
+                                    violation_error_message='Email is already registered!'),
+        ]
 
     def __str__(self):
         return self.username
@@ -103,4 +122,143 @@ class Purchase(models.Model):
 
     class Meta:
         ordering = ['-purchase_date']
+        indexes = [
+            models.Index(fields=['user', '-purchase_date', 'id'], name='purchase_user_date_idx'),
+        ]
+
+
+class RefreshToken(models.Model):
+    """
+    A class representing a long-lived refresh credential of the REST API.
+    Only the SHA-256 digest of the credential is stored, the credential itself is shown to the client once.
+
+    Attributes:
+        key_hash (CharField): The SHA-256 hex digest of the refresh credential.
+        user (ForeignKey): A foreign key to the owner of the credential.
+        created (DateTimeField): The moment the credential was issued.
+        expires (DateTimeField): The moment the credential stops working.
+        revoked (BooleanField): True when the credential was rotated or revoked.
+    """
+
+    key_hash = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='refresh_tokens')
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField()
+    revoked = models.BooleanField(default=False)
+
+
+class RollupBase(models.Model):
+    """
+    Common counters of the revenue rollups.
+
+    Attributes:
+        day (DateField): The purchase date.
+        purchases (PositiveIntegerField): The number of purchases.
+        tickets (PositiveIntegerField): The number of sold tickets.
+        revenue (PositiveBigIntegerField): The sum of the purchases.
+    """
+
+    day = models.DateField()
+    purchases = models.PositiveIntegerField(default=0)
+    tickets = models.PositiveIntegerField(default=0)
+    revenue = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+        ordering = ['-day']
+
+
+class SessionDayRollup(RollupBase):
+    """
+    Revenue and sold tickets of a movie session per day.
+
+    Attributes:
+        session (ForeignKey): A foreign key to the movie session.
+    """
+
+    session = models.ForeignKey(MovieSession, on_delete=models.CASCADE, related_name='day_rollups')
+
+    class Meta(RollupBase.Meta):
+        constraints = [models.UniqueConstraint(fields=['session', 'day'], name='sessiondayrollup_unique')]
+
+
+class HallDayRollup(RollupBase):
+    """
+    Revenue and sold tickets of a cinema hall per day.
+
+    Attributes:
+        hall (ForeignKey): A foreign key to the cinema hall.
+    """
+
+    hall = models.ForeignKey(CinemaHall, on_delete=models.CASCADE, related_name='day_rollups')
+
+    class Meta(RollupBase.Meta):
+        constraints = [models.UniqueConstraint(fields=['hall', 'day'], name='halldayrollup_unique')]
+
+
+class MovieDayRollup(RollupBase):
+    """
+    Revenue and sold tickets of a movie (all sessions with the same movie title) per day.
+
+    Attributes:
+        movie_title (CharField): The title of the movie.
+    """
+
+    movie_title = models.CharField(max_length=100)
+
+    class Meta(RollupBase.Meta):
+        constraints = [models.UniqueConstraint(fields=['movie_title', 'day'], name='moviedayrollup_unique')]
+
+
+class ArchivedMovieSession(models.Model):
+    """
+    A movie session moved to the archive. The fields and the id are the ones of the archived MovieSession.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    hall = models.ForeignKey(CinemaHall, on_delete=models.CASCADE, related_name='archived_sessions')
+    movie_title = models.CharField(max_length=100)
+    movie_description = models.CharField(max_length=300)
+    session_start_time = models.TimeField(blank=True, null=True)
+    session_end_time = models.TimeField(blank=True, null=True)
+    session_show_start_date = models.DateField(blank=True, null=True)
+    session_show_end_date = models.DateField(blank=True, null=True)
+    free_seats = models.PositiveIntegerField(default=0)
+    ticket_price = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['session_show_start_date', 'movie_title']
+
+    def __str__(self):
+        return self.movie_title
+
+
+class ArchivedPurchase(models.Model):
+    """
+    A purchase of an archived movie session. The fields and the id are the ones of the archived Purchase.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_purchases')
+    movie = models.ForeignKey(ArchivedMovieSession, on_delete=models.CASCADE, related_name='purchases')
+    purchase_date = models.DateField()
+    purchase_sum = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        ordering = ['-purchase_date']
+        indexes = [
+            models.Index(fields=['user', '-purchase_date', 'id'], name='archivedpurchase_user_date_idx'),
+        ]
+
+
+class ArchivedSessionDayRollup(RollupBase):
+    """
+    A session-day rollup of an archived movie session. The fields are the ones of the archived SessionDayRollup
+    (the id is not kept: rebuild_rollups inserts the rollups of the archived purchases here).
+    """
+
+    session = models.ForeignKey(ArchivedMovieSession, on_delete=models.CASCADE, related_name='day_rollups')
 
+    class Meta(RollupBase.Meta):
+        constraints = [models.UniqueConstraint(fields=['session', 'day'], name='archivedsessiondayrollup_unique')]
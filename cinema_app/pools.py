@@ -0,0 +1,84 @@
+"""
+Bounded worker pools of the async views.
+
+BoundedPool runs blocking functions (password hashing, purchase transactions) in a thread (or process) pool,
+so the event loop keeps serving other requests meanwhile. The number of jobs running and waiting is limited;
+when the limit is reached the job is rejected with PoolBusy instead of queueing without bound.
+Thread jobs run in a copy of the context of the caller, so context variables (e.g. the replica routing of
+the request, see cinema_app.routers) apply to them.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+
+POOL_DEFAULTS = {
+    'KIND': 'thread',
+    'WORKERS': os.cpu_count() or 1,
+    'QUEUE_DEPTH': 64,
+}
+
+
+class PoolBusy(Exception):
+    """
+    Raised when a pool already has the maximum number of running and waiting jobs.
+    """
+
+
+class BoundedPool:
+    """
+    Attributes:
+        kind (str): 'thread' or 'process'.
+        workers (int): The number of workers.
+        queue_depth (int): How many jobs may wait for a free worker.
+        busy_exception: The PoolBusy subclass raised when the pool is saturated.
+    """
+    busy_exception = PoolBusy
+
+    def __init__(self, kind, workers, queue_depth):
+        self.kind = kind
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._executor = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, name, **defaults):
+        """
+        Builds the pool from the dict setting name (KIND, WORKERS, QUEUE_DEPTH) over POOL_DEFAULTS and defaults.
+        """
+        options = {**POOL_DEFAULTS, **defaults, **getattr(settings, name, {})}
+        return cls(kind=options['KIND'], workers=options['WORKERS'], queue_depth=options['QUEUE_DEPTH'])
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self.kind == 'process' else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_depth:
+                raise self.busy_exception()
+            self._in_flight += 1
+        try:
+            if self.kind != 'process':
+                func, args = contextvars.copy_context().run, (func, *args)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# the purchase transactions of the async API; threads only: every worker keeps its own database connection
+purchase_pool = BoundedPool.from_settings('PURCHASE_POOL', KIND='thread', WORKERS=4)
@@ -0,0 +1,93 @@
+"""
+Batched purge of expired authentication data: API tokens, API refresh credentials and web sessions.
+
+Rows are deleted in bounded primary-key ranges with a pause between batches,
+so the purge never holds a long write lock (important for SQLite).
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from cinema_app.models import RefreshToken
+from cinema_house.settings import TOKEN_LIFETIME
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_batches(queryset, batch_size=500, sleep=0.05):
+    """
+    Deletes the rows of the queryset by consecutive primary-key ranges of at most batch_size rows.
+    Returns: the number of deleted rows.
+    """
+    removed = 0
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return removed
+        deleted, _ = queryset.filter(pk__gte=pks[0], pk__lte=pks[-1]).delete()
+        removed += deleted
+        last_pk = pks[-1]
+        if len(pks) < batch_size:
+            return removed
+        time.sleep(sleep)
+
+
+def purge_expired_auth(batch_size=500, sleep=0.05):
+    """
+    Deletes expired tokens (older than TOKEN_LIFETIME), expired refresh credentials and expired sessions.
+    Returns: dict with the number of removed rows per table and the spent time in seconds.
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    report = {
+        'tokens': delete_in_batches(Token.objects.filter(created__lt=now - timedelta(seconds=TOKEN_LIFETIME)),
+                                    batch_size, sleep),
+        'refresh_tokens': delete_in_batches(RefreshToken.objects.filter(expires__lt=now), batch_size, sleep),
+        'sessions': delete_in_batches(Session.objects.filter(expire_date__lt=now), batch_size, sleep),
+    }
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+
+class PurgeScheduler(threading.Thread):
+    """
+    An optional in-process scheduler that runs purge_expired_auth every `interval` seconds in a daemon thread.
+    It is started by CinemaAppConfig.ready() when settings.AUTH_PURGE_INTERVAL is set.
+    """
+
+    def __init__(self, interval, batch_size=500, sleep=0.05):
+        super().__init__(name='auth-purge', daemon=True)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.sleep = sleep
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                report = purge_expired_auth(self.batch_size, self.sleep)
+                logger.info('Expired auth data purged: %s', report)
+            except Exception:
+                logger.exception('Expired auth data purge failed')
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_purge_scheduler():
+    interval = getattr(settings, 'AUTH_PURGE_INTERVAL', None)
+    if not interval:
+        return None
+    scheduler = PurgeScheduler(interval, getattr(settings, 'AUTH_PURGE_BATCH_SIZE', 500),
+                               getattr(settings, 'AUTH_PURGE_SLEEP', 0.05))
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,104 @@
+"""
+Query budgets of the views and serializers, checked in development and by the test suite.
+
+A view declares the most database queries a request to it may make with a query_budget class attribute: a number,
+or a dict by viewset action / lowercase HTTP method, e.g. `query_budget = {'list': 4, 'create': 9}` (the methods
+and actions missing from the dict are not checked). QueryBudgetMiddleware counts the queries of the whole request
+(the record_query wrapper of cinema_app.metrics, so the session and authentication queries count too) and raises
+QueryBudgetExceeded when a request goes over the budget of its view.
+
+A serializer with QueryBudgetMixin declares query_budget for its phases: 'validate' (is_valid()), 'save' (save())
+and 'represent' (to_representation() of one object, so an N+1 query of a list shows up at its first row);
+a number is the budget of every phase. The serializers are checked while they serve a request.
+
+QUERY_BUDGET['ENABLED'] turns the checks on (DEBUG in the settings); disabled, the middleware is not used
+and the serializers count nothing.
+"""
+
+from contextlib import contextmanager
+from django.conf import settings
+from cinema_app.metrics import RequestMeasurements, current_request
+
+QUERY_BUDGET_DEFAULTS = {
+    'ENABLED': False,
+}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budgets_enabled():
+    return getattr(settings, 'QUERY_BUDGET', QUERY_BUDGET_DEFAULTS).get('ENABLED', False)
+
+
+def budget_for(budget, key):
+    """
+    Returns: the budget of the action / method / phase key of a query_budget declaration, None if it has none.
+    """
+    return budget.get(key) if isinstance(budget, dict) else budget
+
+
+def view_query_budget(match, method):
+    """
+    Returns: (the view name, its query budget for the HTTP method) of a resolver match, the budget None
+    if the view declares none.
+    """
+    if match is None:
+        return None, None
+    view = match.func
+    view_class = getattr(view, 'view_class', None) or getattr(view, 'cls', None) or view
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        method = method.lower()
+        budget = budget.get((getattr(view, 'actions', None) or {}).get(method, method))
+    return view_class.__qualname__, budget
+
+
+@contextmanager
+def counted_queries():
+    """
+    Yields a function returning the number of queries made since the block was entered.
+    """
+    measurements = current_request.get()
+    token = None
+    if measurements is None:
+        measurements = RequestMeasurements()
+        token = current_request.set(measurements)
+    queries = measurements.queries
+    try:
+        yield lambda: measurements.queries - queries
+    finally:
+        if token is not None:
+            current_request.reset(token)
+
+
+def check_query_budget(name, queries, budget):
+    if queries > budget:
+        raise QueryBudgetExceeded(f'{name} made {queries} queries, its query budget is {budget}')
+
+
+class QueryBudgetMixin:
+    """
+    Serializers: checks the queries of is_valid(), save() and to_representation() against query_budget
+    during the requests (the serializers used outside a request are not checked).
+    """
+    query_budget = None
+
+    def budgeted(self, phase, method, *args, **kwargs):
+        budget = budget_for(self.query_budget, phase)
+        if budget is None or current_request.get() is None or not query_budgets_enabled():
+            return method(*args, **kwargs)
+        with counted_queries() as queries:
+            result = method(*args, **kwargs)
+            check_query_budget(f'{type(self).__name__}.{phase}', queries(), budget)
+        return result
+
+    def is_valid(self, *, raise_exception=False):
+        return self.budgeted('validate', super().is_valid, raise_exception=raise_exception)
+
+    def save(self, **kwargs):
+        return self.budgeted('save', super().save, **kwargs)
+
+    def to_representation(self, instance):
+        return self.budgeted('represent', super().to_representation, instance)
@@ -0,0 +1,185 @@
+"""
+Reconciliation of the denormalized counters updated by the purchases:
+    MovieSession.free_seats, expected hall_size - SUM(quantity) of the purchases of the session;
+    CustomUser.total_sum, expected SUM(purchase_sum) of the hot and the archived purchases of the user.
+
+The expected values are computed with one grouped aggregate per purchase table, streamed in key order and merged
+with the stored counters read in primary key chunks, so the memory does not depend on the table sizes and nothing
+is locked while reading. Drifted counters are optionally repaired in batched updates: each batch recomputes
+the expected values of its rows in its transaction, so purchases made during the scan are not overwritten.
+
+The counters cannot be negative: a negative expected value (an oversold session) is stored as 0, so a counter
+is compared with the clamped value and the oversold rows are reported separately.
+"""
+
+import heapq
+import time
+from abc import ABC, abstractmethod
+from itertools import groupby
+from django.db import transaction
+from django.db.models import Sum
+from cinema_app.models import ArchivedPurchase, CustomUser, MovieSession, Purchase
+
+
+def _grouped_sums(queryset, key, field, keys=None, chunk_size=10000):
+    """
+    Yields (key, SUM(field)) of the queryset grouped by key in key order (for the given keys only, if set).
+    """
+    if keys is not None:
+        queryset = queryset.filter(**{f'{key}__in': keys})
+    return queryset.order_by().values(key).annotate(total=Sum(field)).order_by(key).values_list(
+        key, 'total').iterator(chunk_size=chunk_size)
+
+
+def _merge_sums(*streams):
+    """
+    Merges (key, value) streams sorted by key into one stream with the values of equal keys summed.
+    """
+    for key, items in groupby(heapq.merge(*streams), key=lambda item: item[0]):
+        yield key, sum(value for _, value in items)
+
+
+def _iter_in_chunks(queryset, fields, chunk_size):
+    """
+    Yields values_list('pk', *fields) rows ordered by pk, reading chunk_size rows per query.
+    """
+    last_pk = None
+    while True:
+        chunk = queryset.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list('pk', *fields)[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+class CounterCheck(ABC):
+    """
+    Describes one denormalized counter.
+
+    Attributes:
+        name (str): The name of the check in the report.
+        model: The model storing the counter.
+        field (str): The counter field.
+        extra_fields (tuple): Fields of the model passed to expected().
+    """
+    name = None
+    model = None
+    field = None
+    extra_fields = ()
+
+    @abstractmethod
+    def sums(self, keys=None, chunk_size=10000):
+        """
+        Returns the stream of (pk, aggregated value) in pk order, for the given pks only, if set.
+        """
+
+    @abstractmethod
+    def expected(self, value, *extra):
+        """
+        Returns the expected counter of a row from its aggregated value and extra_fields.
+        """
+
+
+class FreeSeatsCheck(CounterCheck):
+    name = 'free_seats'
+    model = MovieSession
+    field = 'free_seats'
+    extra_fields = ('hall__hall_size',)
+
+    def sums(self, keys=None, chunk_size=10000):
+        return _grouped_sums(Purchase.objects, 'movie_id', 'quantity', keys, chunk_size)
+
+    def expected(self, sold, hall_size):
+        return hall_size - sold
+
+
+class TotalSumCheck(CounterCheck):
+    name = 'total_sum'
+    model = CustomUser
+    field = 'total_sum'
+
+    def sums(self, keys=None, chunk_size=10000):
+        return _merge_sums(_grouped_sums(Purchase.objects, 'user_id', 'purchase_sum', keys, chunk_size),
+                           _grouped_sums(ArchivedPurchase.objects, 'user_id', 'purchase_sum', keys, chunk_size))
+
+    def expected(self, spent):
+        return spent
+
+
+COUNTER_CHECKS = (FreeSeatsCheck(), TotalSumCheck())
+
+
+def find_drift(check, chunk_size=10000, oversold=None):
+    """
+    Yields (pk, stored, expected) for the rows of check.model whose counter differs from the expected value
+    (clamped to 0, as repair_drift stores it).
+
+    Args:
+        oversold: An optional list collecting (pk, stored, expected) of the rows with a negative expected value.
+    """
+    sums = check.sums(chunk_size=chunk_size)
+    pending = next(sums, None)
+    for pk, stored, *extra in _iter_in_chunks(check.model.objects.all(), (check.field, *check.extra_fields),
+                                              chunk_size):
+        while pending is not None and pending[0] < pk:
+            pending = next(sums, None)
+        value = pending[1] if pending is not None and pending[0] == pk else 0
+        expected = check.expected(value, *extra)
+        if expected < 0 and oversold is not None:
+            oversold.append((pk, stored, expected))
+        if stored != max(expected, 0):
+            yield pk, stored, max(expected, 0)
+
+
+def repair_drift(check, pks, batch_size=500):
+    """
+    Sets the counters of the rows with the given pks to the expected values, recomputed in the transaction
+    of each batch. Negative expected values (oversold sessions) are stored as 0.
+    Returns: the number of updated rows.
+    """
+    repaired = 0
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        with transaction.atomic():
+            sums = dict(check.sums(keys=batch))
+            updated = []
+            for pk, stored, *extra in check.model.objects.filter(pk__in=batch).values_list(
+                    'pk', check.field, *check.extra_fields):
+                expected = max(check.expected(sums.get(pk, 0), *extra), 0)
+                if stored != expected:
+                    updated.append(check.model(pk=pk, **{check.field: expected}))
+            check.model.objects.bulk_update(updated, [check.field])
+        repaired += len(updated)
+    return repaired
+
+
+def reconcile_counters(repair=False, chunk_size=10000, batch_size=500, sample_size=20):
+    """
+    Checks (and with repair=True repairs) all COUNTER_CHECKS.
+    Returns: the drift report, a dict per check name with
+        drifted: the number of drifted rows;
+        difference: the sum of (stored - expected) over the drifted rows;
+        sample: up to sample_size (pk, stored, expected) tuples;
+        oversold: the number of rows with a negative expected value (stored as 0);
+        oversold_sample: up to sample_size (pk, stored, expected) tuples of them;
+        repaired: the number of repaired rows;
+    and seconds: the spent time.
+    """
+    started = time.perf_counter()
+    report = {}
+    for check in COUNTER_CHECKS:
+        oversold = []
+        drift = list(find_drift(check, chunk_size, oversold))
+        report[check.name] = {
+            'drifted': len(drift),
+            'difference': sum(stored - expected for _, stored, expected in drift),
+            'sample': drift[:sample_size],
+            'oversold': len(oversold),
+            'oversold_sample': oversold[:sample_size],
+            'repaired': repair_drift(check, [pk for pk, _, _ in drift], batch_size) if repair else 0,
+        }
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
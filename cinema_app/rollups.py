@@ -0,0 +1,99 @@
+"""
+Revenue and occupancy rollups per movie session, cinema hall and movie title per day.
+
+The rollups are maintained incrementally: every purchase adds its counters to the three rollup rows
+with additive upserts (INSERT ... ON CONFLICT DO UPDATE SET counter = counter + excluded.counter)
+in the transaction of the purchase, so reports never scan the Purchase table.
+rebuild_rollups recomputes them from Purchase (and ArchivedPurchase) in primary key chunks, one transaction
+per chunk; the session-day rollups of the archived sessions are kept in ArchivedSessionDayRollup.
+"""
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from cinema_app.models import ArchivedPurchase, ArchivedSessionDayRollup, HallDayRollup, MovieDayRollup, Purchase, \
+    SessionDayRollup
+
+# (rollup model, key column, index of the key in a rollup row)
+ROLLUPS = (
+    (SessionDayRollup, 'session_id', 0),
+    (HallDayRollup, 'hall_id', 1),
+    (MovieDayRollup, 'movie_title', 2),
+)
+
+# the rollups of the archived purchases
+ARCHIVED_ROLLUPS = ((ArchivedSessionDayRollup, 'session_id', 0), *ROLLUPS[1:])
+
+COUNTERS = ('purchases', 'tickets', 'revenue')
+
+
+def _upsert_sql(model, key_column):
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = (key_column, 'day', *COUNTERS)
+    updates = ', '.join(f'{quote(column)} = {table}.{quote(column)} + excluded.{quote(column)}'
+                        for column in COUNTERS)
+    return (f'INSERT INTO {table} ({", ".join(quote(column) for column in columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))}) '
+            f'ON CONFLICT ({quote(key_column)}, {quote("day")}) DO UPDATE SET {updates}')
+
+
+def add_to_rollups(rows, rollups=ROLLUPS):
+    """
+    Adds counters to the rollups.
+
+    Args:
+        rows: A list of (session_id, hall_id, movie_title, day, purchases, tickets, revenue) tuples.
+        rollups: The updated rollups, items of ROLLUPS or ARCHIVED_ROLLUPS.
+    """
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        for model, key_column, key_index in rollups:
+            cursor.executemany(_upsert_sql(model, key_column), [
+                (row[key_index], connection.ops.adapt_datefield_value(row[3]), *row[4:]) for row in rows
+            ])
+
+
+def record_purchase(purchase):
+    """
+    Adds a saved purchase to the rollups. Must be called in the transaction that saves the purchase.
+    """
+    movie = purchase.movie
+    add_to_rollups([(movie.id, movie.hall_id, movie.movie_title, purchase.purchase_date,
+                     1, purchase.quantity, purchase.purchase_sum)])
+
+
+def rebuild_rollups(chunk_size=10000):
+    """
+    Recomputes the rollups from Purchase and ArchivedPurchase: the purchases are aggregated per primary key range
+    of chunk_size rows, and the aggregates of the chunks are added up by the upserts. Archived purchases are added
+    to the archived session-day rollups and to the hall and movie rollups.
+
+    The rollups are emptied and the last primary keys are read in one transaction, then every chunk is committed
+    on its own, so the purchases are not blocked by the SQLite write lock for the whole rebuild. A purchase made
+    during the rebuild is above the last primary key and is added to the rollups by record_purchase only.
+    The reports read partial totals until the last chunk is committed, and the rebuild must not run together
+    with archive_sessions (the moved purchases would be counted twice or not at all).
+    Returns a report dict.
+    """
+    report = {'purchases': 0, 'chunks': 0}
+    sources = ((Purchase, ROLLUPS), (ArchivedPurchase, ARCHIVED_ROLLUPS))
+    with transaction.atomic():
+        for model, _, _ in (*ROLLUPS, ARCHIVED_ROLLUPS[0]):
+            model.objects.all().delete()
+        last_pks = [purchase_model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+                    for purchase_model, _ in sources]
+    for (purchase_model, rollups), last_pk in zip(sources, last_pks):
+        for start in range(0, last_pk, chunk_size):
+            with transaction.atomic():
+                chunk = purchase_model.objects.filter(
+                    pk__gt=start, pk__lte=min(start + chunk_size, last_pk)
+                ).order_by().values(
+                    'movie_id', 'movie__hall_id', 'movie__movie_title', 'purchase_date'
+                ).annotate(purchases=Count('id'), tickets=Sum('quantity'), revenue=Sum('purchase_sum'))
+                rows = [(row['movie_id'], row['movie__hall_id'], row['movie__movie_title'], row['purchase_date'],
+                         row['purchases'], row['tickets'], row['revenue']) for row in chunk]
+                add_to_rollups(rows, rollups)
+                report['purchases'] += sum(row[4] for row in rows)
+                report['chunks'] += 1
+    return report
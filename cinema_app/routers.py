@@ -0,0 +1,85 @@
+"""
+Database routing between the primary database ('default') and the read replicas (DATABASE_REPLICAS in the settings).
+
+Reads go to a replica only inside replica_reads() (ReplicaRoutingMiddleware uses it for GET / HEAD / OPTIONS
+requests), one replica per request, so all pages of a request see the same snapshot. Everything else reads from
+the primary: management commands, purchase validation in POST requests, open transactions, the session and token
+tables, the user of the session (cinema_app.backends.PrimaryModelBackend) and the signed-token state, and every
+read made after the first write of the request (read-your-writes).
+All writes go to the primary.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# the authentication state must never be read stale
+PRIMARY_ONLY_APPS = ('sessions', 'authtoken')
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    """
+    The replica chosen for the current request (None to read from the primary) and whether the request wrote.
+    """
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def choose_replica():
+    """
+    Returns: a random replica alias or None if no replicas are configured.
+    """
+    replicas = replica_aliases()
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def replica_reads(replica):
+    """
+    Routes the reads of the block to the replica alias (to the primary if None) until the block writes.
+    Yields the RoutingState, whose wrote attribute tells whether the block wrote.
+    """
+    state = RoutingState(replica)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+class ReplicaRouter:
+    """
+    The database router of the project (DATABASE_ROUTERS), see the module docstring.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or state.replica is None or state.wrote or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_aliases()
@@ -0,0 +1,66 @@
+"""
+Signal receivers of the cinema_app application.
+"""
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from cinema_app.api.authentication import forget_signed_token_state
+from cinema_app.api.token_cache import USER_SNAPSHOT_FIELDS, token_cache
+from cinema_app.db import apply_sqlite_pragmas, sqlite_pragmas
+from cinema_app.metrics import record_query
+from cinema_app.models import CustomUser
+from cinema_app.slow_queries import log_slow_query, slow_query_options
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    """
+    Any deleted token (logout, expired token, deletion from the admin site) must not authenticate from the cache.
+    """
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_cached_user(sender, instance, created, update_fields=None, **kwargs):
+    """
+    The token cache and the signed-token state keep a snapshot of the token owner: a deactivated or demoted user
+    must not keep authenticating from the cache. The saves of fields outside the snapshot (last_login on login)
+    keep the cached tokens.
+    """
+    if update_fields is not None and not set(update_fields) & {*USER_SNAPSHOT_FIELDS, 'token_version'}:
+        return
+    forget_signed_token_state(instance.pk)
+    if created:
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        token_cache.invalidate(key)
+
+
+@receiver(connection_created)
+def setup_sqlite_connection(sender, connection, **kwargs):
+    """
+    Executes the PRAGMAs of the SQLite profile of the settings on every new SQLite connection.
+    """
+    if connection.vendor == 'sqlite':
+        apply_sqlite_pragmas(connection, sqlite_pragmas())
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    """
+    Counts the queries of every connection for the request metrics (the wrapper stays for the life of the
+    connection object, it is installed once).
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_slow_query_log(sender, connection, **kwargs):
+    """
+    Logs the slow queries of every connection (unless SLOW_QUERY_LOG['ENABLED'] is False).
+    """
+    if slow_query_options()['ENABLED'] and log_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_query)
@@ -0,0 +1,235 @@
+"""
+Slow-query log.
+
+log_slow_query is a database execute wrapper (installed on every connection, see cinema_app.signals): a query
+that takes at least SLOW_QUERY_LOG['THRESHOLD_MS'] is logged with its SQL, parameters, duration, database alias,
+the view of the request (set by RequestMetricsMiddleware) and the innermost cinema_app stack frame that ran it.
+For the views of EXPLAIN_VIEWS (the listing and purchase endpoints) the query plan is captured as well,
+with the EXPLAIN of the database backend on a separate cursor (EXPLAIN without ANALYZE does not run the query).
+
+The request thread only puts the entry on a queue (QueueHandler); a QueueListener thread writes it as a JSON line
+to FILE, rotated at MAX_BYTES with BACKUP_COUNT old files. summarize_slow_queries adds up the entries of the log
+(and of its rotated files) by SQL for manage.py slow_queries.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from django.conf import settings
+from django.db import DatabaseError
+from cinema_app.metrics import current_request
+
+SLOW_QUERY_LOG_DEFAULTS = {
+    'ENABLED': True,
+    'THRESHOLD_MS': 100,
+    'FILE': None,
+    'MAX_BYTES': 10 * 1024 * 1024,
+    'BACKUP_COUNT': 5,
+    'EXPLAIN_VIEWS': (),
+}
+
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SKIPPED_FILES = {os.path.join(APP_DIR, name) for name in ('slow_queries.py', 'metrics.py')}
+
+logger = logging.getLogger(__name__)
+
+
+def slow_query_options():
+    return {**SLOW_QUERY_LOG_DEFAULTS, **getattr(settings, 'SLOW_QUERY_LOG', {})}
+
+
+class EntryQueueHandler(QueueHandler):
+    """
+    Puts the entry dict on the queue as it is: the JSON encoding is done by the listener thread.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class JSONLineFormatter(logging.Formatter):
+
+    def format(self, record):
+        return json.dumps(record.msg, default=str)
+
+
+class SlowQueryLog:
+    """
+    Attributes:
+        threshold (float): The minimum duration of a logged query in seconds.
+        explain_views (frozenset): The views whose slow queries are logged with the query plan.
+        path (str): The JSONL file of the entries.
+    """
+
+    def __init__(self, threshold_ms, path, max_bytes, backup_count, explain_views):
+        self.threshold = threshold_ms / 1000
+        self.explain_views = frozenset(explain_views)
+        self.path = str(path) if path else None
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.listener = None
+
+    @classmethod
+    def from_settings(cls):
+        options = slow_query_options()
+        return cls(threshold_ms=options['THRESHOLD_MS'], path=options['FILE'], max_bytes=options['MAX_BYTES'],
+                   backup_count=options['BACKUP_COUNT'], explain_views=options['EXPLAIN_VIEWS'])
+
+    def start(self):
+        """
+        Connects the logger to the background writer of the file (once).
+        """
+        if self.listener is not None or not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        file_handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                                           encoding='utf-8', delay=True)
+        file_handler.setFormatter(JSONLineFormatter())
+        entries = queue.SimpleQueue()
+        self.listener = QueueListener(entries, file_handler)
+        self.listener.start()
+        self.handler = EntryQueueHandler(entries)
+        logger.addHandler(self.handler)
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+        atexit.register(self.stop)
+
+    def stop(self):
+        """
+        Writes the queued entries and stops the background writer.
+        """
+        if self.listener is not None:
+            logger.removeHandler(self.handler)
+            self.listener.stop()
+            self.listener = None
+
+    def log(self, entry):
+        if self.listener is None:
+            self.start()
+        logger.warning(entry)
+
+    def forget(self):
+        """
+        A forked worker does not inherit the thread of the listener: it starts its own on its first entry.
+        """
+        if self.listener is not None:
+            logger.removeHandler(self.handler)
+            self.listener = None
+
+
+slow_query_log = SlowQueryLog.from_settings()
+os.register_at_fork(after_in_child=slow_query_log.forget)
+
+
+def app_frame():
+    """
+    Returns: 'path:line in function' of the innermost stack frame in cinema_app that led to the query.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename not in SKIPPED_FILES:
+            return f'{os.path.relpath(filename, os.path.dirname(APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def explain(connection, sql, params):
+    """
+    Returns: the rows of the query plan, or {'error': message} if the database cannot explain the query.
+    """
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+        return [[str(value) for value in row] for row in cursor.fetchall()]
+    except DatabaseError as error:
+        return {'error': str(error)}
+    finally:
+        cursor.close()
+
+
+def log_slow_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper: logs the queries slower than the threshold.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if duration >= slow_query_log.threshold:
+            measurements = current_request.get()
+            view = getattr(measurements, 'view', None)
+            connection = context['connection']
+            entry = {
+                'time': datetime.now(timezone.utc).isoformat(),
+                'duration_ms': round(duration * 1000, 3),
+                'alias': connection.alias,
+                'view': view,
+                'location': app_frame(),
+                'sql': sql,
+                'params': None if many or params is None else params,
+                'many': many,
+            }
+            if (view in slow_query_log.explain_views and not many
+                    and sql.lstrip()[:6].upper().startswith(EXPLAINED_STATEMENTS)):
+                entry['plan'] = explain(connection, sql, params)
+            slow_query_log.log(entry)
+
+
+def log_files(path):
+    """
+    Returns: the rotated files of the log (oldest first) and the log itself, those that exist
+    (none if the directory of the log does not exist yet).
+    """
+    directory = os.path.dirname(path) or '.'
+    if not os.path.isdir(directory):
+        return []
+    backups = sorted((name for name in os.listdir(directory)
+                      if name.startswith(os.path.basename(path) + '.') and name.rsplit('.', 1)[1].isdigit()),
+                     key=lambda name: -int(name.rsplit('.', 1)[1]))
+    files = [os.path.join(os.path.dirname(path), name) for name in backups]
+    return files + [path] if os.path.exists(path) else files
+
+
+def summarize_slow_queries(path, top=10):
+    """
+    Adds up the entries of the log by SQL.
+    Returns: the top SQL statements by the total duration, dicts with sql, count, total_ms, max_ms, mean_ms,
+    the views and the locations that ran them most often and the last query plan.
+    """
+    totals = {}
+    for file_path in log_files(path):
+        with open(file_path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                total = totals.setdefault(entry['sql'], {
+                    'sql': entry['sql'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'views': Counter(), 'locations': Counter(), 'plan': None,
+                })
+                total['count'] += 1
+                total['total_ms'] += entry['duration_ms']
+                total['max_ms'] = max(total['max_ms'], entry['duration_ms'])
+                total['views'][entry.get('view')] += 1
+                total['locations'][entry.get('location')] += 1
+                if entry.get('plan') is not None:
+                    total['plan'] = entry['plan']
+    report = sorted(totals.values(), key=lambda total: total['total_ms'], reverse=True)[:top]
+    for total in report:
+        total['total_ms'] = round(total['total_ms'], 3)
+        total['mean_ms'] = round(total['total_ms'] / total['count'], 3)
+        total['views'] = [view for view, _ in total['views'].most_common(3)]
+        total['locations'] = [location for location, _ in total['locations'].most_common(3)]
+    return report
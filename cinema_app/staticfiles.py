@@ -0,0 +1,219 @@
+"""
+Fingerprinted static files.
+
+CompressedManifestStaticFilesStorage (STORAGES['staticfiles']) is the manifest storage of Django: collectstatic
+copies every file to STATIC_ROOT under a content-hashed name (img/logo.5f2b1c8e4d3a.png) and {% static %} renders
+the hashed names. It also writes a gzip copy (name.gz) of the compressible files that shrink. Until collectstatic
+has run, {% static %} falls back to the plain names.
+
+serve_static serves STATIC_ROOT in-process (STATIC_SERVE, for deployments without a front web server):
+the hashed files with a far-future immutable Cache-Control, the rest with STATIC_MAX_AGE; the gzip copy to the
+clients that accept it; ETag / Last-Modified conditional requests and single byte ranges (206). The body is a
+FileResponse, which the WSGI server sends with sendfile() through wsgi.file_wrapper (e.g. gunicorn).
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core import checks
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from cinema_app.api.compression import accepts_gzip
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# like FileResponse: compressed files are sent as they are, not decoded by the client
+ENCODED_TYPES = {'bzip2': 'application/x-bzip', 'gzip': 'application/gzip', 'xz': 'application/x-xz'}
+
+
+def compressible(name):
+    content_type = mimetypes.guess_type(name)[0] or ''
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also stores gzip copies and renders the plain names of the files
+    it has no manifest entry for (nothing collected yet, e.g. in development and tests).
+    """
+    manifest_strict = False
+    compress_min_size = 256
+    compress_level = 9
+
+    def post_process(self, paths, dry_run=False, **options):
+        self._hashed_names = None
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if dry_run or isinstance(processed, Exception) or not hashed_name:
+                continue
+            for stored in {name, hashed_name}:
+                self.store_compressed(stored)
+
+    def store_compressed(self, name):
+        """
+        Stores name.gz if the file is compressible and the gzip copy is smaller.
+        """
+        if not compressible(name):
+            return
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < self.compress_min_size:
+            return
+        compressed = gzip.compress(content, compresslevel=self.compress_level, mtime=0)
+        if len(compressed) < len(content):
+            if self.exists(name + '.gz'):
+                self.delete(name + '.gz')
+            self._save(name + '.gz', ContentFile(compressed))
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def is_hashed(self, name):
+        """
+        Returns: whether name is the hashed name of a collected file (its content never changes).
+        """
+        hashed_names = getattr(self, '_hashed_names', None)
+        if hashed_names is None:
+            hashed_names = self._hashed_names = set(self.hashed_files.values())
+        return name in hashed_names
+
+
+def byte_range(header, size):
+    """
+    Returns: (first byte, last byte) of a single "bytes=" range of the Range header, None for a header that
+    is not a single byte range (the whole file is sent).
+    Raises: ValueError if the range is not satisfiable.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        first, last = int(first), min(int(last), size - 1) if last else size - 1
+        if first >= size:
+            raise ValueError('Range Not Satisfiable')
+        if last < first:
+            return None
+    else:
+        suffix = int(last)
+        if not suffix or not size:
+            raise ValueError('Range Not Satisfiable')
+        first, last = max(size - suffix, 0), size - 1
+    return first, last
+
+
+class FileRange:
+    """
+    An open file read from `first` for `length` bytes. FileResponse streams it to the end; the WSGI server
+    sends it with sendfile() from the current position of fileno() for the Content-Length.
+    """
+
+    def __init__(self, file, first, length):
+        file.seek(first)
+        self.file, self.remaining = file, length
+
+    def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+@require_safe
+def serve_static(request, path):
+    """
+    The view of the static files collected in STATIC_ROOT.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found')
+    if not path or not os.path.isfile(full_path):
+        raise Http404('Not found')
+    stat = os.stat(full_path)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        not_modified['Cache-Control'] = cache_control(path)
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = ENCODED_TYPES.get(encoding) or content_type or 'application/octet-stream'
+    headers = {
+        'Cache-Control': cache_control(path),
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+    compressed = full_path + '.gz'
+    has_compressed = not encoding and os.path.isfile(compressed)
+    range_header = request.META.get('HTTP_RANGE', '')
+    if range_header and request.META.get('HTTP_IF_RANGE', etag) != etag:
+        range_header = ''
+
+    if range_header:
+        try:
+            requested = byte_range(range_header, stat.st_size)
+        except ValueError:
+            return HttpResponse(status=416, headers={'Content-Range': f'bytes */{stat.st_size}'})
+        if requested is not None:
+            first, last = requested
+            response = FileResponse(FileRange(open(full_path, 'rb'), first, last - first + 1), status=206,
+                                    content_type=content_type,
+                                    headers={**headers, 'Content-Range': f'bytes {first}-{last}/{stat.st_size}'})
+            response['Content-Length'] = str(last - first + 1)
+            if has_compressed:
+                patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+
+    if has_compressed and accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        headers.update({'Content-Encoding': 'gzip', 'ETag': f'W/{etag}'})
+        response = FileResponse(open(compressed, 'rb'), filename=os.path.basename(full_path),
+                                content_type=content_type, headers=headers)
+    else:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type, headers=headers)
+    if has_compressed:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def cache_control(path):
+    if isinstance(staticfiles_storage, CompressedManifestStaticFilesStorage) and staticfiles_storage.is_hashed(path):
+        return IMMUTABLE_CACHE_CONTROL
+    return f'public, max-age={getattr(settings, "STATIC_MAX_AGE", 60)}'
+
+
+@checks.register(checks.Tags.security)
+def check_media_root(app_configs, **kwargs):
+    """
+    Uploaded files must not be able to reach the code, the databases or the collected static files.
+    """
+    if not settings.MEDIA_ROOT:
+        return []
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    errors = []
+    for name, directory in (('BASE_DIR', settings.BASE_DIR), ('STATIC_ROOT', settings.STATIC_ROOT)):
+        if not directory:
+            continue
+        directory = os.path.realpath(directory)
+        if media_root == directory or directory.startswith(media_root + os.sep):
+            errors.append(checks.Error(f'MEDIA_ROOT must not contain {name} ({directory}).', id='cinema_app.E001'))
+    return errors
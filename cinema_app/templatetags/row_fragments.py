@@ -0,0 +1,78 @@
+"""
+Per-row fragment cache of the list pages (the schedule and the purchase history).
+
+{% row_fragments 'fragments/movie_session_row.html' moviesession_list purchase_form=purchase_form %} renders
+every row of the list with the row template (as `row`, with `role` and the keyword arguments) and caches the
+markup under the page template, the row template, the role of the user, the id of the row and its version.
+A page fetches the fragments of all its rows with one get_many, renders and stores only the missing ones and
+joins them. The version is a digest of the loaded field values of the row (and of its select_related objects),
+so a changed row (e.g. free seats after a purchase) gets a new key and is never served stale.
+
+The row templates see only their own context (no request, user or context processors). {% csrf_token %}
+renders a placeholder that is replaced with the token of the request after the fragments are assembled.
+"""
+
+import hashlib
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CSRF_TOKEN_PLACEHOLDER = 'ROWFRAGMENTCSRFTOKEN'
+
+
+def user_role(user):
+    """
+    Returns: the role the rows are rendered for: 'anonymous', 'user' or 'superuser'.
+    """
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    return 'superuser' if user.is_superuser else 'user'
+
+
+def row_values(instance):
+    """
+    Returns: the loaded field values of the model instance and of its cached related objects
+    (deferred fields are not loaded and make no query).
+    """
+    values = [instance._meta.label]
+    values.extend(value for name, value in sorted(vars(instance).items()) if not name.startswith('_'))
+    for name, related in sorted(instance._state.fields_cache.items()):
+        values.append((name, row_values(related) if related is not None else None))
+    return values
+
+
+def fragment_key(page, template_name, role, row):
+    version = hashlib.md5(repr(row_values(row)).encode(), usedforsecurity=False).hexdigest()
+    return f'row_fragment:{page}:{template_name}:{role}:{row._meta.label_lower}:{row.pk}:{version}'
+
+
+@register.simple_tag(takes_context=True)
+def row_fragments(context, template_name, rows, **extra):
+    """
+    Returns: the markup of the rows, from the fragment cache (FRAGMENT_CACHE_ALIAS) where possible.
+    The keyword arguments must be the same for all the requests of the page: they are not part of the key.
+    """
+    rows = list(rows)
+    if not rows:
+        return ''
+    cache = caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+    role = user_role(context.get('user'))
+    page = context.template.name if context.template is not None else ''
+    keys = [fragment_key(page, template_name, role, row) for row in rows]
+    fragments = cache.get_many(keys)
+    missing = {key: row for key, row in zip(keys, rows) if key not in fragments}
+    if missing:
+        row_template = get_template(template_name)
+        rendered = {key: row_template.render({'row': row, 'role': role, 'csrf_token': CSRF_TOKEN_PLACEHOLDER,
+                                              **extra})
+                    for key, row in missing.items()}
+        cache.set_many(rendered, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600))
+        fragments.update(rendered)
+    html = ''.join(fragments[key] for key in keys)
+    if CSRF_TOKEN_PLACEHOLDER in html:
+        html = html.replace(CSRF_TOKEN_PLACEHOLDER, str(context.get('csrf_token', '')))
+    return mark_safe(html)
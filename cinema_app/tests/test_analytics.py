@@ -0,0 +1,82 @@
+from unittest import skipUnless
+from django.test import TestCase
+from cinema_app import analytics
+from cinema_app.archive import archive_ended_sessions
+from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
+from cinema_app.rollups import rebuild_rollups
+
+
+class OccupancyReportTest(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='buyer', email='buyer@email.com', password='UserPass3')
+        big = CinemaHall.objects.create(hall_name='Big', hall_size=100)
+        small = CinemaHall.objects.create(hall_name='Small', hall_size=0)
+        self.evening = MovieSession.objects.create(hall=big, movie_title='Evening', movie_description='About',
+                                                   session_start_time='19:00', session_end_time='21:30',
+                                                   ticket_price=100)
+        self.night = MovieSession.objects.create(hall=big, movie_title='Night', movie_description='About',
+                                                 session_start_time='23:00', session_end_time='01:00',
+                                                 ticket_price=150)
+        self.unscheduled = MovieSession.objects.create(hall=small, movie_title='Unscheduled',
+                                                       movie_description='About', ticket_price=50)
+        for movie, day, quantity in ((self.evening, '2023-08-01', 10), (self.evening, '2023-08-04', 15),
+                                     (self.night, '2023-08-02', 4), (self.unscheduled, '2023-08-02', 1)):
+            purchase = Purchase.objects.create(user=user, movie=movie, quantity=quantity,
+                                               purchase_sum=movie.ticket_price * quantity)
+            Purchase.objects.filter(pk=purchase.pk).update(purchase_date=day)
+        rebuild_rollups()
+
+    def test_python_backend(self):
+        report = analytics.occupancy_report(backend='python')
+        evening, night, unscheduled = report['sessions']
+        self.assertEqual((evening['tickets'], evening['revenue'], evening['load_factor']), (25, 2500, 0.25))
+        self.assertEqual(evening['revenue_per_seat_hour'], 2500 / 250)
+        self.assertEqual((evening['sales_days'], evening['velocity']), (4, 6.25))
+        self.assertEqual(night['revenue_per_seat_hour'], 600 / 200)
+        self.assertEqual((unscheduled['load_factor'], unscheduled['revenue_per_seat_hour']), (None, None))
+        self.assertEqual((report['demand_by_hour'][19], report['demand_by_hour'][23], sum(report['demand_by_hour'])),
+                         (25, 4, 29))
+        self.assertEqual(report['totals']['tickets'], 30)
+        self.assertEqual(report['totals']['load_factor'], 30 / 200)
+
+    def test_sources_match(self):
+        self.assertEqual(analytics.occupancy_report(backend='python', source='purchases'),
+                         analytics.occupancy_report(backend='python', source='rollups'))
+        with self.assertRaises(ValueError):
+            analytics.occupancy_report(source='sessions')
+
+    def test_archived_sessions_included(self):
+        expected = analytics.occupancy_report(backend='python')
+        MovieSession.objects.filter(pk=self.evening.pk).update(session_show_end_date='2023-08-05')
+        archive_ended_sessions(days=30, sleep=0)
+        self.assertFalse(MovieSession.objects.filter(pk=self.evening.pk).exists())
+        for source in analytics.SOURCES:
+            self.assertEqual(analytics.occupancy_report(backend='python', source=source), expected)
+
+    def test_date_range(self):
+        report = analytics.occupancy_report(date_from='2023-08-02', date_to='2023-08-03', backend='python')
+        self.assertEqual([session['tickets'] for session in report['sessions']], [0, 4, 1])
+        self.assertEqual(report['sessions'][0]['velocity'], 0.0)
+        # the evening session sold nothing in the range: its seats are not in the totals
+        self.assertEqual(report['totals']['load_factor'], 5 / 100)
+        self.assertEqual(report['totals']['revenue_per_seat_hour'], 650 / 200)
+
+    @skipUnless(analytics.np is not None, 'NumPy is not installed')
+    def test_numpy_backend_matches_python(self):
+        for date_from, source in ((None, 'rollups'), ('2023-08-02', 'rollups'), (None, 'purchases')):
+            python = analytics.occupancy_report(date_from=date_from, backend='python', source=source)
+            vectorized = analytics.occupancy_report(date_from=date_from, backend='numpy', source=source)
+            self.assertEqual(vectorized['backend'], 'numpy')
+            self.assertEqual(vectorized['demand_by_hour'], python['demand_by_hour'])
+            self.assertEqual(vectorized['totals'], python['totals'])
+            for expected, row in zip(python['sessions'], vectorized['sessions']):
+                for metric, value in expected.items():
+                    if isinstance(value, float):
+                        self.assertAlmostEqual(row[metric], value)
+                    else:
+                        self.assertEqual(row[metric], value)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            analytics.occupancy_report(backend='fortran')
@@ -0,0 +1,200 @@
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.contrib.auth.backends import BaseBackend
+from django.contrib.auth.signals import user_login_failed
+from django.test import TestCase, TransactionTestCase, AsyncClient
+from freezegun import freeze_time
+from rest_framework.authtoken.models import Token
+from cinema_app.hashing import hashing_pool, PasswordHashingBusy, PasswordHashingPool
+from cinema_app.models import CinemaHall, CustomUser, MovieSession, Purchase
+from cinema_app.pools import PoolBusy, purchase_pool
+
+
+class ExternalBackend(BaseBackend):
+
+    def authenticate(self, request, username=None, password=None):
+        if username == 'external' and password == 'ExternalPass3':
+            return CustomUser.objects.get(username='user')
+        return None
+
+
+class AsyncLoginRegistrationTest(TestCase):
+
+    def setUp(self):
+        self.client = AsyncClient()
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+
+    async def test_async_login(self):
+        response = await self.client.post('/async/login/', {'username': 'user', 'password': 'UserPass3'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, '/')
+
+    async def test_async_login_invalid_password(self):
+        response = await self.client.post('/async/login/', {'username': 'user', 'password': 'WrongPass3'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+
+    async def test_async_login_failed_signal(self):
+        failed = []
+
+        def receiver(sender, credentials, request, **kwargs):
+            failed.append(credentials['username'])
+
+        user_login_failed.connect(receiver)
+        try:
+            await self.client.post('/async/login/', {'username': 'user', 'password': 'WrongPass3'})
+            await self.client.post('/api/async/login/', {'username': 'nobody', 'password': 'UserPass3'},
+                                   content_type='application/json')
+        finally:
+            user_login_failed.disconnect(receiver)
+        self.assertEqual(failed, ['user', 'nobody'])
+
+    async def test_async_login_configured_backends(self):
+        backends = ['cinema_app.tests.test_async_views.ExternalBackend', 'django.contrib.auth.backends.ModelBackend']
+        with self.settings(AUTHENTICATION_BACKENDS=backends):
+            response = await self.client.post('/async/login/', {'username': 'external', 'password': 'ExternalPass3'})
+            self.assertEqual(response.status_code, 302)
+            response = await self.client.post('/async/login/', {'username': 'user', 'password': 'UserPass3'})
+            self.assertEqual(response.status_code, 302)
+        with self.settings(AUTHENTICATION_BACKENDS=backends[:1]):
+            response = await self.client.post('/async/login/', {'username': 'user', 'password': 'UserPass3'})
+            self.assertEqual(response.status_code, 200)
+
+    async def test_async_registration(self):
+        data = {'username': 'new_user', 'email': 'new_user@email.com', 'password1': 'SuperPass3',
+                'password2': 'SuperPass3'}
+        response = await self.client.post('/async/registration/', data)
+        self.assertEqual(response.status_code, 302)
+        user = await CustomUser.objects.aget(username='new_user')
+        self.assertTrue(user.check_password('SuperPass3'))
+
+    async def test_async_api_login(self):
+        response = await self.client.post('/api/async/login/', {'username': 'user', 'password': 'UserPass3'},
+                                          content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(await Token.objects.filter(key=response.json()['token']).aexists())
+
+    async def test_async_api_registration(self):
+        data = {'username': 'api_user', 'email': 'api_user@email.com', 'password': 'UserPass3'}
+        response = await self.client.post('/api/async/registration/', data, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['username'], 'api_user')
+
+    async def test_async_api_registration_invalid(self):
+        data = {'username': 'user', 'email': 'user2@email.com', 'password': 'UserPass3'}
+        response = await self.client.post('/api/async/registration/', data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_busy_pool(self):
+        with patch.object(hashing_pool, 'run', side_effect=PasswordHashingBusy):
+            response = await self.client.post('/api/async/login/', {'username': 'user', 'password': 'UserPass3'},
+                                              content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class PasswordHashingPoolTest(TestCase):
+
+    async def test_queue_depth_limit(self):
+        pool = PasswordHashingPool(kind='thread', workers=1, queue_depth=0)
+        pool._in_flight = 1
+        with self.assertRaises(PasswordHashingBusy):
+            await pool.make_password('SuperPass3')
+        pool._in_flight = 0
+        encoded = await pool.make_password('SuperPass3')
+        self.assertTrue(await pool.check_password('SuperPass3', encoded))
+        pool.shutdown()
+
+
+def create_sessions(count):
+    hall = CinemaHall.objects.create(hall_name='Red', hall_size=50)
+    return [MovieSession.objects.create(
+        movie_title=f'Movie {i}', hall=hall, session_show_start_date='2023-08-01', session_show_end_date='2099-12-31',
+        session_start_time='15:00:00', session_end_time='17:00:00', ticket_price=10, free_seats=50)
+        for i in range(count)]
+
+
+@freeze_time('2023-08-01 10:00:00')
+class AsyncScheduleTest(TestCase):
+
+    def setUp(self):
+        self.client = AsyncClient()
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.token = Token.objects.create(user=self.user)
+        self.movies = create_sessions(9)
+        Purchase.objects.create(user=self.user, movie=self.movies[0], quantity=2, purchase_sum=20)
+
+    async def test_session_list(self):
+        response = await self.client.get('/async/', {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj'].object_list), 2)
+        self.assertEqual(response.context['paginator'].count, 9)
+        self.assertTrue(response.context['is_paginated'])
+
+    async def test_session_list_invalid_page(self):
+        response = await self.client.get('/async/', {'page': 5})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_movie_details_requires_login(self):
+        response = await self.client.get(f'/async/movie_details/{self.movies[0].pk}/')
+        self.assertEqual(response.status_code, 302)
+        await sync_to_async(self.client.force_login)(self.user)
+        response = await self.client.get(f'/async/movie_details/{self.movies[0].pk}/')
+        self.assertContains(response, 'Movie 0')
+
+    async def test_api_session_list_matches_sync(self):
+        response = await self.client.get('/api/async/movie_session/', {'page': 2})
+        expected = await self.client.get('/api/movie_session/', {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], expected.json()['results'])
+        self.assertEqual(response.json()['count'], 9)
+        self.assertEqual(response.json()['previous'], 'http://testserver/api/async/movie_session/')
+
+    async def test_api_session_retrieve(self):
+        response = await self.client.get(f'/api/async/movie_session/{self.movies[1].pk}/')
+        self.assertEqual(response.json()['movie_title'], 'Movie 1')
+        response = await self.client.get('/api/async/movie_session/1000/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_api_profile(self):
+        response = await self.client.get('/api/async/profile/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.client.get('/api/async/profile/', headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(response.json()['results'][0]['movie']['movie_title'], 'Movie 0')
+
+    async def test_api_purchase_busy_pool(self):
+        with patch.object(purchase_pool, 'run', side_effect=PoolBusy):
+            response = await self.client.post('/api/async/cart/', {'movie': self.movies[0].pk, 'quantity': 1},
+                                              content_type='application/json',
+                                              headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.status_code, 503)
+
+
+@freeze_time('2023-08-01 10:00:00')
+class AsyncPurchaseTest(TransactionTestCase):
+    # the purchase runs in a thread of the purchase pool, with its own database connection
+
+    def setUp(self):
+        self.client = AsyncClient()
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.token = Token.objects.create(user=self.user)
+        self.movie = create_sessions(1)[0]
+
+    async def test_api_purchase(self):
+        response = await self.client.post('/api/async/cart/', {'movie': self.movie.pk, 'quantity': 2},
+                                          content_type='application/json',
+                                          headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['purchase_sum'], 20)
+        movie = await MovieSession.objects.aget(pk=self.movie.pk)
+        user = await CustomUser.objects.aget(pk=self.user.pk)
+        self.assertEqual((movie.free_seats, user.total_sum), (48, 20))
+
+    async def test_api_purchase_invalid_quantity(self):
+        response = await self.client.post('/api/async/cart/', {'movie': self.movie.pk, 'quantity': 500},
+                                          content_type='application/json',
+                                          headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('quantity', response.json())
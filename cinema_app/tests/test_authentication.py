@@ -0,0 +1,222 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from freezegun import freeze_time
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APITestCase, APIClient
+from cinema_app.api.authentication import TokenExpiredAuthentication, SignedTokenAuthentication, \
+    issue_signed_token
+from cinema_app.api.token_cache import TokenCache, token_cache
+from cinema_app.models import CinemaHall, CustomUser, MovieSession
+
+
+class TokenExpiredAuthenticationTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = TokenExpiredAuthentication()
+        caches[token_cache.cache_alias].clear()
+        token_cache.clear_local()
+        token_cache.reset_stats()
+
+    def test_cached_token_makes_no_queries(self):
+        self.auth.authenticate_credentials(self.token.key)
+        with CaptureQueriesContext(connection) as queries:
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(token.key, self.token.key)
+        self.assertEqual(token_cache.stats()['local_hits'], 1)
+
+    def test_shared_cache_hit_after_local_eviction(self):
+        self.auth.authenticate_credentials(self.token.key)
+        token_cache.clear_local()
+        with CaptureQueriesContext(connection) as queries:
+            self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(token_cache.stats()['shared_hits'], 1)
+
+    def test_cached_user_reads_fresh_total_sum(self):
+        self.auth.authenticate_credentials(self.token.key)
+        CustomUser.objects.filter(pk=self.user.pk).update(total_sum=100)
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.total_sum, 100)
+
+    def test_expired_cached_token(self):
+        self.auth.authenticate_credentials(self.token.key)
+        with freeze_time(timezone.now() + timedelta(seconds=1000)):
+            with self.assertRaises(AuthenticationFailed):
+                self.auth.authenticate_credentials(self.token.key)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_logout_invalidates_cache(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = client.post('/api/logout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(token_cache.get(self.token.key))
+        response = client.get('/api/profile/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_demoted_user_stays_demoted(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.auth.authenticate_credentials(self.token.key)
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.is_staff = False
+        user.save()
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertFalse(self.auth.authenticate_credentials(self.token.key)[0].is_staff)
+
+        with freeze_time('2023-08-01 10:00:00'):
+            hall = CinemaHall.objects.create(hall_name='Red', hall_size=50)
+            session = MovieSession.objects.create(
+                movie_title='Movie', movie_description='Description', hall=hall, session_show_start_date='2023-08-01',
+                session_show_end_date='2099-12-31', session_start_time='15:00:00', session_end_time='17:00:00',
+                ticket_price=10, free_seats=50)
+            CustomUser.objects.filter(pk=self.user.pk).update(is_staff=True)
+            self.auth.authenticate_credentials(self.token.key)
+            CustomUser.objects.filter(pk=self.user.pk).update(is_staff=False)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+            response = client.post('/api/cart/', {'movie': session.pk, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user.refresh_from_db()
+        self.assertFalse(user.is_staff)
+        self.assertEqual(user.total_sum, 20)
+
+    def test_process_local_cache_not_shared(self):
+        cache = TokenCache('default', 'api-token', local_size=10, local_ttl=5, shared_ttl=60)
+        self.assertIsNone(cache.shared)
+        cache.set(self.token.key, {'user': {}, 'created': 0, 'expires': timezone.now().timestamp() + 60})
+        cache.clear_local()
+        self.assertIsNone(cache.get(self.token.key))
+        self.assertIsNotNone(token_cache.shared)
+
+    def test_hit_rate_endpoint(self):
+        superuser = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                        password='SuperPass2')
+        client = APIClient()
+        client.force_authenticate(user=superuser)
+        response = client.get('/api/token_cache_stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_rate', response.data)
+
+
+class SignedTokenAuthenticationTestCase(APITestCase):
+
+    def setUp(self):
+        caches[token_cache.cache_alias].clear()
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/signed_login/', {'username': 'user', 'password': 'UserPass3'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['token']
+
+    def test_signed_token_without_queries(self):
+        token = self.login()
+        with CaptureQueriesContext(connection) as queries:
+            user, auth = SignedTokenAuthentication().authenticate_credentials(token)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_signed_token_access(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Signed {self.login()}')
+        response = self.client.get('/api/profile/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_tampered_token(self):
+        token = issue_signed_token(self.user)
+        with self.assertRaises(AuthenticationFailed):
+            SignedTokenAuthentication().authenticate_credentials(token[:-2] + 'xx')
+
+    def test_expired_signed_token(self):
+        token = issue_signed_token(self.user)
+        with freeze_time(timezone.now() + timedelta(seconds=1000)):
+            with self.assertRaises(AuthenticationFailed):
+                SignedTokenAuthentication().authenticate_credentials(token)
+
+    def test_signed_logout_revokes_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Signed {self.login()}')
+        response = self.client.post('/api/signed_logout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/profile/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_signed_token_on_logout(self):
+        token = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Signed {token}')
+        self.assertEqual(self.client.post('/api/logout/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(SignedTokenAuthentication().authenticate_credentials(token)[0], self.user)
+
+    def test_revocation_without_shared_cache(self):
+        with patch.object(token_cache, 'cache_alias', 'default'):
+            token = self.login()
+            SignedTokenAuthentication().authenticate_credentials(token)
+            self.client.credentials(HTTP_AUTHORIZATION=f'Signed {token}')
+            self.assertEqual(self.client.post('/api/signed_logout/').status_code, status.HTTP_200_OK)
+            with self.assertRaises(AuthenticationFailed):
+                SignedTokenAuthentication().authenticate_credentials(token)
+
+    def test_deactivated_user(self):
+        token = self.login()
+        SignedTokenAuthentication().authenticate_credentials(token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            SignedTokenAuthentication().authenticate_credentials(token)
+
+    def test_invalid_header(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Signed a b')
+        self.assertEqual(self.client.get('/api/profile/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RefreshTokenTestCase(APITestCase):
+
+    def setUp(self):
+        caches[token_cache.cache_alias].clear()
+        token_cache.clear_local()
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.client = APIClient()
+        response = self.client.post('/api/login/', {'username': 'user', 'password': 'UserPass3'})
+        self.token = response.data['token']
+        self.refresh = response.data['refresh']
+
+    @patch('django.contrib.auth.base_user.check_password')
+    def test_refresh_without_password_check(self, check_password):
+        response = self.client.post('/api/token_refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['token'], self.token)
+        self.assertNotEqual(response.data['refresh'], self.refresh)
+        check_password.assert_not_called()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {response.data["token"]}')
+        self.assertEqual(self.client.get('/api/profile/').status_code, status.HTTP_200_OK)
+
+    def test_refreshed_access_token_expires(self):
+        response = self.client.post('/api/token_refresh/', {'refresh': self.refresh})
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {response.data["token"]}')
+        with freeze_time(timezone.now() + timedelta(seconds=1000)):
+            self.assertEqual(self.client.get('/api/profile/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_reused_refresh_token_revokes_family(self):
+        response = self.client.post('/api/token_refresh/', {'refresh': self.refresh})
+        new_refresh = response.data['refresh']
+        response = self.client.post('/api/token_refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post('/api/token_refresh/', {'refresh': new_refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_refresh_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.client.post('/api/logout/')
+        self.client.credentials()
+        response = self.client.post('/api/token_refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,257 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from cinema_app.models import CustomUser, RefreshToken, CinemaHall, MovieSession, Purchase, SessionDayRollup, \
+    HallDayRollup, MovieDayRollup, ArchivedMovieSession, ArchivedPurchase, ArchivedSessionDayRollup
+from cinema_app.archive import archive_ended_sessions
+from cinema_app.export import export_chunks
+from cinema_app.reconcile import FreeSeatsCheck, TotalSumCheck, find_drift, reconcile_counters
+from cinema_app import rollups
+from cinema_app.rollups import rebuild_rollups, record_purchase
+from cinema_app.purge import delete_in_batches, purge_expired_auth
+from cinema_app.user_import import import_users, read_rows
+
+
+class PurgeExpiredAuthTest(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        for i in range(5):
+            user = CustomUser.objects.create_user(username=f'user{i}', email=f'user{i}@email.com', password='Pass3')
+            token = Token.objects.create(user=user)
+            if i < 3:
+                Token.objects.filter(pk=token.pk).update(created=now - timedelta(hours=1))
+            RefreshToken.objects.create(key_hash=f'{i:064d}', user=user,
+                                        expires=now + timedelta(days=-1 if i < 2 else 1))
+            Session.objects.create(session_key=f'session{i}', session_data='',
+                                   expire_date=now + timedelta(hours=-1 if i < 4 else 1))
+
+    def test_purge_expired_auth(self):
+        report = purge_expired_auth(batch_size=2, sleep=0)
+        self.assertEqual((report['tokens'], report['refresh_tokens'], report['sessions']), (3, 2, 4))
+        self.assertEqual(Token.objects.count(), 2)
+        self.assertEqual(RefreshToken.objects.count(), 3)
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_delete_in_batches_keeps_rows_between_ranges(self):
+        removed = delete_in_batches(Session.objects.filter(session_key__in=['session0', 'session2']), 1, 0)
+        self.assertEqual(removed, 2)
+        self.assertTrue(Session.objects.filter(session_key='session1').exists())
+
+    def test_command_reports(self):
+        out = StringIO()
+        call_command('purge_expired_auth', '--batch-size', '2', '--sleep', '0', stdout=out)
+        self.assertIn('Removed 3 tokens, 2 refresh tokens, 4 sessions', out.getvalue())
+
+
+class ImportUsersTest(TestCase):
+
+    def setUp(self):
+        CustomUser.objects.create_user(username='Existing', email='existing@email.com', password='SuperPass3')
+        self.path = os.path.join(tempfile.mkdtemp(), 'users.csv')
+        with open(self.path, 'w', newline='') as file:
+            file.write('username,email,password,total_sum\n'
+                       'member1,member1@email.com,MemberPass1,150\n'
+                       'existing,new@email.com,MemberPass2,0\n'
+                       'member3,EXISTING@email.com,MemberPass3,0\n'
+                       'member4,member4@email.com,MemberPass4,20\n'
+                       'MEMBER1,other@email.com,MemberPass5,0\n')
+
+    def test_import_users(self):
+        out = StringIO()
+        call_command('import_users', self.path, '--chunk-size', '2', '--workers', '1', stdout=out)
+        self.assertIn('Created 2 users, skipped 3 duplicates', out.getvalue())
+        member = CustomUser.objects.get(username='member1')
+        self.assertEqual(member.total_sum, 150)
+        self.assertTrue(member.check_password('MemberPass1'))
+
+    def test_import_users_process_pool(self):
+        with open(self.path) as file:
+            report = import_users(read_rows(file, 'csv'), chunk_size=10, workers=2)
+        self.assertEqual((report['created'], report['skipped']), (2, 3))
+        self.assertTrue(CustomUser.objects.get(username='member4').check_password('MemberPass4'))
+
+
+class RebuildRollupsTest(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='buyer', email='buyer@email.com', password='UserPass3')
+        halls = [CinemaHall.objects.create(hall_name=f'Hall {i}', hall_size=20) for i in range(2)]
+        movies = [MovieSession.objects.create(hall=halls[i % 2], movie_title=f'Movie {i % 2}',
+                                              movie_description='About', ticket_price=100) for i in range(3)]
+        for i in range(25):
+            purchase = Purchase.objects.create(user=user, movie=movies[i % 3], quantity=i % 4 + 1,
+                                               purchase_sum=100 * (i % 4 + 1))
+            record_purchase(purchase)
+
+    @staticmethod
+    def rollups():
+        return [list(model.objects.order_by('pk').values_list(*fields))
+                for model, fields in ((SessionDayRollup, ('session_id', 'day', 'purchases', 'tickets', 'revenue')),
+                                      (HallDayRollup, ('hall_id', 'day', 'purchases', 'tickets', 'revenue')),
+                                      (MovieDayRollup, ('movie_title', 'day', 'purchases', 'tickets', 'revenue')))]
+
+    def test_rebuild_matches_incremental_rollups(self):
+        incremental = [sorted(rows) for rows in self.rollups()]
+        HallDayRollup.objects.update(revenue=0)
+        out = StringIO()
+        call_command('rebuild_rollups', '--chunk-size', '4', stdout=out)
+        self.assertIn('Rebuilt the rollups from 25 purchases in 7 chunks', out.getvalue())
+        self.assertEqual([sorted(rows) for rows in self.rollups()], incremental)
+        self.assertEqual(sum(row[4] for row in incremental[2]), sum(Purchase.objects.values_list('purchase_sum',
+                                                                                                 flat=True)))
+
+    def test_transaction_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            report = rebuild_rollups(chunk_size=4)
+        savepoints = [query for query in queries if query['sql'].startswith('SAVEPOINT')]
+        self.assertEqual(len(savepoints), report['chunks'] + 1)
+
+    def test_purchase_during_rebuild_counted_once(self):
+        add_to_rollups = rollups.add_to_rollups
+        movie = MovieSession.objects.first()
+
+        def add_with_purchase(rows, chunk_rollups=rollups.ROLLUPS):
+            if not Purchase.objects.filter(quantity=10).exists():
+                purchase = Purchase.objects.create(user=CustomUser.objects.get(), movie=movie, quantity=10,
+                                                   purchase_sum=1000)
+                record_purchase(purchase)
+            add_to_rollups(rows, chunk_rollups)
+
+        with patch.object(rollups, 'add_to_rollups', add_with_purchase):
+            report = rebuild_rollups(chunk_size=4)
+        self.assertEqual(report['purchases'], 25)
+        self.assertEqual(sum(row[4] for row in self.rollups()[2]), sum(Purchase.objects.values_list('purchase_sum',
+                                                                                                    flat=True)))
+
+
+class ExportDataTest(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='buyer', email='buyer@email.com', password='UserPass3')
+        hall = CinemaHall.objects.create(hall_name='Hall', hall_size=20)
+        movie = MovieSession.objects.create(hall=hall, movie_title='Movie', movie_description='About',
+                                            ticket_price=100)
+        for i in range(5):
+            Purchase.objects.create(user=user, movie=movie, quantity=1, purchase_sum=100)
+
+    def test_export_chunks(self):
+        chunks = list(export_chunks('purchases', 'csv', chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[0].startswith('id,purchase_date,'))
+        self.assertEqual(sum(chunk.count('\n') for chunk in chunks), 6)
+
+    def test_command_writes_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'purchases.jsonl')
+        call_command('export_data', 'purchases', '--format', 'jsonl', '--output', path, stderr=StringIO())
+        with open(path) as file:
+            self.assertEqual(len(file.readlines()), 5)
+
+    def test_command_stdout(self):
+        out = StringIO()
+        call_command('export_data', 'sessions', stdout=out)
+        hall_id = str(MovieSession.objects.get().hall_id)
+        self.assertEqual(out.getvalue().splitlines()[1].split(',')[1:4], ['Movie', hall_id, 'Hall'])
+
+
+class ArchiveSessionsTest(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='buyer', email='buyer@email.com', password='UserPass3')
+        hall = CinemaHall.objects.create(hall_name='Hall', hall_size=20)
+        today = timezone.localdate()
+        for i, ended_days_ago in enumerate((100, 40, 31, 30, 0)):
+            movie = MovieSession.objects.create(hall=hall, movie_title=f'Movie {i}', movie_description='About',
+                                                session_show_end_date=today - timedelta(days=ended_days_ago),
+                                                ticket_price=100)
+            for _ in range(2):
+                record_purchase(Purchase.objects.create(user=self.user, movie=movie, quantity=1, purchase_sum=100))
+
+    def test_archive_ended_sessions(self):
+        report = archive_ended_sessions(days=30, batch_size=2, sleep=0)
+        self.assertEqual((report['sessions'], report['purchases']), (3, 6))
+        self.assertEqual(list(MovieSession.objects.values_list('movie_title', flat=True)), ['Movie 3', 'Movie 4'])
+        self.assertEqual(Purchase.objects.count(), 4)
+        archived = ArchivedPurchase.objects.select_related('movie').order_by('id')
+        self.assertEqual([purchase.movie.movie_title for purchase in archived][::2], ['Movie 0', 'Movie 1', 'Movie 2'])
+        self.assertEqual(ArchivedMovieSession.objects.get(movie_title='Movie 0').hall.hall_size, 20)
+        self.assertEqual(SessionDayRollup.objects.count(), 2)
+        self.assertEqual(ArchivedSessionDayRollup.objects.get(session__movie_title='Movie 0').tickets, 2)
+
+    def test_rebuild_and_export_include_archive(self):
+        archive_ended_sessions(days=30, sleep=0)
+        rebuild_rollups()
+        self.assertEqual(HallDayRollup.objects.get().tickets, 10)
+        self.assertEqual(SessionDayRollup.objects.count(), 2)
+        self.assertEqual(sorted(ArchivedSessionDayRollup.objects.values_list('tickets', flat=True)), [2, 2, 2])
+        self.assertEqual(sum(chunk.count('\n') for chunk in export_chunks('purchases', 'csv')), 11)
+        self.assertEqual(sum(chunk.count('\n') for chunk in export_chunks('sessions', 'jsonl')), 5)
+
+    def test_command_reports(self):
+        out = StringIO()
+        call_command('archive_sessions', '--days', '35', '--sleep', '0', stdout=out)
+        self.assertIn('Archived 2 sessions and 4 purchases', out.getvalue())
+
+
+class ReconcileCountersTest(TestCase):
+
+    def setUp(self):
+        self.users = [CustomUser.objects.create_user(username=f'buyer{i}', email=f'buyer{i}@email.com',
+                                                     password='UserPass3') for i in range(3)]
+        hall = CinemaHall.objects.create(hall_name='Hall', hall_size=20)
+        self.movies = [MovieSession.objects.create(hall=hall, movie_title=f'Movie {i}', movie_description='About',
+                                                   free_seats=20, ticket_price=100) for i in range(3)]
+        for user, movie, quantity in ((0, 0, 2), (0, 1, 3), (1, 0, 1)):
+            Purchase.objects.create(user=self.users[user], movie=self.movies[movie], quantity=quantity,
+                                    purchase_sum=100 * quantity)
+        MovieSession.objects.filter(pk=self.movies[0].pk).update(free_seats=17)
+        MovieSession.objects.filter(pk=self.movies[1].pk).update(free_seats=20)
+        CustomUser.objects.filter(pk=self.users[0].pk).update(total_sum=500)
+        CustomUser.objects.filter(pk=self.users[1].pk).update(total_sum=300)
+        CustomUser.objects.filter(pk=self.users[2].pk).update(total_sum=50)
+
+    def test_find_drift(self):
+        self.assertEqual(list(find_drift(FreeSeatsCheck(), chunk_size=2)), [(self.movies[1].pk, 20, 17)])
+        self.assertEqual(list(find_drift(TotalSumCheck(), chunk_size=2)),
+                         [(self.users[1].pk, 300, 100), (self.users[2].pk, 50, 0)])
+
+    def test_total_sum_includes_archive(self):
+        ArchivedPurchase.objects.create(
+            id=1000, user=self.users[2], purchase_date='2023-08-01', purchase_sum=50, quantity=1,
+            movie=ArchivedMovieSession.objects.create(id=1000, hall=self.movies[0].hall, movie_title='Old',
+                                                      movie_description='About'))
+        self.assertEqual([pk for pk, _, _ in find_drift(TotalSumCheck())], [self.users[1].pk])
+
+    def test_repair(self):
+        report = reconcile_counters(repair=True, batch_size=1)
+        self.assertEqual((report['free_seats']['drifted'], report['free_seats']['repaired']), (1, 1))
+        self.assertEqual((report['total_sum']['drifted'], report['total_sum']['difference']), (2, 250))
+        self.assertEqual(MovieSession.objects.get(pk=self.movies[1].pk).free_seats, 17)
+        self.assertEqual(CustomUser.objects.get(pk=self.users[1].pk).total_sum, 100)
+        self.assertEqual(reconcile_counters()['total_sum']['drifted'], 0)
+
+    def test_oversold_session(self):
+        Purchase.objects.create(user=self.users[2], movie=self.movies[2], quantity=25, purchase_sum=2500)
+        MovieSession.objects.filter(pk=self.movies[2].pk).update(free_seats=0)
+        oversold = []
+        self.assertNotIn(self.movies[2].pk, [pk for pk, _, _ in find_drift(FreeSeatsCheck(), oversold=oversold)])
+        self.assertEqual(oversold, [(self.movies[2].pk, 0, -5)])
+        reconcile_counters(repair=True)
+        report = reconcile_counters()
+        self.assertEqual((report['free_seats']['drifted'], report['free_seats']['oversold']), (0, 1))
+
+    def test_command_report(self):
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('MovieSession.free_seats: 1 drifted (stored - expected: 3), 0 repaired', out.getvalue())
+        self.assertIn(f'id {self.users[2].pk}: stored 50, expected 0', out.getvalue())
+        self.assertEqual(CustomUser.objects.get(pk=self.users[2].pk).total_sum, 50)
@@ -0,0 +1,34 @@
+import os
+import tempfile
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+from cinema_app.db import sqlite_pragmas
+
+
+class SqlitePragmasTest(TestCase):
+
+    def test_profile_applied_on_connection(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_wal_on_file_database(self):
+        path = os.path.join(tempfile.mkdtemp(), 'pragmas.sqlite3')
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': path}, alias='pragmas')
+        try:
+            with wrapper.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+        finally:
+            wrapper.close()
+
+    @override_settings(SQLITE_PRAGMA_PROFILE='default')
+    def test_default_profile(self):
+        self.assertEqual(sqlite_pragmas(), {})
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            sqlite_pragmas('fastest')
@@ -2,6 +2,9 @@ from unittest.mock import patch
 from django.test import RequestFactory
 from freezegun import freeze_time
 from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from cinema_app.forms import UserCreateForm, CinemaHallCreateForm, MovieSessionForm, PurchaseCreateForm
 from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
 
@@ -26,7 +29,20 @@ class UserCreateFormTest(TestCase):
             'password1': 'SuperSecretPass',
             'password2': 'SuperSecretPass'}
         form = UserCreateForm(data=form_data)
-        self.assertFalse(form.is_valid())
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(form.save())
+        self.assertEqual(form.errors, {'username': ['A user with that username already exists.']})
+
+    def test_create_user_with_exists_name_case_insensitive(self):
+        form_data = {
+            'username': 'Test1',
+            'email': 'best_user@email.com',
+            'password1': 'SuperSecretPass',
+            'password2': 'SuperSecretPass'}
+        form = UserCreateForm(data=form_data)
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(form.save())
+        self.assertEqual(form.errors, {'username': ['A user with that username already exists.']})
 
     def test_create_user_with_exists_email(self):
         form_data = {
@@ -35,7 +51,9 @@ class UserCreateFormTest(TestCase):
             'password1': 'SuperPass123',
             'password2': 'SuperPass123'}
         form = UserCreateForm(data=form_data)
-        self.assertFalse(form.is_valid())
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(form.save())
+        self.assertEqual(form.errors, {'email': ['Email is already registered!']})
 
     def test_create_user_with_exists_email_case_insensitive(self):
         form_data = {
@@ -44,7 +62,30 @@ class UserCreateFormTest(TestCase):
             'password1': 'SuperPass123',
             'password2': 'SuperPass123'}
         form = UserCreateForm(data=form_data)
-        self.assertFalse(form.is_valid())
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(form.save())
+        self.assertEqual(form.errors, {'email': ['Email is already registered!']})
+
+    def test_create_new_user_with_one_query(self):
+        form_data = {
+            'username': 'test_user',
+            'email': 'test_user@email.com',
+            'password1': 'SuperPass3',
+            'password2': 'SuperPass3'}
+        form = UserCreateForm(data=form_data)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(form.is_valid())
+            self.assertIsNotNone(form.save())
+        statements = [query['sql'] for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT'))
+
+    def test_case_insensitive_duplicate_fails_constraint_validation(self):
+        user = CustomUser(username='TEST1', email='USER1@email.com', password='SuperPass3')
+        with self.assertRaises(ValidationError) as error:
+            user.validate_constraints()
+        self.assertEqual(error.exception.messages,
+                         ['A user with that username already exists.', 'Email is already registered!'])
 
     def test_create_user_with_invalid_password(self):
         form_data = {
@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from django.test import TestCase, SimpleTestCase
+from rest_framework.test import APIClient
+from cinema_app.metrics import COUNT, FIELDS, QUERIES, RENDER_SECONDS, RESPONSE_BYTES, MetricsRegistry, \
+    RequestMeasurements, metrics_registry, render_prometheus
+from cinema_app.models import CinemaHall, CustomUser, MovieSession
+
+
+def measurements(queries=0, query_seconds=0.0, render_seconds=0.0):
+    result = RequestMeasurements()
+    result.queries, result.query_seconds, result.render_seconds = queries, query_seconds, render_seconds
+    return result
+
+
+class MetricsRegistryTest(SimpleTestCase):
+
+    def test_threads(self):
+        registry = MetricsRegistry(buckets=(0.1, 1))
+
+        def work():
+            for _ in range(1000):
+                registry.observe('cinema', 0.05, measurements(queries=2), 100, 200)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        values = registry.snapshot()['cinema']
+        self.assertEqual(values[COUNT], 4000)
+        self.assertEqual(values[QUERIES], 8000)
+        self.assertEqual(values[RESPONSE_BYTES], 400000)
+        self.assertEqual(values[FIELDS:], [4000, 0, 0])
+
+    def test_render_prometheus(self):
+        registry = MetricsRegistry(buckets=(0.1, 1))
+        registry.observe('cinema', 0.05, measurements(queries=3), 10, 200)
+        registry.observe('cinema', 0.5, measurements(queries=1), 10, 500)
+        registry.observe('na"me', 5, measurements(), 0, 200)
+        text = render_prometheus(registry.collect(), registry.buckets)
+        self.assertIn('cinema_request_duration_seconds_bucket{view="cinema",le="0.1"} 1\n', text)
+        self.assertIn('cinema_request_duration_seconds_bucket{view="cinema",le="1"} 2\n', text)
+        self.assertIn('cinema_request_duration_seconds_bucket{view="cinema",le="+Inf"} 2\n', text)
+        self.assertIn('cinema_request_duration_seconds_count{view="cinema"} 2\n', text)
+        self.assertIn('cinema_db_queries_total{view="cinema"} 4\n', text)
+        self.assertIn('cinema_server_errors_total{view="cinema"} 1\n', text)
+        self.assertIn('cinema_request_duration_seconds_bucket{view="na\\"me",le="1"} 0\n', text)
+
+    def test_files_mode(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        registry = MetricsRegistry(buckets=(0.1, 1), directory=directory, flush_interval=3600)
+        registry.observe('cinema', 0.05, measurements(queries=2), 10, 200)
+        other_worker = [1, 0.5, 5, 0.0, 0.0, 20, 0, 0, 1, 0]
+        with open(os.path.join(directory, 'metrics-1.json'), 'w') as file:
+            json.dump({'buckets': [0.1, 1], 'views': {'cinema': other_worker, 'profile': other_worker}}, file)
+        totals = registry.collect()
+        self.assertEqual(totals['cinema'][COUNT], 2)
+        self.assertEqual(totals['cinema'][QUERIES], 7)
+        self.assertEqual(totals['cinema'][FIELDS:], [1, 1, 0])
+        self.assertEqual(totals['profile'][COUNT], 1)
+        self.assertTrue(os.path.exists(registry.path()))
+
+    def test_exited_worker_file_removed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        registry = MetricsRegistry(buckets=(0.1, 1), directory=directory, flush_interval=3600)
+        registry.observe('cinema', 0.05, measurements(queries=2), 10, 200)
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        path = registry.path(exited.pid)
+        with open(path, 'w') as file:
+            json.dump({'buckets': [0.1, 1], 'views': {'cinema': [1, 0.5, 5, 0.0, 0.0, 20, 0, 0, 1, 0]}}, file)
+        self.assertEqual(registry.collect()['cinema'][COUNT], 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(registry.path()))
+
+    def test_unknown_mode(self):
+        with self.settings(METRICS={'MODE': 'shared'}):
+            with self.assertRaises(ValueError):
+                MetricsRegistry.from_settings()
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.client = APIClient()
+        hall = CinemaHall.objects.create(hall_name='Red', hall_size=50)
+        MovieSession.objects.create(
+            movie_title='Movie', movie_description='Description', hall=hall, session_show_start_date='2023-08-01',
+            session_show_end_date='2099-12-31', session_start_time='15:00:00', session_end_time='17:00:00',
+            ticket_price=10, free_seats=50)
+
+    def test_view_measured(self):
+        response = self.client.get('/')
+        values = metrics_registry.snapshot()['cinema']
+        self.assertEqual(values[COUNT], 1)
+        self.assertGreater(values[QUERIES], 0)
+        self.assertGreater(values[RENDER_SECONDS], 0)
+        self.assertEqual(values[RESPONSE_BYTES], len(response.content))
+
+        self.client.get('/no/such/page/')
+        self.assertEqual(metrics_registry.snapshot()['<unresolved>'][COUNT], 1)
+
+    def test_endpoint(self):
+        self.client.get('/api/movie_session/')
+        self.assertIn(self.client.get('/api/metrics/').status_code, (401, 403))
+        user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+        admin = CustomUser.objects.create_superuser(username='admin', email='admin@email.com', password='AdminPass3')
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('cinema_request_duration_seconds_count{view="moviesession-list"} 1', response.content.decode())
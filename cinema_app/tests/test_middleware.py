@@ -0,0 +1,67 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.contrib.auth import login as auth_login
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.test import TestCase, Client, override_settings
+from django.utils import timezone
+from freezegun import freeze_time
+from cinema_app.models import CustomUser
+
+
+class SlidingSessionExpiryMiddlewareTest(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.superuser = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                             password='SuperPass2')
+
+    def test_single_login(self):
+        with patch('django.contrib.auth.views.auth_login', wraps=auth_login) as login:
+            response = self.client.post('/login/', {'username': 'user', 'password': 'UserPass3'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(login.call_count, 1)
+
+    def test_login_sets_role_lifetime(self):
+        self.client.post('/login/', {'username': 'user', 'password': 'UserPass3'})
+        self.assertEqual(self.client.session.get_expiry_age(), 60)
+        admin_client = Client()
+        admin_client.post('/login/', {'username': 'admin', 'password': 'SuperPass2'})
+        self.assertEqual(admin_client.session.get_expiry_age(), 60 * 60 * 9)
+
+    def test_session_not_saved_on_every_request(self):
+        start = timezone.now()
+        with freeze_time(start):
+            self.client.post('/login/', {'username': 'user', 'password': 'UserPass3'})
+        with freeze_time(start + timedelta(seconds=10)), patch.object(SessionStore, 'save') as save:
+            response = self.client.get('/profile/')
+            self.assertEqual(response.status_code, 200)
+            save.assert_not_called()
+
+    def test_session_rewritten_below_threshold(self):
+        start = timezone.now()
+        with freeze_time(start):
+            self.client.post('/login/', {'username': 'user', 'password': 'UserPass3'})
+        with freeze_time(start + timedelta(seconds=40)):
+            self.client.get('/profile/')
+        with freeze_time(start + timedelta(seconds=90)):
+            response = self.client.get('/profile/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_expired_session_logs_out(self):
+        start = timezone.now()
+        with freeze_time(start):
+            self.client.post('/login/', {'username': 'user', 'password': 'UserPass3'})
+        with freeze_time(start + timedelta(seconds=61)):
+            response = self.client.get('/profile/')
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_session_expires(self):
+        start = timezone.now()
+        with freeze_time(start):
+            self.client.post('/login/', {'username': 'user', 'password': 'UserPass3'})
+        with freeze_time(start + timedelta(seconds=20)):
+            self.assertEqual(self.client.get('/profile/').status_code, 200)
+        with freeze_time(start + timedelta(seconds=61)):
+            self.assertEqual(self.client.get('/profile/').status_code, 302)
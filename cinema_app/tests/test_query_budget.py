@@ -0,0 +1,64 @@
+from unittest import mock
+from django.test import TestCase, Client, RequestFactory
+from freezegun import freeze_time
+from rest_framework.test import APIClient
+from cinema_app.api.resourses import MovieSessionViewSet
+from cinema_app.api.serializers import CinemaHallSerializer, MovieSessionSerializer, PurchaseSerializer
+from cinema_app.models import CinemaHall, CustomUser, MovieSession, Purchase
+from cinema_app.query_budget import QueryBudgetExceeded
+from cinema_app.views import MovieSessionListView
+
+
+@freeze_time('2023-08-01 10:00:00')
+class QueryBudgetTest(TestCase):
+
+    def setUp(self):
+        self.hall = CinemaHall.objects.create(hall_name='Red', hall_size=50)
+        self.session = MovieSession.objects.create(
+            movie_title='Movie', movie_description='Description', hall=self.hall, session_show_start_date='2023-08-01',
+            session_show_end_date='2099-12-31', session_start_time='15:00:00', session_end_time='17:00:00',
+            ticket_price=10, free_seats=50)
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.admin = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                         password='AdminPass3')
+
+    def test_view_budget(self):
+        with mock.patch.object(MovieSessionListView, 'query_budget', 1):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'GET / (MovieSessionListView) made 2 queries'):
+                Client().get('/')
+
+    def test_action_budget(self):
+        client = APIClient()
+        with mock.patch.object(MovieSessionViewSet, 'query_budget', {'retrieve': 0}):
+            self.assertEqual(client.get('/api/movie_session/').status_code, 200)
+            with self.assertRaises(QueryBudgetExceeded):
+                client.get(f'/api/movie_session/{self.session.pk}/')
+
+    def test_disabled(self):
+        with self.settings(QUERY_BUDGET={'ENABLED': False}), mock.patch.object(MovieSessionListView, 'query_budget', 0):
+            self.assertEqual(Client().get('/').status_code, 200)
+
+    def test_serializer_budget(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        data = {'hall': self.hall.pk, 'movie_title': 'Other movie', 'movie_description': 'Other description',
+                'session_start_time': '18:00', 'session_end_time': '19:00', 'session_show_start_date': '2023-08-02',
+                'session_show_end_date': '2023-08-05', 'ticket_price': 5}
+        with mock.patch.object(MovieSessionSerializer, 'query_budget', {'validate': 1}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'MovieSessionSerializer.validate made 2 queries'):
+                client.post('/api/movie_session/', data, format='json')
+        self.assertEqual(client.post('/api/movie_session/', data, format='json').status_code, 201)
+
+    def test_validation_queries(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(PurchaseSerializer(data={'movie': self.session.pk, 'quantity': 2}).is_valid())
+        data = {'hall': self.hall.pk, 'movie_title': 'Other movie', 'movie_description': 'Other description',
+                'session_start_time': '18:00', 'session_end_time': '19:00', 'session_show_start_date': '2023-08-02',
+                'session_show_end_date': '2023-08-05', 'ticket_price': 5}
+        with self.assertNumQueries(3):
+            self.assertTrue(MovieSessionSerializer(self.session, data=data).is_valid())
+        Purchase.objects.create(user=self.user, movie=self.session, purchase_sum=10, quantity=1)
+        context = {'request': RequestFactory().put('/')}
+        with self.assertNumQueries(1):
+            self.assertFalse(CinemaHallSerializer(self.hall, data={'hall_name': 'Blue', 'hall_size': 30},
+                                                  context=context).is_valid())
@@ -0,0 +1,75 @@
+import gzip
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import skipIf
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from cinema_app.api.compression import accepts_gzip
+from cinema_app.api.renderers import FastJSONRenderer, json_backend, orjson
+from cinema_app.models import CinemaHall, CustomUser, MovieSession
+
+
+class FastJSONRendererTest(TestCase):
+    data = {
+        'title': 'Movie   ü',
+        'price': Decimal('10.50'),
+        'created': datetime(2023, 8, 1, 10, 0, 0, 123456, tzinfo=timezone.utc),
+        'errors': [ErrorDetail('Invalid', code='invalid')],
+        1: None,
+    }
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_matches_stdlib(self):
+        self.assertEqual(json_backend(), 'orjson')
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    @override_settings(API_JSON_BACKEND='stdlib')
+    def test_stdlib_backend(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    @override_settings(API_JSON_BACKEND='ujson')
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render(self.data)
+
+
+class CompressionTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        hall = CinemaHall.objects.create(hall_name='Red', hall_size=50)
+        for i in range(7):
+            MovieSession.objects.create(
+                movie_title=f'Movie {i}', movie_description='A long description of the movie session ' * 3,
+                hall=hall, session_show_start_date='2023-08-01', session_show_end_date='2099-12-31',
+                session_start_time='15:00:00', session_end_time='17:00:00', ticket_price=10, free_seats=50)
+
+    def test_large_response_compressed(self):
+        plain = self.client.get('/api/movie_session/')
+        response = self.client.get('/api/movie_session/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+
+    def test_not_accepted(self):
+        for accept_encoding in ('', 'br', 'gzip;q=0', '*;q=0'):
+            response = self.client.get('/api/movie_session/', HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_small_response_not_compressed(self):
+        user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/cinema_hall/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip('gzip'))
+        self.assertTrue(accepts_gzip('br;q=1.0, gzip;q=0.8'))
+        self.assertTrue(accepts_gzip('*'))
+        self.assertFalse(accepts_gzip('*, gzip;q=0'))
+        self.assertFalse(accepts_gzip('identity'))
@@ -1,3 +1,4 @@
+import json
 from django.contrib.auth.models import AnonymousUser
 from datetime import datetime
 from rest_framework import status
@@ -7,7 +8,10 @@ from freezegun import freeze_time
 from rest_framework.authtoken.views import obtain_auth_token
 from cinema_app.api.resourses import CustomUserCreateAPIView
 from cinema_app.api.serializers import MovieSessionSerializer, PurchaseReadSerializer
-from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
+from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase, SessionDayRollup, HallDayRollup, \
+    MovieDayRollup
+from cinema_app.archive import archive_ended_sessions
+from cinema_app.rollups import record_purchase
 
 
 class GetTokenTestCase(APITestCase):
@@ -290,6 +294,14 @@ class PurchaseCreateAPIViewTestCase(APITestCase):
         self.assertEqual(response.data, {'id': 1, 'user': 1, 'movie': 1, 'purchase_date': '2023-08-01',
                                          'purchase_sum': 5000, 'quantity': 2})
 
+    def test_create_purchase_updates_rollups(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.post('/api/cart/', data={'movie': 1, 'quantity': 2}, format='json')
+        self.client.post('/api/cart/', data={'movie': 1, 'quantity': 1}, format='json')
+        for model in (SessionDayRollup, HallDayRollup, MovieDayRollup):
+            rollup = model.objects.get()
+            self.assertEqual((rollup.purchases, rollup.tickets, rollup.revenue), (2, 3, 7500))
+
     def test_create_purchase_object_anonymous_user(self):
         self.data = {'movie': 1, 'quantity': 2}
         self.client.force_authenticate(user=AnonymousUser())
@@ -370,3 +382,170 @@ class ProfileApiViewTestCase(APITestCase):
         serializer = PurchaseReadSerializer(queryset, many=True)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['results'], serializer.data)
+
+    def test_purchase_list_query_budget(self):
+        for _ in range(10):
+            Purchase.objects.create(user=self.user, movie=self.movie, purchase_sum=2500, quantity=1)
+        self.client.force_authenticate(user=self.user)
+        # count, the (table, id) keys of the page, the hot rows
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/profile/')
+        self.assertEqual(len(response.data['results']), 7)
+
+    def test_purchase_list_with_archive(self):
+        hot_movie = MovieSession.objects.create(hall=self.hall, movie_title='Hot', movie_description='Still shown',
+                                                session_show_end_date=date.today(), ticket_price=2500)
+        Purchase.objects.create(user=self.user, movie=hot_movie, purchase_sum=2500, quantity=1)
+        Purchase.objects.filter(pk=1).update(purchase_date='2023-07-01')
+        self.movie.session_show_end_date = date.today() - timedelta(days=40)
+        self.movie.save()
+        archive_ended_sessions(days=30, sleep=0)
+        self.client.force_authenticate(user=self.user)
+        # count, the (table, id) keys of the page, the hot rows, the archived rows
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/profile/')
+        self.assertEqual(response.data['count'], 3)
+        # purchase_date is auto_now_add: the archived purchase 2 and the hot purchase are both made today
+        self.assertEqual([row['purchase_sum'] for row in response.data['results']], [10000, 2500, 5000])
+        self.assertEqual(response.data['results'][0]['movie']['movie_title'], 'Test profile api view')
+        self.assertEqual(Purchase.objects.count(), 1)
+
+    def test_purchase_list_superuser_query_budget(self):
+        for _ in range(10):
+            Purchase.objects.create(user=self.user_stranger, movie=self.movie, purchase_sum=2500, quantity=1)
+        self.client.force_authenticate(user=self.superuser)
+        # count, the (table, id) keys of the page, the hot rows
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/profile/')
+        self.assertEqual(len(response.data['results']), 7)
+
+
+class RollupReportApiViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                             password='SuperAdmin2')
+        self.user = CustomUser.objects.create_user(username='buyer', email='buyer@email.com', password='UserPass3')
+        hall = CinemaHall.objects.create(hall_name='Red', hall_size=10)
+        self.movies = [MovieSession.objects.create(hall=hall, movie_title='Report movie', movie_description='About',
+                                                   free_seats=10, ticket_price=100) for _ in range(2)]
+        for movie, day, quantity in ((self.movies[0], '2023-08-01', 2), (self.movies[0], '2023-08-01', 3),
+                                     (self.movies[1], '2023-08-01', 1), (self.movies[0], '2023-08-02', 4)):
+            purchase = Purchase.objects.create(user=self.user, movie=movie, quantity=quantity,
+                                               purchase_sum=100 * quantity)
+            Purchase.objects.filter(pk=purchase.pk).update(purchase_date=day)
+            purchase.purchase_date = date.fromisoformat(day)
+            record_purchase(purchase)
+
+    def test_session_report(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/reports/sessions/', {'date_from': '2023-08-01', 'date_to': '2023-08-01'})
+        self.assertEqual(response.status_code, 200)
+        first = response.data['results'][0]
+        self.assertEqual((first['session'], first['purchases'], first['tickets'], first['revenue'],
+                          first['occupancy']), (self.movies[0].id, 2, 5, 500, 0.5))
+        self.assertEqual(response.data['count'], 2)
+
+    def test_hall_and_movie_reports(self):
+        self.client.force_authenticate(user=self.superuser)
+        with self.assertNumQueries(2):
+            halls = self.client.get('/api/reports/halls/').data['results']
+        movies = self.client.get('/api/reports/movies/', {'date_to': '2023-08-01'}).data['results']
+        self.assertEqual([(row['day'], row['tickets']) for row in halls], [('2023-08-02', 4), ('2023-08-01', 6)])
+        self.assertEqual([(row['movie_title'], row['purchases'], row['revenue']) for row in movies],
+                         [('Report movie', 3, 600)])
+
+    def test_report_invalid_date(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/reports/halls/', {'date_from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_report_user(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/reports/movies/')
+        self.assertEqual(response.status_code, 403)
+
+
+class ExportApiViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                             password='SuperAdmin2')
+        self.user = CustomUser.objects.create_user(username='buyer', email='buyer@email.com', password='UserPass3')
+        hall = CinemaHall.objects.create(hall_name='Green', hall_size=10)
+        self.movie = MovieSession.objects.create(hall=hall, movie_title='Export, "quoted"', movie_description='About',
+                                                 session_show_start_date='2023-08-01',
+                                                 session_show_end_date='2023-08-10', free_seats=10, ticket_price=100)
+        for day, quantity in (('2023-08-01', 1), ('2023-08-02', 2), ('2023-08-03', 3)):
+            purchase = Purchase.objects.create(user=self.user, movie=self.movie, quantity=quantity,
+                                               purchase_sum=100 * quantity)
+            Purchase.objects.filter(pk=purchase.pk).update(purchase_date=day)
+
+    def test_export_purchases_csv(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/export/purchases/', {'date_from': '2023-08-02'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,purchase_date,user_id,username,email,session_id,movie_title,hall_id,'
+                                   'hall_name,quantity,purchase_sum')
+        self.assertEqual(len(lines), 3)
+        self.assertIn('2023-08-02,', lines[1])
+        self.assertIn(',buyer,buyer@email.com,', lines[1])
+        self.assertIn(',"Export, ""quoted""",', lines[1])
+
+    def test_export_purchases_jsonl(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/export/purchases/', {'file_format': 'jsonl', 'date_to': '2023-08-01'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['purchase_date'], rows[0]['hall_name'], rows[0]['purchase_sum']),
+                         ('2023-08-01', 'Green', 100))
+
+    def test_export_sessions(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/export/sessions/', {'file_format': 'jsonl', 'date_from': '2023-08-11'})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        response = self.client.get('/api/export/sessions/', {'file_format': 'jsonl', 'date_from': '2023-08-10'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['session_show_end_date'], '2023-08-10')
+
+    def test_export_invalid_format(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/export/purchases/', {'file_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_user(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/export/purchases/')
+        self.assertEqual(response.status_code, 403)
+
+
+class AnalyticsApiViewTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                             password='SuperAdmin2')
+        hall = CinemaHall.objects.create(hall_name='Blue', hall_size=8)
+        movie = MovieSession.objects.create(hall=hall, movie_title='Analytics', movie_description='About',
+                                            session_start_time='10:00', session_end_time='12:00', ticket_price=100)
+        record_purchase(Purchase.objects.create(user=self.superuser, movie=movie, quantity=2, purchase_sum=200))
+
+    def test_analytics(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/analytics/', {'backend': 'python'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['sessions'][0]['load_factor'], 0.25)
+        self.assertEqual(response.data['demand_by_hour'][10], 2)
+
+    def test_analytics_from_purchases(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/analytics/', {'source': 'purchases'})
+        self.assertEqual(response.data['totals']['revenue'], 200)
+
+    def test_analytics_invalid_backend(self):
+        self.client.force_authenticate(user=self.superuser)
+        response = self.client.get('/api/analytics/', {'backend': 'gpu'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,116 @@
+from django.core.cache import caches
+from django.db import connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from freezegun import freeze_time
+from rest_framework.authtoken.models import Token
+from cinema_app.api.authentication import forget_signed_token_state, issue_signed_token
+from cinema_app.api.token_cache import token_cache
+from cinema_app.middleware import REPLICA_PIN_COOKIE
+from cinema_app.models import CinemaHall, CustomUser, MovieSession
+from cinema_app.routers import ReplicaRouter, replica_reads
+
+
+class ReplicaRouterTest(TestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_primary_outside_replica_reads(self):
+        self.assertEqual(self.router.db_for_read(MovieSession), 'default')
+
+    def test_primary_in_transaction(self):
+        # TestCase runs every test in a transaction
+        with replica_reads('replica_1'):
+            self.assertEqual(self.router.db_for_read(MovieSession), 'default')
+
+    def test_writes_go_to_primary(self):
+        with replica_reads('replica_1') as state:
+            self.assertEqual(self.router.db_for_write(MovieSession), 'default')
+            self.assertTrue(state.wrote)
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_no_migrations_on_replicas(self):
+        self.assertTrue(self.router.allow_migrate('default', 'cinema_app'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'cinema_app'))
+
+
+@freeze_time('2023-08-01 10:00:00')
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingMiddlewareTest(TransactionTestCase):
+    databases = {'default', 'replica_1'}
+
+    def setUp(self):
+        caches[token_cache.cache_alias].clear()
+        token_cache.clear_local()
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.token = Token.objects.create(user=self.user)
+        hall = CinemaHall.objects.create(hall_name='Red', hall_size=50)
+        self.movie = MovieSession.objects.create(
+            movie_title='Movie', hall=hall, session_show_start_date='2023-08-01', session_show_end_date='2099-12-31',
+            session_start_time='15:00:00', session_end_time='17:00:00', ticket_price=10, free_seats=50)
+
+    def get(self, path, **kwargs):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_1']) as replica:
+            response = self.client.get(path, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response, len(primary), len(replica)
+
+    def test_schedule_read_from_replica(self):
+        response, primary, replica = self.get('/')
+        self.assertContains(response, 'Movie')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_api_list_and_retrieve_read_from_replica(self):
+        for path in ('/api/movie_session/', f'/api/movie_session/{self.movie.pk}/'):
+            _, primary, replica = self.get(path)
+            self.assertEqual(primary, 0)
+            self.assertGreater(replica, 0)
+
+    def test_token_read_from_primary(self):
+        _, primary, replica = self.get('/api/movie_session/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertGreater(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_signed_token_state_read_from_primary(self):
+        token = issue_signed_token(self.user)
+        forget_signed_token_state(self.user.pk)
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            self.get('/api/movie_session/', HTTP_AUTHORIZATION=f'Signed {token}')
+        self.assertFalse([query for query in replica if 'cinema_app_customuser' in query['sql']])
+
+    def test_session_user_read_from_primary(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            response, _, _ = self.get('/')
+        self.assertContains(response, 'user')
+        self.assertFalse([query for query in replica if 'cinema_app_customuser' in query['sql']])
+
+    def test_deactivated_session_user(self):
+        self.client.force_login(self.user)
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        response, _, _ = self.get('/')
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_purchase_on_primary_and_pinned(self):
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            response = self.client.post('/api/cart/', {'movie': self.movie.pk, 'quantity': 2},
+                                        HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(replica), 0)
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+        _, primary, replica = self.get('/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_read_your_writes(self):
+        router = ReplicaRouter()
+        with replica_reads('replica_1') as state:
+            self.assertEqual(router.db_for_read(MovieSession), 'replica_1')
+            self.assertEqual(router.db_for_read(Token), 'default')
+            MovieSession.objects.filter(pk=self.movie.pk).update(free_seats=48)
+            self.assertEqual(router.db_for_read(MovieSession), 'default')
+            self.assertTrue(state.wrote)
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.middleware.csrf import _unmask_cipher_token
+from django.test import TestCase, Client
+from cinema_app.models import CinemaHall, CustomUser, MovieSession, Purchase
+from cinema_app.templatetags.row_fragments import CSRF_TOKEN_PLACEHOLDER
+
+ROW_TEMPLATE = 'fragments/movie_session_row.html'
+
+
+class RowFragmentsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        hall = CinemaHall.objects.create(hall_name='Red', hall_size=50)
+        self.sessions = [MovieSession.objects.create(
+            movie_title=f'Movie {i}', movie_description='Description', hall=hall,
+            session_show_start_date='2023-08-01', session_show_end_date='2099-12-31',
+            session_start_time='15:00:00', session_end_time='17:00:00', ticket_price=10, free_seats=50)
+            for i in range(3)]
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.admin = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                         password='AdminPass3')
+
+    def test_rows_by_role(self):
+        response = self.client.get('/')
+        self.assertContains(response, 'Movie: Movie 1 <br>')
+        self.assertNotContains(response, f'/movie_details/{self.sessions[1].pk}/')
+
+        self.client.force_login(self.user)
+        response = self.client.get('/')
+        self.assertContains(response, f'/movie_details/{self.sessions[1].pk}/')
+        self.assertNotContains(response, 'Change it')
+
+        self.client.force_login(self.admin)
+        response = self.client.get('/')
+        self.assertContains(response, 'Change it', count=3)
+
+    def test_rows_rendered_once(self):
+        response = self.client.get('/')
+        self.assertIn(ROW_TEMPLATE, [template.name for template in response.templates])
+        response = self.client.get('/')
+        self.assertNotIn(ROW_TEMPLATE, [template.name for template in response.templates])
+        self.assertContains(response, 'Free seats left: 50', count=3)
+
+    def test_changed_row_rendered_again(self):
+        self.client.get('/')
+        session = self.sessions[0]
+        session.free_seats = 47
+        session.save()
+        response = self.client.get('/')
+        self.assertContains(response, 'Free seats left: 47', count=1)
+        self.assertContains(response, 'Free seats left: 50', count=2)
+
+    def test_csrf_token_of_the_request(self):
+        tokens = []
+        for _ in range(2):
+            client = Client()
+            client.force_login(self.admin)
+            response = client.get('/')
+            self.assertNotContains(response, CSRF_TOKEN_PLACEHOLDER)
+            token = str(response.context['csrf_token'])
+            self.assertContains(response, f'value="{token}"', count=3)
+            tokens.append(_unmask_cipher_token(token))
+        self.assertNotEqual(tokens[0], tokens[1])
+
+    def test_profile_rows(self):
+        Purchase.objects.create(user=self.user, movie=self.sessions[2], quantity=2, purchase_sum=20)
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.get('/profile/')
+            self.assertContains(response, 'Movie: Movie 2')
+            self.assertContains(response, 'Quantity of tickets: 2')
@@ -1,4 +1,7 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.exceptions import ValidationError
 from cinema_app.api.serializers import CustomUserSerializer, CinemaHallSerializer, MovieSessionSerializer, \
     PurchaseSerializer
 from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
@@ -28,7 +31,28 @@ class CustomUserSerializerTestCase(APITestCase):
     def test_invalid_registration_with_exists_username(self):
         input_data = {'username': 'Test', 'email': 'user2@email.com', 'password': 'UserPass3'}
         serializer = CustomUserSerializer(data=input_data)
-        self.assertFalse(serializer.is_valid())
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(ValidationError) as error:
+            serializer.save()
+        self.assertEqual(error.exception.detail, {'non_field_errors': ['User with this name already exists']})
+
+    def test_invalid_registration_with_exists_email(self):
+        input_data = {'username': 'user5', 'email': 'TEST@email.com', 'password': 'UserPass3'}
+        serializer = CustomUserSerializer(data=input_data)
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(ValidationError) as error:
+            serializer.save()
+        self.assertEqual(error.exception.detail, {'email': ['Email is already registered!']})
+
+    def test_registration_with_one_query(self):
+        input_data = {'username': 'user5', 'email': 'user5@email.com', 'password': 'UserPass3'}
+        serializer = CustomUserSerializer(data=input_data)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(serializer.is_valid())
+            serializer.save()
+        statements = [query['sql'] for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT'))
 
     def test_invalid_registration_without_password(self):
         input_data = {'username': 'user1', 'email': 'user3@email.com'}
@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+from cinema_app.models import CinemaHall, CustomUser, MovieSession
+from cinema_app.slow_queries import SlowQueryLog, log_slow_query, summarize_slow_queries
+from cinema_app import slow_queries
+
+
+class SlowQueryLogTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'slow_queries.jsonl')
+        self.log = SlowQueryLog(threshold_ms=0, path=self.path, max_bytes=1024 * 1024, backup_count=2,
+                                explain_views=('moviesession-list',))
+        original, slow_queries.slow_query_log = slow_queries.slow_query_log, self.log
+        self.addCleanup(setattr, slow_queries, 'slow_query_log', original)
+        self.addCleanup(self.log.stop)
+        hall = CinemaHall.objects.create(hall_name='Red', hall_size=50)
+        MovieSession.objects.create(
+            movie_title='Movie', movie_description='Description', hall=hall, session_show_start_date='2023-08-01',
+            session_show_end_date='2099-12-31', session_start_time='15:00:00', session_end_time='17:00:00',
+            ticket_price=10, free_seats=50)
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+
+    def entries(self):
+        self.log.stop()
+        with open(self.path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_installed(self):
+        self.assertIn(log_slow_query, connection.execute_wrappers)
+
+    def test_entries(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get('/api/movie_session/')
+        client.get('/api/profile/')
+        entries = self.entries()
+        listing = [entry for entry in entries if entry['view'] == 'moviesession-list']
+        self.assertTrue(listing)
+        self.assertIn('cinema_app_moviesession', listing[0]['sql'])
+        self.assertIsInstance(listing[0]['plan'], list)
+        self.assertTrue(listing[0]['location'].startswith('cinema_app/'))
+        profile = [entry for entry in entries if entry['view'] == 'cinema_app.api.resourses.ProfileApiView']
+        self.assertTrue(profile)
+        self.assertNotIn('plan', profile[0])
+        self.assertIn(self.user.pk, [param for entry in profile for param in entry['params'] or ()])
+
+    def test_threshold(self):
+        self.log.stop()
+        os.remove(self.path)
+        self.log.threshold = 60
+        MovieSession.objects.count()
+        self.log.stop()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_summary(self):
+        self.log.stop()
+        os.remove(self.path)
+        for _ in range(3):
+            list(MovieSession.objects.all())
+        CinemaHall.objects.count()
+        self.log.stop()
+        report = summarize_slow_queries(self.path)
+        self.assertEqual(sorted(total['count'] for total in report), [1, 3])
+        self.assertEqual(len(summarize_slow_queries(self.path, top=1)), 1)
+        sessions = next(total for total in report if 'cinema_app_moviesession' in total['sql'])
+        self.assertEqual(sessions['count'], 3)
+        self.assertEqual(sessions['mean_ms'], round(sessions['total_ms'] / 3, 3))
+
+        os.rename(self.path, self.path + '.1')
+        list(MovieSession.objects.all())
+        self.log.stop()
+        self.assertEqual(sorted(total['count'] for total in summarize_slow_queries(self.path)), [1, 4])
+
+        output = StringIO()
+        call_command('slow_queries', file=self.path, top=1, json=True, stdout=output)
+        self.assertEqual(len(json.loads(output.getvalue())), 1)
+        output = StringIO()
+        call_command('slow_queries', file=self.path, stdout=output)
+        self.assertIn('in 4 queries', output.getvalue())
+
+    def test_summary_without_log_directory(self):
+        path = os.path.join(os.path.dirname(self.path), 'missing', 'slow_queries.jsonl')
+        self.assertEqual(summarize_slow_queries(path), [])
+        output = StringIO()
+        call_command('slow_queries', file=path, stdout=output)
+        self.assertIn('No slow queries in', output.getvalue())
@@ -0,0 +1,95 @@
+import gzip
+import shutil
+import tempfile
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+from cinema_app.staticfiles import IMMUTABLE_CACHE_CONTROL, byte_range, check_media_root
+
+
+class StaticFilesTest(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.static_root)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def get(self, path, **headers):
+        response = self.client.get(path, **headers)
+        if response.streaming:
+            response.body = b''.join(response.streaming_content)
+        return response
+
+    def test_hashed_names(self):
+        url = static('img/logo.png')
+        self.assertRegex(url, r'^/static/img/logo\.[0-9a-f]{12}\.png$')
+        response = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        with staticfiles_storage.open('img/logo.png') as file:
+            self.assertEqual(response.body, file.read())
+
+    def test_plain_names_revalidated(self):
+        response = self.get('/static/img/logo.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.STATIC_MAX_AGE}')
+
+    def test_not_collected_plain_name(self):
+        self.assertEqual(static('img/missing.png'), '/static/img/missing.png')
+
+    def test_compressed_copy(self):
+        plain = self.get('/static/admin/css/base.css')
+        response = self.get('/static/admin/css/base.css', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.body), plain.body)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+    def test_range(self):
+        plain = self.get('/static/admin/css/base.css')
+        size = len(plain.body)
+        response = self.get('/static/admin/css/base.css', HTTP_RANGE='bytes=10-19', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{size}')
+        self.assertEqual(response.body, plain.body[10:20])
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        response = self.get('/static/admin/css/base.css', HTTP_RANGE='bytes=-5')
+        self.assertEqual(response.body, plain.body[-5:])
+        response = self.get('/static/admin/css/base.css', HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        response = self.get('/static/admin/css/base.css', HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        response = self.get('/static/img/logo.png')
+        response = self.get('/static/img/logo.png', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_found(self):
+        for path in ('/static/../manage.py', '/static/admin/', '/static/img/missing.png'):
+            self.assertEqual(self.get(path).status_code, 404)
+
+    def test_byte_range(self):
+        self.assertEqual(byte_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(byte_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(byte_range('bytes=-3', 10), (7, 9))
+        self.assertIsNone(byte_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(byte_range('items=0-1', 10))
+        with self.assertRaises(ValueError):
+            byte_range('bytes=-0', 10)
+
+
+class MediaRootCheckTest(SimpleTestCase):
+
+    def test_media_root(self):
+        self.assertEqual(check_media_root(None), [])
+        for media_root in (settings.BASE_DIR, settings.BASE_DIR.parent, settings.STATIC_ROOT):
+            with override_settings(MEDIA_ROOT=media_root):
+                self.assertIn('cinema_app.E001', [error.id for error in check_media_root(None)])
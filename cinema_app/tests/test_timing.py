@@ -0,0 +1,106 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, AsyncClient, Client, RequestFactory
+from django.utils.functional import SimpleLazyObject
+from freezegun import freeze_time
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from cinema_app.middleware import ServerTimingMiddleware
+from cinema_app.models import CinemaHall, CustomUser, MovieSession
+from cinema_app.timing import NO_SPAN, ServerTimings, span
+
+
+def span_names(response):
+    return [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+
+
+@freeze_time('2023-08-01 10:00:00')
+class ServerTimingTest(TestCase):
+
+    def setUp(self):
+        hall = CinemaHall.objects.create(hall_name='Red', hall_size=50)
+        self.session = MovieSession.objects.create(
+            movie_title='Movie', movie_description='Description', hall=hall, session_show_start_date='2023-08-01',
+            session_show_end_date='2099-12-31', session_start_time='15:00:00', session_end_time='17:00:00',
+            ticket_price=10, free_seats=50)
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+        self.admin = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                         password='AdminPass3')
+
+    def test_not_collected(self):
+        self.assertFalse(Client().get('/').has_header('Server-Timing'))
+        client = Client()
+        client.force_login(self.user)
+        self.assertFalse(client.get('/').has_header('Server-Timing'))
+        self.assertIs(span('auth'), NO_SPAN)
+
+    def test_staff_page(self):
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get('/')
+        self.assertEqual(span_names(response), ['queryset', 'render', 'db', 'total'])
+        self.assertRegex(response['Server-Timing'], r'db;desc="\d+ queries";dur=\d+\.\d{3}')
+
+    def test_api_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.assertFalse(client.get('/api/movie_session/').has_header('Server-Timing'))
+
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.admin).key}')
+        response = client.get('/api/movie_session/')
+        self.assertEqual(span_names(response), ['auth', 'queryset', 'serialize', 'render', 'db', 'total'])
+
+        response = client.post('/api/cart/', data={'movie': self.session.pk, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('purchase', span_names(response))
+
+    def test_user_not_loaded(self):
+        def load_user():
+            raise AssertionError('request.user loaded')
+
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'key'
+        request.user = SimpleLazyObject(load_user)
+        response = ServerTimingMiddleware(lambda request: HttpResponse())(request)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_sample_rate(self):
+        with self.settings(SERVER_TIMING={'STAFF': False, 'SAMPLE_RATE': 1.0}):
+            self.assertIn('total', span_names(Client().get('/')))
+        with self.settings(SERVER_TIMING={'STAFF': False}):
+            client = Client()
+            client.force_login(self.admin)
+            self.assertFalse(client.get('/').has_header('Server-Timing'))
+
+    def test_disabled(self):
+        with self.settings(SERVER_TIMING={'ENABLED': False}):
+            client = Client()
+            client.force_login(self.admin)
+            self.assertFalse(client.get('/').has_header('Server-Timing'))
+
+    def test_header(self):
+        timings = ServerTimings()
+        timings.add('queryset', 0.0015)
+        timings.add('queryset', 0.0005)
+        timings.add('db', 0.001, 3)
+        self.assertEqual(timings.header(), 'queryset;dur=2.000, db;desc="3 queries";dur=1.000')
+
+
+class AsyncServerTimingTest(TransactionTestCase):
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                         password='AdminPass3')
+        self.user = CustomUser.objects.create_user(username='user', email='user@email.com', password='UserPass3')
+
+    async def test_async_api(self):
+        client = AsyncClient()
+        token = await sync_to_async(Token.objects.create)(user=self.admin)
+        response = await client.get('/api/async/profile/', headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('auth', span_names(response))
+
+        token = await sync_to_async(Token.objects.create)(user=self.user)
+        response = await client.get('/api/async/profile/', headers={'Authorization': f'Token {token.key}'})
+        self.assertFalse(response.has_header('Server-Timing'))
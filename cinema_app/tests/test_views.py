@@ -6,9 +6,10 @@ from django.utils import timezone
 from freezegun import freeze_time
 from cinema_app.forms import UserCreateForm
 from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
+from cinema_app.rollups import record_purchase
 from cinema_app.views import LoginUser, CinemaHallCreateView, MovieSessionListView, \
     UpdateCinemaHallView, CinemaHallListView, MovieSessionCreateView, UpdateMovieSessionView, PurchaseCreateView, \
-    MovieDetailsView, UserProfileView
+    MovieDetailsView, UserProfileView, AnalyticsReportView
 
 
 class RegistrationNewUserTest(TestCase):
@@ -34,6 +35,12 @@ class RegistrationNewUserTest(TestCase):
         response = self.c.post('/registration/', form.cleaned_data)
         self.assertTrue(CustomUser.objects.filter(username='test_user').exists())
 
+    def test_register_duplicate_username(self):
+        CustomUser.objects.create_user(username='Test_User', email='other@email.com', password='SuperPass3')
+        response = self.c.post('/registration/', self.form_data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('username', response.context['form'].errors)
+
 
 class LoginViewTest(TestCase):
     def setUp(self):
@@ -614,6 +621,18 @@ class UserProfileViewTest(TestCase):
         purchase_obj = Purchase.objects.filter(user=self.request.user)
         self.assertQuerysetEqual(purchase_obj, response.context_data['purchase_list'])
 
+    def test_query_budget(self):
+        movie = MovieSession.objects.get(id=16)
+        for _ in range(10):
+            Purchase.objects.create(user=self.user_owner, movie=movie, purchase_sum=3000, quantity=1)
+        request = self.request
+        request.user = self.user_owner
+        # count, the (table, id) keys of the page, the hot rows
+        with self.assertNumQueries(3):
+            response = UserProfileView.as_view()(request)
+            response.render()
+        self.assertEqual(len(response.context_data['purchase_list']), 7)
+
     def test_availability_for_user_stranger(self):
         request = self.request
         request.user = self.user_stranger
@@ -630,3 +649,38 @@ class UserProfileViewTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertEqual(response.url, '/login/')
 
+
+class AnalyticsReportViewTest(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.superuser = CustomUser.objects.create_superuser(username='admin', email='admin@email.com',
+                                                             password='SuperAdmin2')
+        hall = CinemaHall.objects.create(hall_name='Blue', hall_size=8)
+        movie = MovieSession.objects.create(hall=hall, movie_title='Analytics', movie_description='About',
+                                            session_start_time='10:00', session_end_time='12:00', ticket_price=100)
+        record_purchase(Purchase.objects.create(user=self.superuser, movie=movie, quantity=2, purchase_sum=200))
+
+    def test_report_superuser(self):
+        request = self.factory.get('/analytics/')
+        request.user = self.superuser
+        response = AnalyticsReportView.as_view()(request)
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context_data['report']['totals']['tickets'], 2)
+        self.assertContains(response, 'Analytics')
+
+    @patch('cinema_app.views.messages.error')
+    def test_report_invalid_date(self, error):
+        request = self.factory.get('/analytics/', {'date_from': 'monday'})
+        request.user = self.superuser
+        response = AnalyticsReportView.as_view()(request)
+        self.assertIsNone(response.context_data['date_from'])
+        error.assert_called_once()
+
+    @patch('cinema_app.views.messages.error')
+    def test_report_user(self, error):
+        request = self.factory.get('/analytics/')
+        request.user = CustomUser.objects.create_user(username='buyer', email='buyer@email.com', password='UserPass3')
+        response = AnalyticsReportView.as_view()(request)
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,104 @@
+"""
+Server-Timing breakdown of the hot paths (shown by the browser devtools).
+
+ServerTimingMiddleware (cinema_app.middleware) collects the timings of a request when SERVER_TIMING enables it
+for the request: for staff users ('STAFF') and for a random sample of all the requests ('SAMPLE_RATE').
+The parts of the hot paths are timed with `with span(name):` (auth, queryset, serialize, purchase); the middleware
+adds the database time (the record_query wrapper of cinema_app.metrics), the render time and the total, and sends
+them in the Server-Timing header.
+
+When the collection is not enabled for the request, span() returns a shared no-op context manager after one
+context variable lookup.
+"""
+
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from rest_framework.response import Response
+
+SERVER_TIMING_DEFAULTS = {
+    'ENABLED': True,
+    'STAFF': True,
+    'SAMPLE_RATE': 0.0,
+}
+
+NO_SPAN = nullcontext()
+
+current_timings = ContextVar('server_timings', default=None)
+
+
+class ServerTimings:
+    """
+    The spans of a request: {name: [seconds, count]} in the order they were first entered.
+    """
+
+    def __init__(self):
+        self.spans = {}
+
+    def add(self, name, seconds, count=1):
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [seconds, count]
+        else:
+            span[0] += seconds
+            span[1] += count
+
+    def header(self):
+        """
+        Returns: the value of the Server-Timing header (durations in milliseconds).
+        """
+        entries = []
+        for name, (seconds, count) in self.spans.items():
+            description = f';desc="{count} queries"' if name == 'db' else ''
+            entries.append(f'{name}{description};dur={seconds * 1000:.3f}')
+        return ', '.join(entries)
+
+
+class Span:
+    __slots__ = ('timings', 'name', 'started')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.name, time.perf_counter() - self.started)
+
+
+def span(name):
+    """
+    Returns: a context manager timing its block as the span name of the request, a no-op one if the
+    Server-Timing collection is not enabled for the request.
+    """
+    timings = current_timings.get()
+    return NO_SPAN if timings is None else Span(timings, name)
+
+
+class TimedPaginationMixin:
+    """
+    Django list views: the page of the queryset is loaded in the 'queryset' span (not lazily by the template).
+    """
+
+    def paginate_queryset(self, queryset, page_size):
+        with span('queryset'):
+            paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+            page.object_list = object_list = list(object_list)
+        return paginator, page, object_list, is_paginated
+
+
+class TimedListModelMixin:
+    """
+    REST framework list views: ListModelMixin.list with the 'queryset' and 'serialize' spans.
+    """
+
+    def list(self, request, *args, **kwargs):
+        with span('queryset'):
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            objects = list(queryset) if page is None else page
+        with span('serialize'):
+            data = self.get_serializer(objects, many=True).data
+        return Response(data) if page is None else self.get_paginated_response(data)
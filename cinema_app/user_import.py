@@ -0,0 +1,114 @@
+"""
+Streaming bulk import of users (loyalty members migrated from another system).
+
+Rows are read lazily and processed in chunks: one indexed lookup per chunk finds the users that already exist
+(case-insensitive username / email, like the unique indexes), the passwords of the new users are hashed
+in a process pool across all cores and the users are inserted with one bulk_create per chunk.
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import django
+from django.contrib.auth.hashers import make_password
+from django.db.models import Q
+from django.db.models.functions import Lower
+from cinema_app.models import CustomUser
+
+
+def read_rows(file, file_format):
+    """
+    Yields dicts with username, email, password and total_sum from a CSV (with a header row) or a JSONL file.
+    """
+    if file_format == 'jsonl':
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(file)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_hashing_worker():
+    """
+    Configures Django in a spawned worker process (forked workers inherit the configured settings).
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cinema_house.settings')
+    django.setup()
+
+
+def _existing_keys(chunk):
+    """
+    Returns the lowercased usernames and emails of the chunk that are already taken, with one query.
+    """
+    usernames = {row['username'].lower() for row in chunk}
+    emails = {row['email'].lower() for row in chunk if row.get('email')}
+    existing = CustomUser.objects.annotate(lower_username=Lower('username'), lower_email=Lower('email')).filter(
+        Q(lower_username__in=usernames) | Q(lower_email__in=emails)
+    ).values_list('lower_username', 'lower_email')
+    taken_usernames, taken_emails = set(), set()
+    for username, email in existing:
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+
+def import_users(rows, chunk_size=1000, workers=None):
+    """
+    Imports the rows and returns a report dict: created, skipped, seconds and users_per_second.
+    Rows whose username or email is already taken (in the database or earlier in the input) are skipped.
+    """
+    workers = workers or os.cpu_count() or 1
+    report = {'created': 0, 'skipped': 0}
+    seen_usernames, seen_emails = set(), set()
+    started = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_hashing_worker) if workers > 1 else None
+    try:
+        for chunk in chunked(rows, chunk_size):
+            taken_usernames, taken_emails = _existing_keys(chunk)
+            taken_usernames |= seen_usernames
+            taken_emails |= seen_emails
+            new_rows = []
+            for row in chunk:
+                username, email = row['username'].lower(), (row.get('email') or '').lower()
+                if username in taken_usernames or (email and email in taken_emails):
+                    report['skipped'] += 1
+                    continue
+                taken_usernames.add(username)
+                seen_usernames.add(username)
+                if email:
+                    taken_emails.add(email)
+                    seen_emails.add(email)
+                new_rows.append(row)
+
+            passwords = [row['password'] for row in new_rows]
+            if executor is not None:
+                hashes = list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // workers)))
+            else:
+                hashes = [make_password(password) for password in passwords]
+
+            users = [
+                CustomUser(username=CustomUser.normalize_username(row['username']),
+                           email=CustomUser.objects.normalize_email(row.get('email') or ''),
+                           password=encoded, total_sum=int(row.get('total_sum') or 0))
+                for row, encoded in zip(new_rows, hashes)
+            ]
+            CustomUser.objects.bulk_create(users, batch_size=chunk_size)
+            report['created'] += len(users)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    report['users_per_second'] = round(report['created'] / report['seconds'], 1) if report['seconds'] else 0.0
+    return report
@@ -1,13 +1,19 @@
-from datetime import timedelta
+from datetime import date, timedelta
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.contrib import messages, auth
+from django.contrib import messages
 from django.contrib.auth.views import LoginView, LogoutView
 from django.db import transaction
+from django.db.models import F
 from django.http import HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.utils import timezone
-from django.views.generic import CreateView, ListView, UpdateView, DetailView
-from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase
+from django.views.generic import CreateView, ListView, UpdateView, DetailView, TemplateView
+from cinema_app.models import CustomUser, CinemaHall, MovieSession, Purchase, ArchivedPurchase
+from cinema_app.middleware import start_sliding_session
+from cinema_app.analytics import occupancy_report
+from cinema_app.archive import PurchaseHistory
+from cinema_app.rollups import record_purchase
+from cinema_app.timing import TimedPaginationMixin, span
 from cinema_app.forms import UserCreateForm, CinemaHallCreateForm, MovieSessionForm, PurchaseCreateForm, \
     UserChoiceFilterForm
 from cinema_house.settings import SESSION_COOKIE_LIFETIME_FOR_ADMIN, SESSION_COOKIE_LIFETIME
@@ -52,11 +58,22 @@ class RegistrationNewUser(CreateView):
     """
     View for registration of new user page.
     """
+    query_budget = 5
     model = CustomUser
     form_class = UserCreateForm
     template_name = 'registration.html'
     success_url = reverse_lazy('login')
 
+    def form_valid(self, form):
+        """
+        Saves the user with one insert. If the username or the email is already taken (the unique indexes
+        reject the insert), the form is shown again with the error.
+        """
+        self.object = form.save()
+        if self.object is None:
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class LoginUser(LoginView):
     """
@@ -65,33 +82,35 @@ class LoginUser(LoginView):
         form_valid(form): the method was overriden for the following purposes: check the user's activity on the website
          and if it is absent within a minute, the user automatically logs out.
     """
+    query_budget = 9
     template_name = 'login.html'
     next_page = '/'
 
     def form_valid(self, form):
         """
         Called when the form is successfully validated.
-        Check the user's and superuser activity on the website
-        and if it is absent within a minute (for user) and 540 minutes (for superuser) , the user / superuser
-        automatically logs out.
+        Logs the user in once (LoginView.form_valid) and sets the session lifetime:
+        if the user is not active on the website within a minute (for user) and 540 minutes (for superuser),
+        the user / superuser automatically logs out. The lifetime slides with the user's activity
+        (see SlidingSessionExpiryMiddleware).
         Args:
             form (SignUpForm): The validated form.
         Returns:
-            super().form_valid(form) (HttpResponse): A redirect to the success URL.
+            response (HttpResponse): A redirect to the success URL.
         """
-        auth.login(self.request, form.get_user())
+        response = super().form_valid(form)
         if self.request.user.is_superuser:
-            self.request.session.set_expiry(SESSION_COOKIE_LIFETIME_FOR_ADMIN)
-            return super().form_valid(form)
+            start_sliding_session(self.request.session, SESSION_COOKIE_LIFETIME_FOR_ADMIN)
         else:
-            self.request.session.set_expiry(SESSION_COOKIE_LIFETIME)
-            return super().form_valid(form)
+            start_sliding_session(self.request.session, SESSION_COOKIE_LIFETIME)
+        return response
 
 
 class LogoutUser(LogoutView):
     """
     View for logout.
     """
+    query_budget = 3
     next_page = reverse_lazy('login')
 
 
@@ -100,6 +119,7 @@ class CinemaHallCreateView(SuperUserRequiredMixin, CreateView):
     View for creating a new Cinema Hall object. Subclasses SuperUserRequiredMixin
     to ensure that only superusers can create Cinema halls.
     """
+    query_budget = 4
     model = CinemaHall
     form_class = CinemaHallCreateForm
     success_url = '/cinema_hall/'
@@ -120,6 +140,7 @@ class CinemaHallListView(UserLoginRequiredMixin, ListView):
     A view that displays a list of all halls in the system. Subclasses UserLoginRequiredMixin
     to ensure that only authenticated user can view the list of Cinema halls.
     """
+    query_budget = 4
     model = CinemaHall
     template_name = 'cinema_hall.html'
     paginate_by = 7
@@ -131,6 +152,7 @@ class UpdateCinemaHallView(SuperUserRequiredMixin, UpdateView):
     A view to update a Cinema hall instance in the database. Subclasses SuperUserRequiredMixin
     to ensure that only superusers can update Cinema halls.
     """
+    query_budget = 5
     model = CinemaHall
     form_class = CinemaHallCreateForm
     template_name = 'change_hall.html'
@@ -148,10 +170,11 @@ class UpdateCinemaHallView(SuperUserRequiredMixin, UpdateView):
         return kwargs
 
 
-class MovieSessionListView(ListView):
+class MovieSessionListView(TimedPaginationMixin, ListView):
     """
     A view that displays a list of all available movie sessions.
     """
+    query_budget = 4
     model = MovieSession
     template_name = 'cinema.html'
     paginate_by = 7
@@ -202,6 +225,7 @@ class MovieSessionCreateView(SuperUserRequiredMixin, CreateView):
     View for creating a new MovieSession object. Subclasses SuperUserRequiredMixin
     to ensure that only superusers can create MovieSession objects.
     """
+    query_budget = 9
     model = MovieSession
     form_class = MovieSessionForm
     success_url = '/'
@@ -239,6 +263,7 @@ class UpdateMovieSessionView(SuperUserRequiredMixin, UpdateView):
     View for changing exists MovieSession object. Subclasses SuperUserRequiredMixin
     to ensure that only superusers can update MovieSession objects.
     """
+    query_budget = 9
     model = MovieSession
     form_class = MovieSessionForm
     success_url = '/'
@@ -257,11 +282,12 @@ class UpdateMovieSessionView(SuperUserRequiredMixin, UpdateView):
         return kwargs
 
 
-class MovieSessionTomorrowListView(ListView):
+class MovieSessionTomorrowListView(TimedPaginationMixin, ListView):
     """
     A view that displays a list of all available movie sessions for tomorrow.
     Also added the ability to sort as in the class MovieSessionListView.
     """
+    query_budget = 4
     model = MovieSession
     template_name = 'movie_session_tomorrow.html'
     extra_context = {"purchase_form": PurchaseCreateForm()}
@@ -299,6 +325,7 @@ class PurchaseCreateView(UserLoginRequiredMixin, CreateView):
     A view that responsible for the purchase logic. Subclasses UserLoginRequiredMixin
     to ensure that only authenticated user can create a purchase object.
     """
+    query_budget = 12
     http_method_names = ['post']
     form_class = PurchaseCreateForm
     success_url = '/'
@@ -328,11 +355,11 @@ class PurchaseCreateView(UserLoginRequiredMixin, CreateView):
         movie.free_seats -= obj.quantity
         purchase_sum = movie.ticket_price * obj.quantity
         obj.purchase_sum = purchase_sum
-        self.request.user.total_sum += purchase_sum
-        with transaction.atomic():
+        with span('purchase'), transaction.atomic():
             obj.save()
+            record_purchase(obj)
             movie.save()
-            self.request.user.save()
+            CustomUser.objects.filter(pk=self.request.user.pk).update(total_sum=F('total_sum') + purchase_sum)
         return super().form_valid(form=form)
 
     def form_invalid(self, form):
@@ -348,6 +375,7 @@ class MovieDetailsView(UserLoginRequiredMixin, DetailView):
     A form with a tickets purchase is also available on the page.
     Subclasses UserLoginRequiredMixin to ensure that only authenticated user has access to the page.
     """
+    query_budget = 4
     model = MovieSession
     template_name = 'movie_details.html'
     extra_context = {"purchase_form": PurchaseCreateForm()}
@@ -366,19 +394,50 @@ class MovieDetailsView(UserLoginRequiredMixin, DetailView):
         return obj
 
 
-class UserProfileView(UserLoginRequiredMixin, ListView):
+class UserProfileView(UserLoginRequiredMixin, TimedPaginationMixin, ListView):
     """
     View for user profile page.
     Subclasses UserLoginRequiredMixin to ensure that only authenticated user has access to the page.
     """
+    query_budget = 5
     model = Purchase
     template_name = 'profile.html'
     paginate_by = 7
+    context_object_name = 'purchase_list'
+    rendered_fields = ('purchase_date', 'quantity', 'purchase_sum', 'movie__movie_title')
 
     def get_queryset(self):
         """
-        The method is overridden so that the authenticated user receives information only about himself
-        :return: filtered by a specific user queryset
+        The method is overridden so that the authenticated user receives information only about himself,
+        from the hot and the archived purchases (see cinema_app.archive.PurchaseHistory).
+        The ordering matches the (user, -purchase_date, id) indexes, so a page is read from the indexes without sorting;
+        the movie sessions rendered in each row are loaded in the same query, only the rendered columns are loaded.
+        :return: the purchase history of a specific user
         """
-        return super().get_queryset().filter(user=self.request.user)
+        return PurchaseHistory(Purchase.objects.filter(user=self.request.user),
+                               ArchivedPurchase.objects.filter(user=self.request.user),
+                               prepare=lambda queryset: queryset.select_related('movie').only(*self.rendered_fields))
+
 
+class AnalyticsReportView(SuperUserRequiredMixin, TemplateView):
+    """
+    View for the occupancy and pricing analytics page (see cinema_app.analytics).
+    Subclasses SuperUserRequiredMixin to ensure that only superuser has access to the page.
+    The optional GET parameters date_from and date_to (YYYY-MM-DD) limit the purchases.
+    """
+    query_budget = 4
+    template_name = 'analytics.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        dates = {}
+        for name in ('date_from', 'date_to'):
+            value = self.request.GET.get(name)
+            try:
+                dates[name] = date.fromisoformat(value) if value else None
+            except ValueError:
+                messages.error(self.request, f'Invalid date {value}, the format is YYYY-MM-DD')
+                dates[name] = None
+        context.update(dates)
+        context['report'] = occupancy_report(**dates)
+        return context
@@ -45,11 +45,16 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'cinema_app.CustomUser'
 
 MIDDLEWARE = [
+    'cinema_app.middleware.RequestMetricsMiddleware',
+    'cinema_app.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'cinema_app.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cinema_app.middleware.SlidingSessionExpiryMiddleware',
+    'cinema_app.middleware.ServerTimingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,8 +66,14 @@ TEMPLATES = [
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates']
         ,
-        'APP_DIRS': True,
         'OPTIONS': {
+            # compiled templates are kept in memory (the development autoreloader resets them on changes)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -83,9 +94,30 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'replica_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica_1.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+    'replica_2': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica_2.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['cinema_app.routers.ReplicaRouter']
+
+# the user of a session is loaded from the primary database, also in the requests that read from a replica
+AUTHENTICATION_BACKENDS = ['cinema_app.backends.PrimaryModelBackend']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -123,11 +155,21 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
 MEDIA_URL = '/media/'
 
-MEDIA_ROOT = (
-    BASE_DIR
-)
+# uploaded files are kept apart from the code and the databases (checked by cinema_app.E001)
+MEDIA_ROOT = BASE_DIR / 'media'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'cinema_app.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -135,8 +177,13 @@ MEDIA_ROOT = (
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'cinema_app.api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-       'cinema_app.api.authentication.TokenExpiredAuthentication'
+       'cinema_app.api.authentication.TokenExpiredAuthentication',
+       'cinema_app.api.authentication.SignedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -152,7 +199,91 @@ REST_FRAMEWORK = {
     'TEST_REQUEST_DEFAULT_FORMAT': 'json'
 }
 
-SESSION_SAVE_EVERY_REQUEST = True
+"""
+API responses: the JSON backend of FastJSONRenderer ('orjson' or 'stdlib', None: orjson if it is installed)
+and the gzip compression of the session, hall and profile responses of at least API_COMPRESSION_MIN_SIZE bytes
+"""
+API_JSON_BACKEND = None
+API_COMPRESSION_MIN_SIZE = 1024
+API_COMPRESSION_LEVEL = 6
+
+"""
+Per-row fragment cache of the schedule and the purchase history pages ({% row_fragments %}): the fragments
+are stored in the FRAGMENT_CACHE_ALIAS cache for FRAGMENT_CACHE_TIMEOUT seconds, keyed by the role of the user,
+the id of the row and its version
+"""
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = 600
+
+"""
+In-process serving of the collected static files (manage.py collectstatic) at STATIC_URL, for deployments
+without a front web server: the fingerprinted files are cached by the clients for a year (immutable),
+the others for STATIC_MAX_AGE seconds
+"""
+STATIC_SERVE = True
+STATIC_MAX_AGE = 60
+
+"""
+Per-view request metrics (RequestMetricsMiddleware), exposed to the admins in the Prometheus text format
+at api/metrics/. 'MODE': 'memory' keeps the totals of the process; with 'files' every worker process also writes
+its totals to DIRECTORY (at most every FLUSH_INTERVAL seconds) and the endpoint adds up all the workers
+"""
+METRICS = {
+    'ENABLED': True,
+    'MODE': 'memory',
+    'DIRECTORY': BASE_DIR / 'metrics',
+    'FLUSH_INTERVAL': 5,
+    'LATENCY_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+}
+
+"""
+Server-Timing header with the breakdown of the request (auth, queryset, serialize, render, purchase, db, total),
+for staff users ('STAFF') and for a random share of all the requests ('SAMPLE_RATE', 0.0 - 1.0)
+"""
+SERVER_TIMING = {
+    'ENABLED': True,
+    'STAFF': True,
+    'SAMPLE_RATE': 0.0,
+}
+
+"""
+Query budgets of the views and serializers (their query_budget attributes, see cinema_app.query_budget): a request
+or a serializer that makes more queries than its budget raises QueryBudgetExceeded. Checked only in development
+and by the test suite
+"""
+QUERY_BUDGET = {
+    'ENABLED': DEBUG,
+}
+
+"""
+Slow-query log: the queries that take at least THRESHOLD_MS are written to FILE as JSON lines (by a background
+thread, rotated at MAX_BYTES) with their parameters, view and cinema_app stack frame; the queries of EXPLAIN_VIEWS
+(the listing and purchase endpoints: URL pattern names, the dotted path of the view for the unnamed API patterns)
+also with their query plan. manage.py slow_queries lists the top offenders
+"""
+SLOW_QUERY_LOG = {
+    'ENABLED': True,
+    'THRESHOLD_MS': 100,
+    'FILE': BASE_DIR / 'logs' / 'slow_queries.jsonl',
+    'MAX_BYTES': 10 * 1024 * 1024,
+    'BACKUP_COUNT': 5,
+    'EXPLAIN_VIEWS': (
+        'cinema', 'movie_session_tomorrow', 'async_cinema', 'profile', 'cart', 'moviesession-list',
+        'cinema_app.api.resourses.ProfileApiView', 'cinema_app.api.resourses.PurchaseCreateAPIView',
+        'cinema_app.api.async_resourses.AsyncMovieSessionApiView',
+        'cinema_app.api.async_resourses.AsyncProfileApiView',
+        'cinema_app.api.async_resourses.AsyncPurchaseCreateApiView',
+    ),
+}
+
+"""
+Sessions are not saved on every request: SlidingSessionExpiryMiddleware rewrites a session only when less than
+SESSION_REFRESH_THRESHOLD of its lifetime is left. The per-role lifetimes below work with any session engine,
+e.g. 'django.contrib.sessions.backends.db' or 'django.contrib.sessions.backends.signed_cookies'.
+"""
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_THRESHOLD = 0.5
 
 """
 The constant values that are used in the application
@@ -161,5 +292,104 @@ SESSION_COOKIE_LIFETIME_FOR_ADMIN = 60 * 60 * 9
 SESSION_COOKIE_LIFETIME = 60
 TOKEN_LIFETIME = 900
 
+"""
+Caches: 'default' is the memory of the process (the rendered row fragments); 'tokens' is shared by all the worker
+processes of the host (the API token cache and the signed-token revocation state), so a logout, an expired token
+or a revocation reaches every worker at once. With several hosts point 'tokens' at a Memcached or Redis server
+"""
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'tokens',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+"""
+Two-level cache of API tokens (in-process LRU in front of the shared cache backend; a process-local
+CACHE_ALIAS backend is not used, the tokens are then cached only by the LRU for LOCAL_TTL seconds)
+"""
+TOKEN_CACHE = {
+    'CACHE_ALIAS': 'tokens',
+    'LOCAL_SIZE': 1024,
+    'LOCAL_TTL': 5,
+    'SHARED_TTL': 60,
+}
+
+"""
+Stateless signed API tokens (SignedTokenAuthentication): lifetime of a token and
+how long the per-user revocation counter is cached (in the TOKEN_CACHE['CACHE_ALIAS'] cache; with a process-local
+cache the counter is read from the database on every request)
+"""
+SIGNED_TOKEN_LIFETIME = TOKEN_LIFETIME
+SIGNED_TOKEN_STATE_TTL = 300
+
+"""
+Lifetime of the API refresh credentials (exchanged for a new access token at api/token_refresh/)
+"""
+REFRESH_TOKEN_LIFETIME = 60 * 60 * 24 * 14
+
+"""
+Purge of expired tokens and sessions (manage.py purge_expired_auth). Set AUTH_PURGE_INTERVAL (seconds)
+to also run it by the in-process scheduler
+"""
+AUTH_PURGE_INTERVAL = None
+AUTH_PURGE_BATCH_SIZE = 500
+AUTH_PURGE_SLEEP = 0.05
+
+"""
+PRAGMAs executed on every new SQLite connection (cinema_app.db), by profile. 'default' keeps the SQLite defaults
+(rollback journal: a writer blocks the readers); with 'tuned' readers and the writer do not block each other
+"""
+SQLITE_PRAGMA_PROFILES = {
+    'default': {},
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+}
+SQLITE_PRAGMA_PROFILE = 'tuned'
+
+"""
+Read replicas (cinema_app.routers): the reads of GET / HEAD / OPTIONS requests go to one of the DATABASE_REPLICAS
+aliases of DATABASES, the rest to 'default'. After a write the client reads from 'default' for REPLICA_PIN_SECONDS.
+The SQLite replicas above are for local testing: fill them with manage.py sync_replicas, then list them here,
+e.g. DATABASE_REPLICAS = ['replica_1', 'replica_2']
+"""
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 5
+
+"""
+Movie sessions ended more than this number of days ago are moved with their purchases to the archive tables
+(manage.py archive_sessions)
+"""
+ARCHIVE_SESSIONS_AFTER_DAYS = 30
+
+"""
+The pool of the async login / registration views that hashes passwords off the event loop
+('KIND': 'thread' or 'process'; requests over WORKERS + QUEUE_DEPTH are rejected with 503)
+"""
+PASSWORD_HASHING_POOL = {
+    'KIND': 'thread',
+    'WORKERS': 4,
+    'QUEUE_DEPTH': 64,
+}
+
+"""
+The pool of the async purchase API that runs the purchase transactions off the event loop
+(threads only; requests over WORKERS + QUEUE_DEPTH are rejected with 503)
+"""
+PURCHASE_POOL = {
+    'WORKERS': 4,
+    'QUEUE_DEPTH': 128,
+}
+
 
 
@@ -15,19 +15,27 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+import re
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from cinema_app.views import LoginUser, LogoutUser, RegistrationNewUser, CinemaHallCreateView, MovieSessionListView, \
     UpdateCinemaHallView, CinemaHallListView, MovieSessionCreateView, UpdateMovieSessionView, PurchaseCreateView, \
-    MovieDetailsView, UserProfileView, MovieSessionTomorrowListView
+    MovieDetailsView, UserProfileView, MovieSessionTomorrowListView, AnalyticsReportView
+from cinema_app.async_views import AsyncLoginUser, AsyncRegistrationNewUser, AsyncMovieSessionListView, \
+    AsyncMovieDetailsView
+from cinema_app.staticfiles import serve_static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('login/', LoginUser.as_view(), name="login"),
     path('logout/', LogoutUser.as_view(), name="logout"),
     path('registration/', RegistrationNewUser.as_view(), name="registration"),
+    path('async/login/', AsyncLoginUser.as_view(), name="async_login"),
+    path('async/registration/', AsyncRegistrationNewUser.as_view(), name="async_registration"),
+    path('async/', AsyncMovieSessionListView.as_view(), name='async_cinema'),
+    path('async/movie_details/<int:pk>/', AsyncMovieDetailsView.as_view(), name='async_movie_details'),
     path('create_cinema_hall/', CinemaHallCreateView.as_view(), name='create_hall'),
     path('cinema_hall/', CinemaHallListView.as_view(), name='cinema_hall'),
     path('change_hall/<int:pk>/', UpdateCinemaHallView.as_view(), name='change_hall'),
@@ -38,8 +46,12 @@ urlpatterns = [
     path('cart/<int:pk>/', PurchaseCreateView.as_view(), name='cart'),
     path('movie_details/<int:pk>/', MovieDetailsView.as_view(), name='movie_details'),
     path('profile/', UserProfileView.as_view(), name='profile'),
+    path('analytics/', AnalyticsReportView.as_view(), name='analytics'),
     path('', include('cinema_app.urls'))
 ]
+if getattr(settings, 'STATIC_SERVE', False):
+    urlpatterns = [re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static)] \
+        + urlpatterns
 if settings.DEBUG:
     urlpatterns = urlpatterns + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 